@@ -0,0 +1,220 @@
+# benchmarks/bench_asgi.py
+
+"""
+WSGI vs ASGI serving of the read-heavy pages under concurrent load.
+
+Seeds a file-backed scratch database (benchmarks.datagen), logs in as the
+busiest student, then starts two real servers on it, one after the other:
+
+    wsgi   the sync views behind a WSGI server with --wsgi-threads worker
+           threads (1 = one blocking worker, like a gunicorn sync worker)
+    asgi   the async views (core/views.py, section 9) behind uvicorn,
+           one worker process
+
+Each page is hit by --concurrency clients for --seconds, and the script
+prints throughput and latency for each server and each concurrency level.
+
+    pip install -r requirements-asgi.txt
+    python -m benchmarks.bench_asgi [--concurrency 1 8 32] [--seconds 5]
+"""
+
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .common import percentile, scratch_database, setup_django
+
+# (label, sync URL, async URL)
+PAGES = (
+    ('dashboard', '/dashboard/', '/async/dashboard/'),
+    ('notifications', '/notifications/', '/async/notifications/'),
+    ('availability grid', '/availability/grid/?days=7&slot=30', '/async/availability/grid/?days=7&slot=30'),
+)
+
+
+def serve_wsgi(port, threads):
+    """
+    Minimal WSGI server with a fixed pool of worker threads (run in a subprocess).
+    """
+    from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+    from django.core.wsgi import get_wsgi_application
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    class PooledWSGIServer(WSGIServer):
+        request_queue_size = 128
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self.handle_in_pool, request, client_address)
+
+        def handle_in_pool(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    server = PooledWSGIServer(('127.0.0.1', port), QuietHandler)
+    server.pool = ThreadPoolExecutor(threads)
+    server.set_app(get_wsgi_application())
+    server.serve_forever()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("server exited before it started listening")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server did not start on port {port}")
+
+
+def start_server(kind, port, env, wsgi_threads):
+    if kind == 'asgi':
+        command = [
+            sys.executable, '-m', 'uvicorn', 'cvsureserve.asgi:application',
+            '--port', str(port), '--workers', '1', '--log-level', 'warning', '--no-access-log',
+        ]
+    else:
+        command = [
+            sys.executable, '-m', 'benchmarks.bench_asgi',
+            '--serve-wsgi', str(port), '--wsgi-threads', str(wsgi_threads),
+        ]
+    process = subprocess.Popen(command, env=env)
+    wait_for(port, process)
+    return process
+
+
+def hammer(port, path, cookie, concurrency, seconds):
+    """
+    `concurrency` clients request `path` back to back until time runs out.
+    Returns (latencies in seconds, error count).
+    """
+    latencies, errors = [], 0
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        nonlocal errors
+        mine, failed = [], 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                conn.request('GET', path, headers={'Cookie': cookie})
+                response = conn.getresponse()
+                response.read()
+                conn.close()
+                if response.status != 200:
+                    failed += 1
+            except OSError:
+                failed += 1
+            mine.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(mine)
+            errors += failed
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+
+def seed(bookings):
+    from django.contrib.auth.models import User
+    from django.db.models import Count
+    from django.test import Client
+
+    from core import notifications
+
+    from .datagen import generate
+
+    generate(users=50, rooms=10, equipment=6, bookings=bookings)
+    student = (
+        User.objects.filter(is_staff=False).annotate(n=Count('booking')).order_by('-n').first()
+    )
+    notifications.notify_many((student.pk, f"Booking update {i}") for i in range(30))
+
+    client = Client()
+    client.force_login(student)
+    return f"sessionid={client.cookies['sessionid'].value}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--bookings', type=int, default=5000)
+    parser.add_argument('--wsgi-threads', type=int, default=1)
+    parser.add_argument('--serve-wsgi', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    setup_django()
+    if args.serve_wsgi:
+        serve_wsgi(args.serve_wsgi, args.wsgi_threads)
+        return
+
+    try:
+        import uvicorn  # noqa: F401
+    except ImportError:
+        sys.exit("uvicorn is not installed: pip install -r requirements-asgi.txt")
+
+    from django.db import connection
+
+    if connection.vendor != 'sqlite':
+        sys.exit("Run this against SQLite; the servers share the scratch database file.")
+
+    with scratch_database(file_backed=True):
+        cookie = seed(args.bookings)
+        env = dict(
+            os.environ,
+            DATABASE_BACKEND='sqlite',
+            SQLITE_PATH=str(connection.settings_dict['NAME']),
+            PROFILING_LOG_LEVEL='WARNING',
+        )
+        connection.close()
+
+        print(f"{'server':6} {'page':18} {'clients':>7} {'req/s':>8} {'p50':>9} {'p99':>9} {'errors':>6}")
+        for kind in ('wsgi', 'asgi'):
+            port = free_port()
+            process = start_server(kind, port, env, args.wsgi_threads)
+            try:
+                for label, sync_path, async_path in PAGES:
+                    path = async_path if kind == 'asgi' else sync_path
+                    hammer(port, path, cookie, 1, 0.5)  # warm up caches and connections
+                    for concurrency in args.concurrency:
+                        latencies, errors = hammer(port, path, cookie, concurrency, args.seconds)
+                        print(
+                            f"{kind:6} {label:18} {concurrency:>7} {len(latencies) / args.seconds:>8.1f} "
+                            f"{percentile(latencies, 50) * 1000:>7.1f}ms {percentile(latencies, 99) * 1000:>7.1f}ms "
+                            f"{errors:>6}"
+                        )
+            finally:
+                process.terminate()
+                process.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# benchmarks/bench_availability.py
+
+"""
+Conflict probe latency at 10k, 100k and 1M bookings.
+
+Measures both halves of core.availability:
+  * the indexed DB probe used by BookingForm.clean / Booking.clean
+  * the in-memory RoomIntervalIndex probe used by batch callers
+
+Usage:
+    python -m benchmarks.bench_availability [--sizes 10000 100000 1000000] [--probes 2000]
+"""
+
+import argparse
+import random
+from datetime import timedelta
+
+from .common import rolled_back, scratch_database, setup_django, summarize, timed
+
+ROOMS = 50
+SLOT = timedelta(hours=1)
+
+
+def seed(size):
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+
+    from core.models import Booking, Room
+
+    user = User.objects.create_user('bench')
+    rooms = Room.objects.bulk_create(
+        Room(name=f"Room {i}", type='Lecture', capacity=40) for i in range(ROOMS)
+    )
+
+    # Back-to-back hour slots per room, with a realistic status mix
+    origin = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(days=365)
+    statuses = ['approved'] * 6 + ['completed'] * 2 + ['pending', 'rejected']
+    per_room = size // ROOMS
+    batch = []
+    for room in rooms:
+        for slot in range(per_room):
+            start = origin + slot * SLOT * 2
+            batch.append(Booking(
+                user=user, room=room, start_time=start, end_time=start + SLOT,
+                purpose='bench', status=random.choice(statuses),
+            ))
+            if len(batch) >= 10_000:
+                Booking.objects.bulk_create(batch)
+                batch = []
+    Booking.objects.bulk_create(batch)
+    return rooms, origin, per_room
+
+
+def run(size, probes):
+    from core import availability
+
+    rooms, origin, per_room = seed(size)
+    span = per_room * SLOT * 2
+    windows = []
+    for _ in range(probes):
+        start = origin + timedelta(minutes=random.randrange(0, int(span.total_seconds() // 60), 30))
+        windows.append((random.choice(rooms), start, start + SLOT))
+
+    db_samples = [
+        timed(availability.find_conflict, room, start, end)[0]
+        for room, start, end in windows
+    ]
+
+    load_time, indexes = timed(
+        availability.load_room_indexes, [room.pk for room in rooms], origin, origin + span,
+    )
+    memory_samples = [
+        timed(indexes[room.pk].find_conflict, start, end)[0]
+        for room, start, end in windows
+    ]
+    return summarize(db_samples), summarize(memory_samples), load_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--probes', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    random.seed(42)
+    print(f"{'bookings':>10} | {'db p50':>9} {'db p99':>9} | {'mem p50':>9} {'mem p99':>9} | {'index load':>10}")
+    with scratch_database():
+        for size in args.sizes:
+            with rolled_back():
+                db, memory, load_time = run(size, args.probes)
+            print(
+                f"{size:>10} | {db['p50']:>7.1f}us {db['p99']:>7.1f}us | "
+                f"{memory['p50']:>7.2f}us {memory['p99']:>7.2f}us | {load_time * 1000:>8.1f}ms"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+# benchmarks/bench_export.py
+
+"""
+Peak memory and throughput of the booking export (core.export) at several
+table sizes. Peak memory should stay flat as the table grows: only one
+chunk of bookings is held at a time.
+
+    python -m benchmarks.bench_export [--sizes 10000 50000 100000] [--chunk-size 2000]
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from .common import rolled_back, scratch_database, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 50_000, 100_000])
+    parser.add_argument('--chunk-size', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    from core import export
+
+    from .datagen import generate
+
+    print(f"{'bookings':>9} {'format':>6} {'rows/s':>9} {'bytes':>12} {'peak mem':>9}")
+    with scratch_database():
+        for size in args.sizes:
+            with rolled_back():
+                generate(users=max(size // 50, 10), rooms=max(size // 500, 5), bookings=size)
+                for fmt in export.FORMATS:
+                    queryset = export.export_queryset()
+                    tracemalloc.start()
+                    started = time.perf_counter()
+                    written = 0
+                    for line in export.lines(export.rows(queryset, args.chunk_size), fmt):
+                        written += len(line)
+                    elapsed = time.perf_counter() - started
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    print(f"{size:>9} {fmt:>6} {size / elapsed:>9.0f} {written:>12} {peak / 1024:>7.0f}KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+# benchmarks/bench_import.py
+
+"""
+Throughput, query count and peak memory of the schedule import
+(core.importer) at several sizes. The schedule is produced by core.export
+from generated data, the bookings are wiped, and the file is loaded back.
+Queries should grow with the number of chunks, not rows; peak memory with
+the chunk size, not the file.
+
+    python -m benchmarks.bench_import [--sizes 10000 50000] [--chunk-size 2000]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from .common import rolled_back, scratch_database, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 50_000])
+    parser.add_argument('--chunk-size', type=int, default=2000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection, reset_queries
+    from django.test.utils import CaptureQueriesContext
+
+    from core import export, importer
+    from core.models import Booking
+
+    from .datagen import generate
+
+    print(f"{'bookings':>9} {'rows/s':>9} {'queries':>8} {'rejected':>9} {'peak mem':>9}")
+    with scratch_database(), tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'schedule.csv')
+        for size in args.sizes:
+            with rolled_back():
+                generate(users=max(size // 50, 10), rooms=max(size // 500, 5), bookings=size)
+                with open(path, 'w', newline='', encoding='utf-8') as handle:
+                    for line in export.lines(export.rows(export.export_queryset()), 'csv'):
+                        handle.write(line)
+                Booking.objects.all().delete()
+                reset_queries()  # the log is capped, so start from empty
+
+                tracemalloc.start()
+                started = time.perf_counter()
+                with open(path, newline='', encoding='utf-8') as handle, \
+                        CaptureQueriesContext(connection) as captured:
+                    result = importer.import_bookings(importer.read_records(handle, 'csv'), args.chunk_size)
+                elapsed = time.perf_counter() - started
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print(
+                    f"{size:>9} {size / elapsed:>9.0f} {len(captured):>8} {len(result.rejected):>9} "
+                    f"{peak / 1024:>7.0f}KB"
+                )
+
+
+if __name__ == '__main__':
+    main()
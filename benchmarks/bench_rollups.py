@@ -0,0 +1,75 @@
+# benchmarks/bench_rollups.py
+
+"""
+Semester utilization report (core.rollups) read from the rollup tables vs
+computed ad hoc from the bookings table, at several table sizes. Also times
+the nightly reconciliation that rebuilds the window.
+
+    python -m benchmarks.bench_rollups [--sizes 10000 50000 100000] [--days 120] [--repeat 5]
+"""
+
+import argparse
+import statistics
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from .common import rolled_back, scratch_database, setup_django
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 50_000, 100_000])
+    parser.add_argument('--days', type=int, default=120, help="Length of the reported window (a semester).")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.utils import timezone
+
+    from core import rollups
+    from core.models import Booking
+
+    from .datagen import generate
+
+    def ad_hoc(first_day, last_day):
+        # What the report would cost without rollups: scan and bucket bookings
+        start, end = rollups._local_bounds(first_day, last_day)
+        hourly = defaultdict(lambda: [0, 0, 0])
+        for room_id, status, start_time, end_time in Booking.objects.filter(
+            status__in=rollups.REQUESTED_STATUSES, start_time__lt=end, end_time__gt=start,
+        ).values_list('room_id', 'status', 'start_time', 'end_time').iterator(chunk_size=2000):
+            rollups._add(hourly, room_id, status, start_time, end_time)
+        return rollups._daily(hourly)
+
+    def report(first_day, last_day):
+        rollups.utilization(first_day, last_day, group='week')
+        rollups.top_slots(first_day, last_day)
+
+    last_day = timezone.localdate()
+    first_day = last_day - timedelta(days=args.days - 1)
+    print(f"{'bookings':>9} {'reconcile':>10} {'ad hoc':>9} {'rollups':>9} {'speedup':>8}")
+    with scratch_database():
+        for size in args.sizes:
+            with rolled_back():
+                generate(users=max(size // 50, 10), rooms=max(size // 500, 5), bookings=size)
+                reconcile_ms = timed(lambda: rollups.reconcile(first_day, last_day), 1)
+                ad_hoc_ms = timed(lambda: ad_hoc(first_day, last_day), args.repeat)
+                report_ms = timed(lambda: report(first_day, last_day), args.repeat)
+                print(
+                    f"{size:>9} {reconcile_ms:>8.0f}ms {ad_hoc_ms:>7.1f}ms {report_ms:>7.1f}ms "
+                    f"{ad_hoc_ms / report_ms:>7.0f}x"
+                )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+# benchmarks/bench_views.py
+
+"""
+Queries-per-request, latency and memory for the core views at several sizes.
+
+For each data size this seeds a scratch database (benchmarks.datagen) and
+drives the views through Django's test client:
+
+    dashboard               DashboardView (the busiest student)
+    admin_approval_list     AdminApprovalListView
+    create_booking          BookingCreateView (POST)
+    update_booking_status   BookingStatusUpdateView (approve a pending booking)
+
+Every view is measured twice: cold (the caches are cleared before each
+request, so fragment and grid misses are paid every time) and warm (the
+steady state, budgeted as "<view>:warm"). Exits with status 1 if any view runs
+more queries than its budget in benchmarks/query_budgets.json. After an
+intended change, re-record with --record.
+
+    python -m benchmarks.bench_views [--sizes 1000 10000 100000] [--requests 50]
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from datetime import timedelta
+from pathlib import Path
+
+from .common import rolled_back, scratch_database, setup_django, summarize
+
+BUDGETS_FILE = Path(__file__).with_name('query_budgets.json')
+
+
+def scenarios(data):
+    """
+    Yields (name, user, callable(client, iteration) -> response).
+    """
+    from django.db.models import Count
+    from django.urls import reverse
+    from django.utils import timezone
+
+    from core.models import Booking
+
+    busiest = (
+        Booking.objects.values('user').annotate(total=Count('id')).order_by('-total').first()
+    )
+    student = next(user for user in data.users if user.pk == busiest['user'])
+    pending = list(Booking.objects.filter(status='pending').values_list('pk', flat=True))
+    origin = timezone.localtime() + timedelta(days=400)
+
+    def dashboard(client, i):
+        return client.get(reverse('dashboard'))
+
+    def admin_list(client, i):
+        return client.get(reverse('admin_approval_list'))
+
+    def create(client, i):
+        start = origin + timedelta(hours=3 * i)
+        return client.post(reverse('create_booking'), {
+            'room': data.rooms[i % len(data.rooms)].pk,
+            'start_time': start.strftime('%Y-%m-%dT%H:%M'),
+            'end_time': (start + timedelta(hours=1)).strftime('%Y-%m-%dT%H:%M'),
+            'purpose': 'Benchmark',
+            'equipment': [data.equipment[0].pk],
+        })
+
+    def approve(client, i):
+        return client.get(reverse('update_booking_status', args=[pending[i % len(pending)], 'approved']))
+
+    yield 'dashboard', student, dashboard
+    yield 'admin_approval_list', data.staff, admin_list
+    yield 'create_booking', student, create
+    yield 'update_booking_status', data.staff, approve
+
+
+def clear_caches():
+    from django.core.cache import caches
+
+    for alias in ('default', 'fragments'):
+        caches[alias].clear()
+
+
+def measure(user, request, repeat, cold=True, first=1):
+    """
+    Runs `request` for iterations first..first+repeat-1 and returns the worst
+    query count, the latency summary and peak memory. cold=True clears the
+    caches before every measured request.
+    """
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    client = Client()
+    client.force_login(user)
+    request(client, first - 1)  # warm-up (template loading, caches)
+
+    latencies, queries = [], 0
+    tracemalloc.start()
+    for i in range(first, first + repeat):
+        if cold:
+            clear_caches()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = request(client, i)
+            latencies.append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{response.status_code} from {response.request['PATH_INFO']}")
+        queries = max(queries, len(captured))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return queries, summarize(latencies), peak
+
+
+def measure_both(user, request, repeat):
+    """
+    Yields (budget name suffix, measure() result) for the cold and warm runs.
+    The warm run uses later iterations, so it doesn't redo the cold run's writes.
+    """
+    yield '', measure(user, request, repeat, cold=True)
+    yield ':warm', measure(user, request, repeat, cold=False, first=repeat + 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--record', action='store_true', help="Write the measured counts as the new budgets.")
+    args = parser.parse_args()
+
+    setup_django()
+    from benchmarks import datagen
+
+    budgets = json.loads(BUDGETS_FILE.read_text())
+    worst = {}
+    over_budget = []
+
+    print(f"{'bookings':>9}  {'view':<27} {'queries':>7} {'budget':>6} {'p50':>9} {'p99':>9} {'peak mem':>9}")
+    with scratch_database():
+        for size in args.sizes:
+            with rolled_back():
+                # Cached versions are keyed by pk, and pks repeat after the rollback
+                clear_caches()
+                data = datagen.generate(users=max(size // 50, 10), rooms=max(size // 500, 5), bookings=size)
+                for view, user, request in scenarios(data):
+                    for suffix, (queries, latency, peak) in measure_both(user, request, args.requests):
+                        name = view + suffix
+                        worst[name] = max(worst.get(name, 0), queries)
+                        budget = budgets.get(name)
+                        flag = ''
+                        if budget is not None and queries > budget:
+                            over_budget.append((size, name, queries, budget))
+                            flag = '  OVER BUDGET'
+                        print(
+                            f"{size:>9}  {name:<27} {queries:>7} {budget if budget is not None else '-':>6} "
+                            f"{latency['p50'] / 1000:>7.1f}ms {latency['p99'] / 1000:>7.1f}ms "
+                            f"{peak / 1024:>7.0f}KB{flag}"
+                        )
+
+    if args.record:
+        BUDGETS_FILE.write_text(json.dumps(worst, indent=4) + '\n')
+        print(f"Recorded budgets to {BUDGETS_FILE}")
+        return 0
+
+    for size, name, queries, budget in over_budget:
+        print(f"FAIL: {name} ran {queries} queries at {size} bookings (budget {budget})", file=sys.stderr)
+    return 1 if over_budget else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+# benchmarks/common.py
+
+"""
+Shared plumbing for the benchmark scripts.
+
+Every script runs against a throwaway test database (in-memory for SQLite),
+never against db.sqlite3. Run them from the project root, e.g.
+
+    python -m benchmarks.bench_availability
+"""
+
+import os
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import django
+
+
+def setup_django():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cvsureserve.settings')
+    # One process on a scratch database: a shared (file) cache would hand
+    # this run entries left over from the last one, keyed by the same pks
+    os.environ.setdefault('CACHE_BACKEND', 'locmem')
+    django.setup()
+
+
+@contextmanager
+def scratch_database(file_backed=False):
+    """
+    Creates (and afterwards destroys) a migrated test database.
+
+    SQLite test databases are in-memory by default; pass file_backed=True for
+    multi-threaded runs so journaling and locking behave like production.
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    if file_backed and connection.vendor == 'sqlite':
+        path = Path(tempfile.gettempdir()) / 'cvsureserve_bench.sqlite3'
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = str(path)
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+@contextmanager
+def rolled_back():
+    """
+    Runs a block inside a transaction that is always rolled back, so several
+    data sizes can be measured one after another on the same scratch database.
+    """
+    from django.db import transaction
+
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples):
+    """
+    Latency summary in microseconds.
+    """
+    micros = [sample * 1_000_000 for sample in samples]
+    return {
+        'p50': percentile(micros, 50),
+        'p99': percentile(micros, 99),
+        'mean': statistics.fmean(micros) if micros else 0.0,
+    }
+
+
+def timed(func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - started, result
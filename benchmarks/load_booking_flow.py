@@ -0,0 +1,120 @@
+# benchmarks/load_booking_flow.py
+
+"""
+Concurrent load test of the booking flow against the configured database.
+
+Each worker thread logs in as its own student and loops: submit a booking
+(BookingCreateView), then open the dashboard (DashboardView). Run it once per
+database setup and compare the numbers:
+
+    python -m benchmarks.load_booking_flow                         # SQLite, WAL
+    SQLITE_JOURNAL_MODE=DELETE python -m benchmarks.load_booking_flow
+    DATABASE_BACKEND=postgres python -m benchmarks.load_booking_flow
+"""
+
+import argparse
+import threading
+import time
+from datetime import timedelta
+
+from .common import scratch_database, setup_django, summarize
+
+
+def seed(threads, rooms):
+    from django.contrib.auth.models import User
+
+    from core.models import Room
+
+    users = [User.objects.create_user(f"load{i}", password='load-test-pass') for i in range(threads)]
+    room_ids = [
+        room.pk for room in Room.objects.bulk_create(
+            Room(name=f"Room {i}", type='Lecture', capacity=40) for i in range(rooms)
+        )
+    ]
+    return users, room_ids
+
+
+def worker(number, user, room_ids, deadline, results, lock):
+    from django.db import DatabaseError, connections
+    from django.test import Client
+    from django.urls import reverse
+    from django.utils import timezone
+
+    client = Client()
+    client.force_login(user)
+    origin = timezone.localtime() + timedelta(days=30)
+    latencies, errors, iteration = [], 0, 0
+
+    while time.perf_counter() < deadline:
+        # Every worker books its own slots, so failures are lock errors, not conflicts
+        start = origin + timedelta(hours=iteration * len(results['users']) + number)
+        payload = {
+            'room': room_ids[iteration % len(room_ids)],
+            'start_time': start.strftime('%Y-%m-%dT%H:%M'),
+            'end_time': (start + timedelta(minutes=50)).strftime('%Y-%m-%dT%H:%M'),
+            'purpose': 'Load test',
+        }
+        for method, url, data in (
+            ('post', reverse('create_booking'), payload),
+            ('get', reverse('dashboard'), None),
+        ):
+            started = time.perf_counter()
+            try:
+                response = getattr(client, method)(url, data)
+                if response.status_code >= 400:
+                    errors += 1
+            except DatabaseError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+        iteration += 1
+
+    connections.close_all()
+    with lock:
+        results['latencies'].extend(latencies)
+        results['errors'] += errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--rooms', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=15)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+
+    with scratch_database(file_backed=True):
+        users, room_ids = seed(args.threads, args.rooms)
+        mode = connection.vendor
+        if mode == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                mode += f" ({cursor.fetchone()[0]})"
+        connection.close()
+
+        results = {'users': users, 'latencies': [], 'errors': 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + args.seconds
+        threads = [
+            threading.Thread(target=worker, args=(i, user, room_ids, deadline, results, lock))
+            for i, user in enumerate(users)
+        ]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+    latency = summarize(results['latencies'])
+    total = len(results['latencies'])
+    print(f"backend:     {mode}")
+    print(f"threads:     {args.threads}")
+    print(f"requests:    {total} in {elapsed:.1f}s ({total / elapsed:.1f} req/s)")
+    print(f"latency:     p50 {latency['p50'] / 1000:.1f}ms, p99 {latency['p99'] / 1000:.1f}ms")
+    print(f"errors:      {results['errors']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+# benchmarks/stress_admission.py
+
+"""
+Concurrency stress test for core.admission.
+
+Every round, all worker threads line up on a barrier and then race for the
+SAME room and slot, two ways:
+
+    book      each thread submits a BookingForm through admission.save_booking
+    approve   each thread approves a different one of several overlapping
+              pending requests through decisions.decide_bookings
+
+After each round the slot must hold at most one booking / one approval. Any
+double booking is printed and the script exits with status 1.
+
+    python -m benchmarks.stress_admission [--threads 8] [--rounds 20]
+    DATABASE_BACKEND=postgres python -m benchmarks.stress_admission
+"""
+
+import argparse
+import sys
+import threading
+from datetime import timedelta
+
+from .common import scratch_database, setup_django
+
+
+def seed(threads):
+    from django.contrib.auth.models import User
+
+    from core.models import Room
+
+    users = [User.objects.create_user(f"stress{i}", password='stress-test-pass') for i in range(threads)]
+    staff = User.objects.create_user('stress-staff', password='stress-test-pass', is_staff=True)
+    room = Room.objects.create(name='Contested Room', type='Lecture', capacity=40)
+    return users, staff, room
+
+
+def race(targets):
+    """
+    Runs every callable in its own thread, all released at the same moment.
+    Returns a Counter of outcomes ('ok', 'rejected', 'busy', ...).
+    """
+    from collections import Counter
+
+    from django.db import connections
+
+    barrier = threading.Barrier(len(targets))
+    outcomes = Counter()
+    lock = threading.Lock()
+
+    def run(target):
+        barrier.wait()
+        try:
+            outcome = target()
+        except Exception as exc:  # anything unexpected is reported, not swallowed
+            outcome = type(exc).__name__
+        finally:
+            connections.close_all()
+        with lock:
+            outcomes[outcome] += 1
+
+    threads = [threading.Thread(target=run, args=(target,)) for target in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+
+def book_round(users, room, start, end):
+    from django.core.exceptions import ValidationError
+
+    from core import admission
+    from core.forms import BookingForm
+
+    payload = {
+        'room': room.pk,
+        'start_time': start.strftime('%Y-%m-%dT%H:%M'),
+        'end_time': end.strftime('%Y-%m-%dT%H:%M'),
+        'purpose': 'Stress test',
+    }
+
+    def attempt(user):
+        form = BookingForm(data=payload, defer_conflict_check=True)
+        if not form.is_valid():
+            return 'invalid'
+        form.instance.user = user
+        try:
+            admission.save_booking(form)
+        except ValidationError:
+            return 'rejected'
+        except admission.AdmissionBusy:
+            return 'busy'
+        return 'ok'
+
+    return race([lambda user=user: attempt(user) for user in users])
+
+
+def approve_round(users, room, start, end):
+    from core.decisions import decide_bookings
+    from core.models import Booking
+
+    # Overlapping pending requests can't come through the form, so write them directly
+    pending = Booking.objects.bulk_create(
+        Booking(user=user, room=room, start_time=start + timedelta(minutes=i), end_time=end, purpose='Stress test')
+        for i, user in enumerate(users)
+    )
+
+    def attempt(booking):
+        result = decide_bookings([booking.pk], 'approved', notify=False)
+        return 'ok' if result.updated else 'rejected'
+
+    return race([lambda booking=booking: attempt(booking) for booking in pending])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django.utils import timezone
+
+    from core import availability
+    from core.models import Booking
+
+    failures = []
+    with scratch_database(file_backed=True):
+        users, staff, room = seed(args.threads)
+        connection.close()
+        origin = timezone.localtime().replace(minute=0, second=0, microsecond=0) + timedelta(days=30)
+
+        for mode, run_round, statuses in (
+            ('book', book_round, availability.BLOCKING_STATUSES),
+            ('approve', approve_round, ('approved',)),
+        ):
+            totals = {}
+            for number in range(args.rounds):
+                start = origin + timedelta(days=number, hours=8 if mode == 'book' else 14)
+                end = start + timedelta(hours=1)
+                for outcome, count in run_round(users, room, start, end).items():
+                    totals[outcome] = totals.get(outcome, 0) + count
+                winners = Booking.objects.filter(
+                    room=room, status__in=statuses, start_time__lt=end, end_time__gt=start,
+                ).count()
+                if winners > 1:
+                    failures.append(f"{mode} round {number}: {winners} bookings hold the slot")
+            print(f"{mode:8} {connection.vendor}: " + ", ".join(f"{k}={v}" for k, v in sorted(totals.items())))
+
+    for failure in failures:
+        print(f"DOUBLE BOOKING  {failure}")
+    if failures:
+        sys.exit(1)
+    print("no double bookings")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,190 @@
-from django.contrib import admin
-from .models import Profile, Room, Equipment, Booking, Notification
-
-admin.site.register(Profile)
-admin.site.register(Room)
-admin.site.register(Equipment)
-admin.site.register(Booking)
-admin.site.register(Notification)
\ No newline at end of file
+# core/admin.py
+
+"""
+Django admin, tuned for big booking and notification tables.
+
+A Booking changelist page costs a fixed number of queries however many rows
+the table has:
+
+    1 SELECT  the capped count (EstimatedCountPaginator, no full COUNT(*)),
+              plus MAX(id) once an unfiltered list passes the cap
+    1 SELECT  the page, with user and room joined (list_select_related)
+    1 SELECT  the rooms for the room filter
+
+Every filter maps onto an index: status -> booking_status_start_idx,
+room -> booking_room_avail_idx, "When" -> booking_start_idx, which also
+gives the default newest-first order. Search resolves the term against the
+small user and room tables first (an all-digit term matches the booking
+id or a username prefix), then filters bookings by id. Bulk
+approve/reject goes through decide_bookings() (one transaction, conflicts
+checked, notifications sent) instead of one save() per row.
+"""
+
+from datetime import timedelta
+
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import PAGE_VAR
+from django.contrib.auth.models import User
+from django.db.models import Q
+from django.utils import timezone
+
+from . import notifications
+from .decisions import decide_bookings
+from .models import Booking, Equipment, Notification, Profile, Room
+from .pagination import EstimatedCountPaginator
+
+SEARCH_MATCH_LIMIT = 200  # users/rooms a search term may expand to
+
+
+class EstimatedCountMixin:
+    """
+    Changelists paged by EstimatedCountPaginator, told which page is asked for.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False  # the second count would be over the whole table
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        try:
+            page = max(int(request.GET.get(PAGE_VAR, 1)), 1)
+        except ValueError:
+            page = 1
+        return self.paginator(queryset, per_page, orphans, allow_empty_first_page, page=page)
+
+
+class StartTimeFilter(admin.SimpleListFilter):
+    """
+    A few fixed ranges on start_time, instead of date_hierarchy (which runs a
+    DISTINCT over the dates of every matching row to draw its links).
+    """
+
+    title = "when"
+    parameter_name = 'when'
+
+    def lookups(self, request, model_admin):
+        return (
+            ('today', "Today"),
+            ('week', "Next 7 days"),
+            ('upcoming', "Upcoming"),
+            ('month', "Past 30 days"),
+            ('past', "Past"),
+        )
+
+    def queryset(self, request, queryset):
+        now = timezone.now()
+        today = timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0)
+        ranges = {
+            'today': (today, today + timedelta(days=1)),
+            'week': (now, now + timedelta(days=7)),
+            'upcoming': (now, None),
+            'month': (now - timedelta(days=30), now),
+            'past': (None, now),
+        }
+        if self.value() not in ranges:
+            return queryset
+        start, end = ranges[self.value()]
+        if start is not None:
+            queryset = queryset.filter(start_time__gte=start)
+        if end is not None:
+            queryset = queryset.filter(start_time__lt=end)
+        return queryset
+
+
+@admin.register(Booking)
+class BookingAdmin(EstimatedCountMixin, admin.ModelAdmin):
+    list_display = ('id', 'user', 'room', 'start_time', 'end_time', 'status', 'purpose')
+    list_select_related = ('user', 'room')
+    list_filter = ('status', StartTimeFilter, 'room')
+    ordering = ('-start_time',)
+    search_fields = ('user__username', 'room__name')
+    search_help_text = "Booking id, username (prefix) or room name"
+    raw_id_fields = ('user', 'room', 'series')
+    actions = ('approve_selected', 'reject_selected')
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        # Two small lookups, then plain id filters the booking indexes can serve,
+        # instead of LIKE over a join on every booking
+        user_ids = list(
+            User.objects.filter(username__istartswith=term).values_list('pk', flat=True)[:SEARCH_MATCH_LIMIT]
+        )
+        if term.isdigit():
+            # A booking id, or a student number (usernames can be all digits)
+            return queryset.filter(Q(pk=int(term)) | Q(user_id__in=user_ids)), False
+        room_ids = list(Room.objects.filter(name__icontains=term).values_list('pk', flat=True)[:SEARCH_MATCH_LIMIT])
+        return queryset.filter(Q(user_id__in=user_ids) | Q(room_id__in=room_ids)), False
+
+    def _decide(self, request, queryset, new_status):
+        result = decide_bookings(queryset.values_list('pk', flat=True), new_status)
+        self.message_user(request, f"{len(result.updated)} booking(s) {new_status}.", messages.SUCCESS)
+        if result.conflicts:
+            self.message_user(
+                request,
+                f"{len(result.conflicts)} booking(s) left as they were: the room is already booked "
+                f"({', '.join(str(booking.pk) for booking in result.conflicts)}).",
+                messages.WARNING,
+            )
+        if result.skipped:
+            self.message_user(
+                request, f"{len(result.skipped)} booking(s) skipped: already cancelled, completed or decided.",
+                messages.WARNING,
+            )
+
+    @admin.action(description="Approve selected bookings", permissions=['change'])
+    def approve_selected(self, request, queryset):
+        self._decide(request, queryset, 'approved')
+
+    @admin.action(description="Reject selected bookings", permissions=['change'])
+    def reject_selected(self, request, queryset):
+        self._decide(request, queryset, 'rejected')
+
+
+@admin.register(Notification)
+class NotificationAdmin(EstimatedCountMixin, admin.ModelAdmin):
+    list_display = ('id', 'user', 'message', 'is_read', 'created_at')
+    list_select_related = ('user',)
+    list_filter = ('is_read',)
+    ordering = ('-pk',)  # creation order, straight off the primary key
+    raw_id_fields = ('user',)
+    # Changed through the actions below, which keep the unread counters right
+    readonly_fields = ('is_read',)
+    actions = ('mark_read',)
+
+    @admin.action(description="Mark selected notifications as read", permissions=['change'])
+    def mark_read(self, request, queryset):
+        changed = notifications.mark_read_many(queryset.values_list('pk', flat=True))
+        self.message_user(request, f"{changed} notification(s) marked as read.", messages.SUCCESS)
+
+    # Adding and deleting go through core.notifications too, or the counters drift
+    def has_add_permission(self, request):
+        return False
+
+    def delete_model(self, request, obj):
+        notifications.delete_many([obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        notifications.delete_many(queryset.values_list('pk', flat=True))
+
+
+@admin.register(Profile)
+class ProfileAdmin(admin.ModelAdmin):
+    list_display = ('user', 'role', 'department')
+    list_select_related = ('user',)
+    list_filter = ('role',)
+    search_fields = ('user__username', 'department')
+    raw_id_fields = ('user',)
+
+
+@admin.register(Room)
+class RoomAdmin(admin.ModelAdmin):
+    list_display = ('name', 'type', 'capacity', 'is_active')
+    list_filter = ('is_active', 'type')
+    search_fields = ('name',)
+
+
+@admin.register(Equipment)
+class EquipmentAdmin(admin.ModelAdmin):
+    list_display = ('name', 'total_quantity')
+    search_fields = ('name',)
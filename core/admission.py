@@ -0,0 +1,146 @@
+# core/admission.py
+
+"""
+Serialized booking admission.
+
+Checking for a free slot and then inserting is only safe if nobody else can
+admit a booking for the same room in between. Every write that can create
+or approve a booking therefore runs inside `admitted(room_ids)`:
+
+* PostgreSQL: the Room rows are locked with SELECT ... FOR UPDATE (in id order,
+  so two transactions can never deadlock on each other). Bookings for
+  different rooms don't wait on each other. Equipment is shared by all rooms,
+  so a booking that lists items also locks those Equipment rows (after the
+  rooms, again in id order) before counting free units.
+* SQLite: there are no row locks, but the connection runs transactions in
+  IMMEDIATE mode (see settings), so the write lock is taken at BEGIN and
+  admissions are serialized database-wide.
+
+Transactions are kept short and retried a bounded number of times with
+jittered backoff if the database reports a lock timeout or deadlock. On
+PostgreSQL a lock wait is cut off after LOCK_TIMEOUT_MS (SET LOCAL
+lock_timeout), otherwise it would wait forever and never reach the retry.
+"""
+
+import random
+import time
+
+from django.core.exceptions import ValidationError
+from django.db import OperationalError, connection, transaction
+
+from . import availability
+from .models import Equipment, Room
+
+MAX_ATTEMPTS = 4
+BASE_BACKOFF = 0.05  # seconds, doubled on every retry
+LOCK_TIMEOUT_MS = 2000  # longest one attempt waits for a row lock (PostgreSQL)
+
+
+class AdmissionBusy(Exception):
+    """
+    Raised when the room stayed locked for every retry.
+    """
+
+
+def _lock(model, ids):
+    if not connection.features.has_select_for_update:
+        # SQLite: the IMMEDIATE transaction already holds the database write lock
+        return []
+    if connection.vendor == 'postgresql':
+        # A timed-out wait raises OperationalError, which run_with_retry retries
+        with connection.cursor() as cursor:
+            cursor.execute(f"SET LOCAL lock_timeout = '{int(LOCK_TIMEOUT_MS)}ms'")
+    return list(
+        model.objects.select_for_update()
+        .filter(pk__in=set(ids))
+        .order_by('pk')
+        .values_list('pk', flat=True)
+    )
+
+
+def lock_rooms(room_ids):
+    """
+    Locks the given Room rows until the current transaction ends.
+    """
+    return _lock(Room, room_ids)
+
+
+def lock_equipment(equipment_ids):
+    """
+    Locks the given Equipment rows. Take the room locks first.
+    """
+    return _lock(Equipment, equipment_ids)
+
+
+def run_with_retry(operation):
+    """
+    Runs `operation()` in a short transaction, retrying on lock timeouts and
+    deadlocks. `operation` must be safe to run again from scratch.
+    """
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return operation()
+        except OperationalError:
+            if attempt == MAX_ATTEMPTS - 1:
+                raise AdmissionBusy("The room is busy, please try again.")
+            time.sleep(BASE_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+
+def admitted(room_ids, operation):
+    """
+    Runs `operation()` while holding the locks of `room_ids`.
+    """
+    def locked():
+        lock_rooms(room_ids)
+        return operation()
+
+    return run_with_retry(locked)
+
+
+def save_booking(form):
+    """
+    Saves a validated BookingForm, checking the slot (and the equipment
+    stock) under the locks. This is the authoritative conflict probe for the
+    booking views (their forms are built with defer_conflict_check=True).
+    """
+    from .forms import equipment_taken, slot_taken
+
+    booking = form.instance
+    equipment = form.cleaned_data.get('equipment')
+
+    def operation():
+        conflict = availability.find_conflict(
+            booking.room_id, booking.start_time, booking.end_time, exclude_id=booking.pk,
+        )
+        if conflict:
+            raise slot_taken(booking.room, booking.start_time, booking.end_time, exclude_id=booking.pk)
+        if equipment:
+            # The form counted units before any lock: count again under it
+            lock_equipment(item.pk for item in equipment)
+            error = equipment_taken(equipment, booking.start_time, booking.end_time, exclude_id=booking.pk)
+            if error:
+                raise error
+        availability.mark_checked(booking, booking.room, booking.start_time, booking.end_time)
+        return form.save()
+
+    return admitted([booking.room_id], operation)
+
+
+def save_series(form):
+    """
+    Same as save_booking() for a BookingSeriesForm: every date is re-checked
+    under the room lock, then the series and its bookings are written.
+    """
+    from . import recurrence
+
+    series = form.instance
+
+    def operation():
+        if recurrence.find_conflicts(series.room, form.windows):
+            raise ValidationError(f"Sorry, {series.room.name} was just booked on one of these dates.")
+        saved = form.save()
+        recurrence.create_occurrences(saved, form.windows)
+        return saved
+
+    return admitted([series.room_id], operation)
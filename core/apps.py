@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        # Connect the booking change hooks
+        from . import signals  # noqa: F401
+        # Register the system checks
+        from . import checks  # noqa: F401
@@ -0,0 +1,159 @@
+# core/availability.py
+
+"""
+Availability engine for room bookings.
+
+Both BookingForm.clean and Booking.clean ask the same question ("is this
+room free between start and end?"), so the answer lives here.
+
+* On the database side the probe is backed by the composite index
+  (room, status, start_time, end_time) declared on Booking.Meta, and the
+  query only ever touches that index (it is covering for the probe).
+* In memory, RoomIntervalIndex keeps one room's bookings sorted by start
+  time together with a running max of end times, so "does anything overlap
+  [start, end)?" is two binary searches. Batch callers load the index once
+  and then probe as many windows as they like without going back to the DB.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+
+from django.db.models import Q
+
+# Statuses that keep a room occupied. Rejected/cancelled bookings free the slot.
+BLOCKING_STATUSES = ('pending', 'approved', 'completed')
+
+
+class RoomIntervalIndex:
+    """
+    Sorted interval list for a single room.
+
+    Intervals are half-open [start, end). `_max_end[i]` is the largest end
+    time among the first i+1 intervals, which is what makes the overlap probe
+    O(log n): an interval overlaps [start, end) iff it starts before `end`
+    and finishes after `start`.
+    """
+
+    def __init__(self, intervals=()):
+        self._rows = sorted(intervals)  # (start, end, booking_id)
+        self._starts = [row[0] for row in self._rows]
+        self._max_end = []
+        self._rebuild_from(0)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _rebuild_from(self, position):
+        del self._max_end[position:]
+        running = self._max_end[-1] if self._max_end else None
+        for start, end, _ in self._rows[position:]:
+            running = end if running is None or end > running else running
+            self._max_end.append(running)
+
+    def add(self, start, end, booking_id):
+        row = (start, end, booking_id)
+        position = bisect_right(self._rows, row)
+        insort(self._rows, row)
+        self._starts.insert(position, start)
+        self._rebuild_from(position)
+
+    def remove(self, booking_id):
+        for position, row in enumerate(self._rows):
+            if row[2] == booking_id:
+                del self._rows[position]
+                del self._starts[position]
+                self._rebuild_from(position)
+                return True
+        return False
+
+    def find_conflict(self, start, end, exclude_id=None):
+        """
+        Returns the id of a booking overlapping [start, end), or None.
+        """
+        # Only intervals that start before `end` can overlap.
+        limit = bisect_left(self._starts, end)
+        if not limit or self._max_end[limit - 1] <= start:
+            return None
+
+        # First position whose running max passes `start` is itself an overlap.
+        first = bisect_right(self._max_end, start, 0, limit)
+        if self._rows[first][2] != exclude_id:
+            return self._rows[first][2]
+
+        # Rare case (editing a booking): skip ourselves and keep looking.
+        for row_start, row_end, booking_id in self._rows[first + 1:limit]:
+            if row_end > start and booking_id != exclude_id:
+                return booking_id
+        return None
+
+    def overlapping(self, start, end):
+        """
+        Yields (start, end, booking_id) for every interval overlapping [start, end).
+        """
+        limit = bisect_left(self._starts, end)
+        first = bisect_right(self._max_end, start, 0, limit)
+        for row in self._rows[first:limit]:
+            if row[1] > start:
+                yield row
+
+
+def overlap_filter(start_time, end_time):
+    """
+    (start < request_end) AND (end > request_start)
+    """
+    return Q(start_time__lt=end_time, end_time__gt=start_time)
+
+
+def find_conflict(room, start_time, end_time, statuses=BLOCKING_STATUSES, exclude_id=None):
+    """
+    Single indexed probe. Returns the id of an overlapping booking or None.
+    """
+    from .models import Booking
+
+    queryset = Booking.objects.filter(
+        overlap_filter(start_time, end_time),
+        room=room,
+        status__in=statuses,
+    )
+    if exclude_id:
+        queryset = queryset.exclude(pk=exclude_id)
+
+    match = list(queryset.values_list('pk', flat=True)[:1])
+    return match[0] if match else None
+
+
+def load_room_indexes(room_ids, start_time, end_time, statuses=BLOCKING_STATUSES):
+    """
+    Builds a RoomIntervalIndex per room with ONE query over the window.
+
+    Only bookings that overlap [start_time, end_time) are loaded, so callers
+    should pass the full span of the windows they are going to probe.
+    """
+    from .models import Booking
+
+    rows = Booking.objects.filter(
+        overlap_filter(start_time, end_time),
+        room_id__in=room_ids,
+        status__in=statuses,
+    ).values_list('room_id', 'start_time', 'end_time', 'pk')
+
+    grouped = {room_id: [] for room_id in room_ids}
+    for room_id, start, end, booking_id in rows:
+        grouped[room_id].append((start, end, booking_id))
+    return {room_id: RoomIntervalIndex(intervals) for room_id, intervals in grouped.items()}
+
+
+# ---------------------------------------------------------
+# Skipping the duplicate probe on save
+# ---------------------------------------------------------
+# BookingForm.clean already probes every blocking status (a superset of the
+# 'approved' check in Booking.clean). It stamps the instance with the window it
+# verified so the model's clean()/save() don't run the same query again. Any
+# change to room or times after the stamp invalidates it.
+
+def mark_checked(booking, room, start_time, end_time):
+    booking._availability_checked = (room.pk, start_time, end_time)
+
+
+def is_checked(booking):
+    stamp = getattr(booking, '_availability_checked', None)
+    return stamp is not None and stamp == (booking.room_id, booking.start_time, booking.end_time)
@@ -0,0 +1,35 @@
+# core/checks.py
+
+"""
+System checks for settings that are only wrong once there is more than one
+worker process.
+"""
+
+import os
+
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Caches whose version tokens and invalidations every worker has to see
+SHARED_CACHES = ('default', 'fragments')
+
+
+@register()
+def shared_caches_check(app_configs, **kwargs):
+    """
+    A per-process cache with several workers means a booking change is only
+    seen by the worker that made it; the others keep serving stale tables,
+    grids, roles and calendar feeds.
+    """
+    workers = int(os.environ.get('WEB_CONCURRENCY', 1) or 1)
+    if workers <= 1:
+        return []
+    return [
+        Error(
+            f"CACHES[{alias!r}] is per process (LocMemCache) but WEB_CONCURRENCY={workers}.",
+            hint="Set CACHE_BACKEND to file, redis or memcached (see settings.CACHES).",
+            id='core.E001',
+        )
+        for alias in SHARED_CACHES
+        if settings.CACHES.get(alias, {}).get('BACKEND', '').endswith('LocMemCache')
+    ]
@@ -0,0 +1,128 @@
+# core/decisions.py
+
+"""
+Approve / reject bookings in bulk.
+
+Every admin decision goes through decide_bookings(), whether it is one click
+on the approval page or a few hundred IDs posted to the bulk endpoint. The
+cost is fixed no matter how many bookings are decided:
+
+    1 SELECT  the bookings (with their rooms)
+    1 SELECT  ... FOR UPDATE on those rooms (approvals only, see core.admission)
+    1 SELECT  the approved bookings they could collide with
+    1 UPDATE  (bulk_update of the statuses)
+    1 INSERT  (bulk_create of the notifications) + unread counter upkeep
+"""
+
+from dataclasses import dataclass, field
+
+from . import admission, availability, notifications
+from .models import Booking
+from .signals import bookings_changed
+
+DECISION_STATUSES = ('approved', 'rejected')
+# Statuses a booking may be decided from: approve a request, reject a request
+# or revoke an approval. Cancelled, completed and decided bookings stay put.
+DECIDABLE_FROM = {
+    'approved': ('pending',),
+    'rejected': ('pending', 'approved'),
+}
+
+
+@dataclass
+class DecisionResult:
+    updated: list = field(default_factory=list)
+    conflicts: list = field(default_factory=list)
+    missing: list = field(default_factory=list)
+    skipped: list = field(default_factory=list)  # in a status this decision can't change
+
+
+def decide_bookings(booking_ids, new_status, notify=True):
+    """
+    Sets `new_status` on every booking in `booking_ids` in one transaction.
+    Approvals hold the room locks (core.admission) while they check and write.
+
+    Approvals are checked against the approved schedule AND against each other
+    in a single sweep; a booking that would double-book its room is left as is
+    and reported in `conflicts`. Only the moves in DECIDABLE_FROM are made;
+    other bookings are reported in `skipped`. Pass notify=False when the
+    caller sends its own (e.g. one message for a whole series).
+    """
+    if new_status not in DECISION_STATUSES:
+        raise ValueError(f"Unsupported decision: {new_status!r}")
+
+    booking_ids = {int(pk) for pk in booking_ids}
+
+    def operation():
+        result = DecisionResult()
+        bookings = list(
+            Booking.objects.select_related('room').filter(pk__in=booking_ids).order_by('start_time', 'pk')
+        )
+        result.missing = sorted(booking_ids - {booking.pk for booking in bookings})
+        result.skipped = [booking for booking in bookings if booking.status not in DECIDABLE_FROM[new_status]]
+        bookings = [booking for booking in bookings if booking.status in DECIDABLE_FROM[new_status]]
+
+        if new_status == 'approved':
+            # Nobody else may approve into these rooms until we commit
+            admission.lock_rooms({booking.room_id for booking in bookings})
+            bookings = _without_conflicts(bookings, result)
+
+        for booking in bookings:
+            booking.status = new_status
+        Booking.objects.bulk_update(bookings, ['status'])
+
+        if notify:
+            notifications.notify_many(
+                (booking.user_id, f"Your booking for {booking.room.name} has been {new_status}.")
+                for booking in bookings
+            )
+        result.updated = bookings
+        return result
+
+    # One short transaction, retried if the rooms are locked by someone else
+    result = admission.run_with_retry(operation)
+
+    if result.updated:
+        bookings_changed.send(sender=Booking, bookings=result.updated)
+    return result
+
+
+def _without_conflicts(bookings, result):
+    """
+    Keeps the approvals that fit, in start-time order, and records the rest.
+    """
+    if not bookings:
+        return []
+
+    indexes = availability.load_room_indexes(
+        {booking.room_id for booking in bookings},
+        min(booking.start_time for booking in bookings),
+        max(booking.end_time for booking in bookings),
+        statuses=('approved',),
+    )
+
+    accepted = []
+    for booking in bookings:
+        index = indexes[booking.room_id]
+        if index.find_conflict(booking.start_time, booking.end_time) is not None:
+            result.conflicts.append(booking)
+            continue
+        # Later approvals in the same batch must not collide with this one
+        index.add(booking.start_time, booking.end_time, booking.pk)
+        accepted.append(booking)
+    return accepted
+
+
+def decide_series(series, new_status):
+    """
+    Approves or rejects every pending date of a recurring series at once,
+    with a single notification for the whole series.
+    """
+    pending = series.bookings.filter(status='pending').values_list('pk', flat=True)
+    result = decide_bookings(list(pending), new_status, notify=False)
+    if result.updated:
+        notifications.notify_many([(
+            series.user_id,
+            f"Your recurring booking for {series.room.name} ({len(result.updated)} dates) has been {new_status}.",
+        )])
+    return result
@@ -0,0 +1,154 @@
+# core/export.py
+
+"""
+Streaming export of booking history for reports (CSV or JSON Lines).
+
+Rows come out of QuerySet.iterator(chunk_size=...) as plain tuples (no model
+instances), so only one chunk of bookings is in memory at a time, whatever
+the size of the table. User and room are joined in; equipment names are
+fetched with ONE query per chunk.
+
+Bookings are exported in (start_time, id) order and every row carries a
+keyset cursor (see core.pagination). To resume an interrupted export, pass
+the cursor of the last row you got as `after`.
+"""
+
+import csv
+import json
+from collections import defaultdict
+from datetime import datetime, time as dt_time, timedelta
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Booking
+from .pagination import decode_cursor, make_cursor
+
+DEFAULT_CHUNK_SIZE = 2000
+# Cells a spreadsheet would read as a formula (CSV injection)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+FORMATS = ('csv', 'jsonl')
+COLUMNS = (
+    'booking_id', 'start_time', 'end_time', 'room', 'room_type', 'username', 'full_name',
+    'status', 'purpose', 'equipment', 'series_id', 'cursor',
+)
+
+
+# Selected per booking, in this order
+_FIELDS = (
+    'pk', 'start_time', 'end_time', 'room__name', 'room__type',
+    'user__username', 'user__first_name', 'user__last_name', 'status', 'purpose', 'series_id',
+)
+
+
+def export_queryset(first_day=None, last_day=None, room_ids=None, statuses=None, after=None):
+    """
+    Bookings that start between first_day and last_day (inclusive, local dates),
+    in export order, optionally resuming after a cursor.
+    """
+    queryset = Booking.objects.order_by('start_time', 'pk')
+    tz = timezone.get_current_timezone()
+    if first_day:
+        queryset = queryset.filter(start_time__gte=timezone.make_aware(datetime.combine(first_day, dt_time.min), tz))
+    if last_day:
+        next_day = last_day + timedelta(days=1)
+        queryset = queryset.filter(start_time__lt=timezone.make_aware(datetime.combine(next_day, dt_time.min), tz))
+    if room_ids:
+        queryset = queryset.filter(room_id__in=room_ids)
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+
+    position = decode_cursor(after)
+    if position:
+        value, pk = position
+        queryset = queryset.filter(Q(start_time__gt=value) | Q(start_time=value, pk__gt=pk))
+    return queryset
+
+
+def _equipment_names(booking_ids):
+    names = defaultdict(list)
+    links = (
+        Booking.equipment.through.objects.filter(booking_id__in=booking_ids)
+        .order_by('equipment__name')
+        .values_list('booking_id', 'equipment__name')
+    )
+    for booking_id, name in links:
+        names[booking_id].append(name)
+    return names
+
+
+def rows(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yields one dict per booking (keys = COLUMNS).
+    """
+    tz = timezone.get_current_timezone()
+    records = queryset.values_list(*_FIELDS).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            return
+        equipment = _equipment_names([record[0] for record in chunk])
+        for pk, start, end, room, room_type, username, first, last, status, purpose, series_id in chunk:
+            yield {
+                'booking_id': pk,
+                'start_time': start.astimezone(tz).isoformat(),
+                'end_time': end.astimezone(tz).isoformat(),
+                'room': room,
+                'room_type': room_type,
+                'username': username,
+                'full_name': f"{first} {last}".strip(),
+                'status': status,
+                'purpose': purpose,
+                'equipment': '; '.join(equipment.get(pk, ())),
+                'series_id': series_id,
+                'cursor': make_cursor(start, pk),
+            }
+
+
+class _Echo:
+    """
+    File-like object whose write() just hands the line back (for csv.writer).
+    """
+
+    def write(self, value):
+        return value
+
+
+def _cell(value):
+    # Purposes, names and usernames are typed by users; a leading ' makes
+    # Excel/Sheets show them as text instead of evaluating them
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_lines(row_iter):
+    writer = csv.DictWriter(_Echo(), fieldnames=COLUMNS)
+    yield writer.writeheader()
+    for row in row_iter:
+        yield writer.writerow({key: _cell(value) for key, value in row.items()})
+
+
+def jsonl_lines(row_iter):
+    for row in row_iter:
+        yield json.dumps(row) + '\n'
+
+
+def lines(row_iter, fmt):
+    return csv_lines(row_iter) if fmt == 'csv' else jsonl_lines(row_iter)
+
+
+async def aiterate(line_iter, batch=500):
+    """
+    Async version of a line iterator, for ASGI servers: Django would otherwise
+    read a sync streaming_content into a list first. Lines are pulled `batch`
+    at a time on the request's ORM thread (where the cursor lives).
+    """
+    next_batch = sync_to_async(lambda: list(islice(line_iter, batch)))
+    while True:
+        lines = await next_batch()
+        if not lines:
+            return
+        yield ''.join(lines)
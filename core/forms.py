@@ -1,8 +1,40 @@
 # core/forms.py
 
+from itertools import islice
+
 from django import forms
-from .models import Booking
+from .models import Booking, BookingSeries
+from . import availability, inventory, recurrence, suggestions
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+def conflict_message(room):
+    return f"Sorry, {room.name} is already booked for this time slot."
+
+
+def slot_taken(room, start_time, end_time, exclude_id=None):
+    """
+    The "already booked" error. It remembers the slot so BookingForm can offer
+    alternatives next to it (computed only when the form is rendered, i.e.
+    after any room lock has been released).
+    """
+    error = ValidationError(conflict_message(room), code='slot_taken')
+    error.slot = (room, start_time, end_time, exclude_id)
+    return error
+
+
+def equipment_taken(equipment, start_time, end_time, exclude_id=None):
+    """
+    The "no units left" error for the items in `equipment` that are fully
+    booked in the window, or None if every item has a unit free.
+    """
+    taken = inventory.unavailable_items(equipment, start_time, end_time, exclude_booking_id=exclude_id)
+    if not taken:
+        return None
+    names = ", ".join(item.name for item in taken)
+    return ValidationError(f"Sorry, no units left for this time slot: {names}.", code='equipment_taken')
+
 
 class BookingForm(forms.ModelForm):
     class Meta:
@@ -16,6 +48,12 @@ class BookingForm(forms.ModelForm):
             'equipment': forms.CheckboxSelectMultiple(),
         }
 
+    def __init__(self, *args, defer_conflict_check=False, **kwargs):
+        # Views that save through core.admission pass True: the slot is then
+        # checked once, under the room lock, instead of here AND there.
+        self.defer_conflict_check = defer_conflict_check
+        super().__init__(*args, **kwargs)
+
     def clean(self):
         cleaned_data = super().clean()
         room = cleaned_data.get("room")
@@ -28,19 +66,111 @@ class BookingForm(forms.ModelForm):
                 raise ValidationError("End time must be after start time.")
 
             # 2. Check for Overlapping Bookings
-            # We look for bookings for the SAME room that overlap with the requested time.
-            # (start < request_end) AND (end > request_start)
-            overlapping_bookings = Booking.objects.filter(
-                room=room,
-                start_time__lt=end_time,
-                end_time__gt=start_time
-            ).exclude(status__in=['rejected', 'cancelled']) # Ignore rejected/cancelled ones
-
-            # If we are editing an existing booking, exclude itself from the check
-            if self.instance.pk:
-                overlapping_bookings = overlapping_bookings.exclude(pk=self.instance.pk)
-
-            if overlapping_bookings.exists():
-                raise ValidationError(f"Sorry, {room.name} is already booked for this time slot.")
-
-        return cleaned_data
\ No newline at end of file
+            # One indexed probe against pending/approved/completed bookings for the
+            # SAME room (rejected/cancelled ones are ignored). If we are editing an
+            # existing booking, it is excluded from the check.
+            if room:
+                if not self.defer_conflict_check:
+                    conflict = availability.find_conflict(
+                        room, start_time, end_time, exclude_id=self.instance.pk
+                    )
+                    if conflict:
+                        raise slot_taken(room, start_time, end_time, exclude_id=self.instance.pk)
+
+                # Booking.clean() covers a subset of this check, let it skip the re-query
+                availability.mark_checked(self.instance, room, start_time, end_time)
+
+            # 3. Check Equipment Stock
+            # Each booking holds one unit of every item it lists for its duration.
+            equipment = cleaned_data.get("equipment")
+            # (deferred forms get it under the locks, in admission.save_booking)
+            if equipment and not self.defer_conflict_check:
+                error = equipment_taken(equipment, start_time, end_time, exclude_id=self.instance.pk)
+                if error:
+                    raise error
+
+        return cleaned_data
+
+    @property
+    def taken_slot(self):
+        """
+        (room, start_time, end_time, exclude_id) if the slot was taken, else None.
+        """
+        for error in self.non_field_errors().as_data():
+            slot = getattr(error, 'slot', None)
+            if slot:
+                return slot
+        return None
+
+    @cached_property
+    def slot_suggestions(self):
+        """
+        Nearest free times / other free rooms when the slot was taken, else None.
+        """
+        if not self.taken_slot:
+            return None
+        room, start_time, end_time, exclude_id = self.taken_slot
+        return suggestions.suggest(room, start_time, end_time, exclude_id=exclude_id)
+
+
+class BookingSeriesForm(forms.ModelForm):
+    weekdays = forms.TypedMultipleChoiceField(
+        choices=recurrence.WEEKDAY_CHOICES, coerce=int, widget=forms.CheckboxSelectMultiple(),
+    )
+
+    class Meta:
+        model = BookingSeries
+        fields = ['room', 'first_date', 'until', 'weekdays', 'start_time', 'end_time', 'interval', 'purpose']
+        labels = {'first_date': 'Starting on', 'until': 'Repeat until', 'interval': 'Every N weeks'}
+        widgets = {
+            'first_date': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+            'until': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+            'start_time': forms.TimeInput(attrs={'type': 'time', 'class': 'form-control'}),
+            'end_time': forms.TimeInput(attrs={'type': 'time', 'class': 'form-control'}),
+            'interval': forms.NumberInput(attrs={'min': 1, 'class': 'form-control'}),
+            'purpose': forms.Textarea(attrs={'rows': 3, 'class': 'form-control'}),
+            'room': forms.Select(attrs={'class': 'form-select'}),
+        }
+
+    def clean_weekdays(self):
+        # Stored as "0,2" (Monday=0)
+        return ",".join(str(day) for day in sorted(set(self.cleaned_data['weekdays'])))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        room = cleaned_data.get("room")
+        first_date = cleaned_data.get("first_date")
+        until = cleaned_data.get("until")
+        start_time = cleaned_data.get("start_time")
+        end_time = cleaned_data.get("end_time")
+        weekdays = cleaned_data.get("weekdays")
+
+        if not all([room, first_date, until, start_time, end_time, weekdays]):
+            return cleaned_data
+
+        # 1. Basic sanity checks
+        if end_time <= start_time:
+            raise ValidationError("End time must be after start time.")
+        if until < first_date:
+            raise ValidationError("The last date must be on or after the first date.")
+        if (until - first_date).days > recurrence.MAX_SPAN_DAYS:
+            raise ValidationError(f"A series can span at most {recurrence.MAX_SPAN_DAYS} days.")
+
+        # 2. Expand the pattern into dates (one past the cap is enough to refuse it)
+        self.windows = list(islice(recurrence.expand(
+            first_date, until, [int(day) for day in weekdays.split(',')],
+            start_time, end_time, cleaned_data.get("interval") or 1,
+        ), recurrence.MAX_OCCURRENCES + 1))
+        if not self.windows:
+            raise ValidationError("This pattern does not produce any dates.")
+        if len(self.windows) > recurrence.MAX_OCCURRENCES:
+            raise ValidationError(f"A series can have at most {recurrence.MAX_OCCURRENCES} dates.")
+
+        # 3. Check every date at once (one range query + in-memory probes)
+        conflicts = recurrence.find_conflicts(room, self.windows)
+        if conflicts:
+            dates = ", ".join(timezone.localtime(start).strftime("%b %d") for start, _ in conflicts[:5])
+            more = f" and {len(conflicts) - 5} more" if len(conflicts) > 5 else ""
+            raise ValidationError(f"Sorry, {room.name} is already booked on {dates}{more}.")
+
+        return cleaned_data
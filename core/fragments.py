@@ -0,0 +1,124 @@
+# core/fragments.py
+
+"""
+Version keys for the cached template fragments.
+
+dashboard.html and admin_approval.html wrap their tables in {% cache %}
+blocks (on the 'fragments' cache, see settings.CACHES). Each block's key
+includes the version tokens of the data it shows:
+
+    bookings:<user id>        a student's bookings table
+    notifications:<user id>   a student's notification dropdown
+    admin:pending             admin queue sections, one per status group
+    admin:approved
+    admin:history
+    catalog                   room and equipment names shown in every table
+    room:<room id>            a room's bookings (the room calendar feed, core.ics)
+
+core.signals replaces a token whenever that data changes, so the old
+fragments are never looked up again and simply expire. Tokens are fresh
+timestamps (never counters) so an evicted version can't revive old HTML.
+"""
+
+import time
+
+from django.core.cache import caches
+from django.db import transaction
+
+FRAGMENT_CACHE = 'fragments'
+FRAGMENT_TIMEOUT = 60 * 60
+
+CATALOG = 'catalog'
+# Which admin section lists a booking of each status
+ADMIN_SECTION_FOR_STATUS = {
+    'pending': 'admin:pending',
+    'approved': 'admin:approved',
+    'rejected': 'admin:history',
+    'cancelled': 'admin:history',
+    'completed': 'admin:history',
+}
+ADMIN_SECTIONS = ('admin:pending', 'admin:approved', 'admin:history')
+
+
+def _key(name):
+    return f"frag:v:{name}"
+
+
+def versions(*names):
+    """
+    Returns {name: token}, creating tokens that don't exist yet.
+    """
+    cache = caches[FRAGMENT_CACHE]
+    found = cache.get_many([_key(name) for name in names])
+    tokens, missing = {}, {}
+    for name in names:
+        token = found.get(_key(name))
+        if token is None:
+            token = missing[_key(name)] = time.time_ns()
+        tokens[name] = token
+    if missing:
+        cache.set_many(missing, None)
+    return tokens
+
+
+def _replace_tokens(names):
+    token = time.time_ns()
+    caches[FRAGMENT_CACHE].set_many({_key(name): token for name in names}, None)
+
+
+def bump(*names):
+    """
+    Orphans every fragment that depends on any of `names`.
+    """
+    names = set(names)
+    if not names:
+        return
+    _replace_tokens(names)
+    # And again once the change is committed: a page rendered in between
+    # still read the old rows, and may have cached them under the new token
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _replace_tokens(names))
+
+
+def dashboard_versions(user):
+    tokens = versions(f"bookings:{user.pk}", f"notifications:{user.pk}", CATALOG)
+    return {
+        'bookings': tokens[f"bookings:{user.pk}"],
+        'notifications': tokens[f"notifications:{user.pk}"],
+        'catalog': tokens[CATALOG],
+    }
+
+
+def admin_versions():
+    tokens = versions(*ADMIN_SECTIONS, CATALOG)
+    return {
+        'pending': tokens['admin:pending'],
+        'approved': tokens['admin:approved'],
+        'history': tokens['admin:history'],
+        'catalog': tokens[CATALOG],
+    }
+
+
+def bump_bookings(bookings, previous_statuses=None):
+    """
+    Bumps the owners' dashboards, the rooms' feeds and the admin sections the
+    bookings are in now and were in before. previous_statuses=None means "not
+    known", in which case every admin section is bumped.
+    """
+    names = {f"bookings:{booking.user_id}" for booking in bookings}
+    for booking in bookings:
+        names.add(f"room:{booking.room_id}")
+        # A booking moved to another room leaves the old room's feed too
+        original = getattr(booking, '_original_window', None)
+        if original and original[0]:
+            names.add(f"room:{original[0]}")
+    if previous_statuses is None:
+        names.update(ADMIN_SECTIONS)
+    else:
+        statuses = set(previous_statuses) | {booking.status for booking in bookings}
+        names.update(ADMIN_SECTION_FOR_STATUS[s] for s in statuses if s in ADMIN_SECTION_FOR_STATUS)
+    bump(*names)
+
+
+def bump_notifications(user_ids):
+    bump(*(f"notifications:{user_id}" for user_id in user_ids))
@@ -0,0 +1,158 @@
+# core/grid.py
+
+"""
+Room availability grid (rooms x time slots) for the week view.
+
+Each (room set, day, slot size) block is cached on its own. The cache key
+includes a version token for every (room, day) in the block, and those tokens
+are replaced whenever a booking touching that room and day is saved, decided
+or deleted (see core.signals). Changing one booking therefore only orphans the
+blocks that actually show it; everything else keeps serving from cache.
+
+Cache misses for a request are filled with ONE query covering all missing days.
+Blocks and tokens live in the default cache, which every worker must share
+(see settings.CACHES): a token replaced by one worker has to orphan the
+blocks for all of them.
+"""
+
+import hashlib
+import math
+import time
+from datetime import datetime, time as dt_time, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .availability import overlap_filter
+from .models import Booking
+
+# Hours shown in the grid (local time)
+DAY_START_HOUR = 7
+DAY_END_HOUR = 21
+SLOT_CHOICES = (15, 30, 60)
+MAX_DAYS = 14
+GRID_TIMEOUT = 60 * 60 * 24
+
+# Cell values: free, tentative (pending) or taken (approved/completed)
+FREE, PENDING, BOOKED = None, 'pending', 'booked'
+CELL_FOR_STATUS = {'pending': PENDING, 'approved': BOOKED, 'completed': BOOKED}
+
+
+def _version_key(room_id, day):
+    return f"grid:v:{room_id}:{day.isoformat()}"
+
+
+def _block_keys(room_ids, days, slot_minutes):
+    """
+    Cache key per day, derived from the version token of every (room, day).
+    """
+    version_keys = [_version_key(room_id, day) for day in days for room_id in room_ids]
+    versions = cache.get_many(version_keys)
+    missing = {key: time.time_ns() for key in version_keys if key not in versions}
+    if missing:
+        # A fresh token (never a counter reset) so an evicted version can't
+        # bring an old block back to life
+        cache.set_many(missing, None)
+        versions.update(missing)
+
+    keys = {}
+    for day in days:
+        tokens = ",".join(f"{room_id}={versions[_version_key(room_id, day)]}" for room_id in room_ids)
+        digest = hashlib.md5(tokens.encode()).hexdigest()
+        keys[day] = f"grid:block:{day.isoformat()}:{slot_minutes}:{digest}"
+    return keys
+
+
+def local_days(start_time, end_time):
+    """
+    Local calendar dates touched by [start_time, end_time).
+    """
+    day = timezone.localtime(start_time).date()
+    last = timezone.localtime(end_time - timedelta(microseconds=1)).date()
+    while day <= last:
+        yield day
+        day += timedelta(days=1)
+
+
+def _replace_tokens(keys):
+    token = time.time_ns()
+    cache.set_many({key: token for key in keys}, None)
+
+
+def invalidate(room_id, start_time, end_time):
+    """
+    Orphans every cached block showing `room_id` between start and end.
+    """
+    keys = [_version_key(room_id, day) for day in local_days(start_time, end_time)]
+    _replace_tokens(keys)
+    # And again once the change is committed: a grid built in between still
+    # read the old rows, and may have cached them under the new token
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _replace_tokens(keys))
+
+
+def day_bounds(day):
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(day, dt_time(DAY_START_HOUR)), tz)
+    end = timezone.make_aware(datetime.combine(day, dt_time(DAY_END_HOUR)), tz)
+    return start, end
+
+
+def slot_labels(slot_minutes):
+    minutes = range(DAY_START_HOUR * 60, DAY_END_HOUR * 60, slot_minutes)
+    return [f"{m // 60:02d}:{m % 60:02d}" for m in minutes]
+
+
+def _fill(room_ids, days, slot_minutes):
+    """
+    Builds the blocks for `days` from a single range query.
+    """
+    first_start, _ = day_bounds(days[0])
+    _, last_end = day_bounds(days[-1])
+    rows = Booking.objects.filter(
+        overlap_filter(first_start, last_end),
+        room_id__in=room_ids,
+        status__in=CELL_FOR_STATUS,
+    ).values_list('room_id', 'start_time', 'end_time', 'status')
+
+    slot = timedelta(minutes=slot_minutes)
+    count = len(slot_labels(slot_minutes))
+    blocks = {day: {room_id: [FREE] * count for room_id in room_ids} for day in days}
+
+    for room_id, start, end, status in rows:
+        cell = CELL_FOR_STATUS[status]
+        for day in local_days(start, end):
+            if day not in blocks:
+                continue
+            day_start, day_end = day_bounds(day)
+            first = max((start - day_start) // slot, 0)
+            last = min(math.ceil((min(end, day_end) - day_start) / slot), count)
+            cells = blocks[day][room_id]
+            for index in range(first, last):
+                # A confirmed booking wins over a pending one in the same slot
+                if cells[index] is not BOOKED:
+                    cells[index] = cell
+    return blocks
+
+
+def availability_grid(room_ids, first_day, days=7, slot_minutes=60):
+    """
+    Returns {day: {room_id: [cell, ...]}} for `days` days from `first_day`.
+    """
+    room_ids = sorted(set(room_ids))
+    wanted = [first_day + timedelta(days=offset) for offset in range(days)]
+    keys = _block_keys(room_ids, wanted, slot_minutes)
+
+    cached = cache.get_many(list(keys.values()))
+    grid = {day: cached[keys[day]] for day in wanted if keys[day] in cached}
+
+    missing = [day for day in wanted if day not in grid]
+    if missing and room_ids:
+        filled = _fill(room_ids, missing, slot_minutes)
+        cache.set_many({keys[day]: filled[day] for day in missing}, GRID_TIMEOUT)
+        grid.update(filled)
+    elif missing:
+        grid.update({day: {} for day in missing})
+
+    return {day: grid[day] for day in wanted}
@@ -0,0 +1,192 @@
+# core/ics.py
+
+"""
+iCalendar (ICS) feeds: one per room and one per user, for calendar apps.
+
+Calendar apps poll every few minutes and can't log in, so each feed lives
+behind a signed URL (feed_url) and is answered from version tokens first:
+
+    ETag           the feed's fragment token (core.fragments: room:<id> or
+                   bookings:<user id>, plus catalog for the room names) and
+                   today's date, so past events age out once a day
+    Last-Modified  when the newest of those tokens was set (or midnight, if
+                   later)
+
+The tokens live in the fragments cache, which is shared by every worker
+(settings.CACHES), so a change committed through one worker moves the ETag
+all of them answer with; a per-process cache (locmem) would keep serving
+304s from the workers that didn't see it.
+
+A room feed poll that sends them back gets a 304 after one cache read, with
+no query at all. A user feed first checks that the account is still active
+(one primary-key lookup), so a deactivated user's URL stops answering even
+though nothing in their bookings changed. Otherwise the feed is streamed:
+one small query for the room or user, then the approved (and completed)
+bookings from FEED_PAST_DAYS ago on, read as plain tuples in chunks.
+"""
+
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+
+from django.contrib.auth.models import User
+from django.core import signing
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import quote_etag
+
+from . import fragments
+from .models import Booking, Room
+
+FEED_STATUSES = ('approved', 'completed')
+FEED_PAST_DAYS = 30
+CHUNK_SIZE = 500
+PRODID = '-//CvSUReserve//Bookings//EN'
+
+
+# ---------------------------------------------------------
+# Signed URLs and versions
+# ---------------------------------------------------------
+
+def _signer(kind):
+    # One salt per kind: a room's token never opens the user with the same id
+    return signing.Signer(salt=f'core.ics.{kind}')
+
+
+def feed_url(kind, pk):
+    return reverse(f'{kind}_calendar', args=[_signer(kind).sign(str(pk))])
+
+
+def unsign(kind, token):
+    """
+    The room/user id in a feed token, or None if it was tampered with.
+    """
+    try:
+        return int(_signer(kind).unsign(token))
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def is_open(kind, pk):
+    """
+    Whether the feed may be served at all: user feeds only for active
+    accounts (one query). Room feeds are always open; removing a room moves
+    the catalog token, and the feed then 404s.
+    """
+    if kind == 'room':
+        return True
+    return User.objects.filter(pk=pk, is_active=True).exists()
+
+
+def _version_name(kind, pk):
+    return f'room:{pk}' if kind == 'room' else f'bookings:{pk}'
+
+
+def version(kind, pk):
+    """
+    (ETag, Last-Modified timestamp) of a feed. Cache only, no query.
+    """
+    name = _version_name(kind, pk)
+    tokens = fragments.versions(name, fragments.CATALOG)
+    today = timezone.localdate()
+    etag = quote_etag(f"{kind}{pk}-{tokens[name]}-{tokens[fragments.CATALOG]}-{today:%Y%m%d}")
+    midnight = timezone.make_aware(datetime.combine(today, dt_time.min))
+    return etag, max(max(tokens.values()) // 1_000_000_000, int(midnight.timestamp()))
+
+
+# ---------------------------------------------------------
+# ICS text
+# ---------------------------------------------------------
+
+def _text(value):
+    # RFC 5545 3.3.11
+    return (
+        value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def _stamp(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _fold(line):
+    """
+    Splits a content line into 75-octet pieces (continuations start with a space).
+    """
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    pieces, limit = [], 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1  # never split a UTF-8 character
+        pieces.append(encoded[:cut].decode('utf-8'))
+        encoded, limit = encoded[cut:], 74
+    return '\r\n '.join(pieces) + '\r\n'
+
+
+def _event(pk, start, end, summary, location, dtstamp):
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:booking-{pk}@cvsureserve',
+        f'DTSTAMP:{dtstamp}',
+        f'DTSTART:{_stamp(start)}',
+        f'DTEND:{_stamp(end)}',
+        f'SUMMARY:{_text(summary)}',
+        f'LOCATION:{_text(location)}',
+        'STATUS:CONFIRMED',
+        'END:VEVENT',
+    ]
+    return ''.join(_fold(line) for line in lines)
+
+
+def _calendar(name, events, last_modified):
+    dtstamp = _stamp(datetime.fromtimestamp(last_modified, dt_timezone.utc))
+    yield ''.join(_fold(line) for line in (
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_text(name)}',
+        'REFRESH-INTERVAL;VALUE=DURATION:PT15M',
+        'X-PUBLISHED-TTL:PT15M',
+    ))
+    for event in events:
+        yield _event(*event, dtstamp)
+    yield _fold('END:VCALENDAR')
+
+
+def _bookings(**filters):
+    since = timezone.now() - timedelta(days=FEED_PAST_DAYS)
+    return (
+        Booking.objects.filter(status__in=FEED_STATUSES, end_time__gte=since, **filters)
+        .order_by('start_time', 'pk')
+    )
+
+
+def feed(kind, pk, last_modified):
+    """
+    The ICS text of a feed as a line-chunk iterator, or None if the room or
+    user is gone. The bookings are only read while the response streams.
+    """
+    if kind == 'room':
+        room = Room.objects.filter(pk=pk).values_list('name', flat=True).first()
+        if room is None:
+            return None
+        rows = _bookings(room_id=pk).values_list('pk', 'start_time', 'end_time', 'purpose')
+        events = (
+            (booking_id, start, end, purpose, room)
+            for booking_id, start, end, purpose in rows.iterator(chunk_size=CHUNK_SIZE)
+        )
+        return _calendar(room, events, last_modified)
+
+    user = User.objects.filter(pk=pk, is_active=True).values_list('username', flat=True).first()
+    if user is None:
+        return None
+    rows = _bookings(user_id=pk).values_list('pk', 'start_time', 'end_time', 'purpose', 'room__name')
+    events = (
+        (booking_id, start, end, f"{room}: {purpose}", room)
+        for booking_id, start, end, purpose, room in rows.iterator(chunk_size=CHUNK_SIZE)
+    )
+    return _calendar(f"{user}'s bookings", events, last_modified)
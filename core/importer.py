@@ -0,0 +1,363 @@
+# core/importer.py
+
+"""
+Bulk loading of the room and equipment catalogues and of semester schedules
+(CSV or JSON Lines, the same columns core.export writes).
+
+Files are read as a stream and handled CHUNK rows at a time. Room, user and
+equipment names are resolved through dicts loaded once up front. Each
+booking chunk then costs a fixed number of queries, whatever its size:
+
+    1 SELECT  ... FOR UPDATE on the chunk's rooms (core.admission)
+    1 SELECT  blocking bookings of those rooms over the chunk's time span
+    3 SELECT  only if rows list equipment: lock, claims over the span, totals
+    1 INSERT  bookings (bulk_create)
+    1 INSERT  booking <-> equipment through-rows (bulk_create)
+
+Conflicts are found without going back to the database: rows that overlap an
+existing booking are dropped first (interval index), and the remaining rows
+are sorted by (room, start) and swept once to catch rows that overlap each
+other. Because every chunk is committed before the next one is checked, a
+later chunk also sees the earlier ones.
+
+A bad row never stops the load. It is reported in ImportResult.rejected with
+its line number and the reason.
+"""
+
+import csv
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import admission, availability, inventory
+from .models import BOOKING_STATUS_CHOICES, Booking, Equipment, Room
+from .signals import bookings_changed
+
+DEFAULT_CHUNK_SIZE = 2000
+FORMATS = ('csv', 'jsonl')
+KINDS = ('rooms', 'equipment', 'bookings')
+STATUSES = {value for value, _ in BOOKING_STATUS_CHOICES}
+MAX_INT = 2 ** 31 - 1  # IntegerField, on every backend we run on
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    updated: int = 0
+    rejected: list = field(default_factory=list)  # [(line, reason)]
+
+    def reject(self, line, reason):
+        self.rejected.append((line, reason))
+
+
+def read_records(handle, fmt):
+    """
+    Yields (line number, dict) from an open CSV or JSONL file, one at a time.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(handle)
+        for record in reader:
+            yield reader.line_num, {key: (value or '').strip() for key, value in record.items() if key}
+        return
+    for line, text in enumerate(handle, start=1):
+        if not text.strip():
+            continue
+        try:
+            record = json.loads(text)
+        except ValueError:
+            record = None
+        # A broken line is passed on as such and rejected like any other bad row
+        yield line, record if isinstance(record, dict) else {'_error': "not a JSON object"}
+
+
+def _chunks(records, size):
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _int(value):
+    try:
+        value = int(value)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    return value if abs(value) <= MAX_INT else None
+
+
+def _too_long(model, values):
+    """
+    The first text value longer than its column allows, as a reason, or None.
+    Checked here because PostgreSQL would fail the whole load on it.
+    """
+    for name, value in values.items():
+        limit = model._meta.get_field(name).max_length
+        if limit and isinstance(value, str) and len(value) > limit:
+            return f"{name} is longer than {limit} characters"
+    return None
+
+
+# ---------------------------------------------------------
+# Catalogues (upsert by name)
+# ---------------------------------------------------------
+
+def _upsert(model, records, parse, fields):
+    result = ImportResult()
+    existing = {obj.name: obj for obj in model.objects.all()}
+    created, updated = {}, {}
+    for line, record in records:
+        values = parse(record)
+        if isinstance(values, str):
+            result.reject(line, values)
+            continue
+        current = existing.get(values['name'])
+        if current is None:
+            created[values['name']] = model(**values)  # a repeated name: last row wins
+        elif any(getattr(current, name) != values[name] for name in fields):
+            for name in fields:
+                setattr(current, name, values[name])
+            updated[current.pk] = current
+    model.objects.bulk_create(created.values(), batch_size=DEFAULT_CHUNK_SIZE)
+    model.objects.bulk_update(updated.values(), fields, batch_size=DEFAULT_CHUNK_SIZE)
+    result.created, result.updated = len(created), len(updated)
+    return result
+
+
+def _room(record):
+    name, capacity = record.get('name'), _int(record.get('capacity'))
+    if not name or not record.get('type'):
+        return "name and type are required"
+    if not isinstance(name, str) or not isinstance(record['type'], str):
+        return "name and type must be text"
+    if capacity is None or capacity < 1:
+        return "capacity must be a positive number"
+    active = str(record.get('is_active', '1')).strip().lower() not in ('0', 'false', 'no')
+    values = {'name': name, 'type': record['type'], 'capacity': capacity, 'is_active': active}
+    return _too_long(Room, values) or values
+
+
+def _equipment(record):
+    name, quantity = record.get('name'), _int(record.get('total_quantity'))
+    if not name:
+        return "name is required"
+    if not isinstance(name, str):
+        return "name must be text"
+    if quantity is None or quantity < 0:
+        return "total_quantity must be a number"
+    description = record.get('description') or ''
+    if not isinstance(description, str):
+        return "description must be text"
+    values = {'name': name, 'description': description, 'total_quantity': quantity}
+    return _too_long(Equipment, values) or values
+
+
+def import_rooms(records):
+    return _upsert(Room, records, _room, ['type', 'capacity', 'is_active'])
+
+
+def import_equipment(records):
+    return _upsert(Equipment, records, _equipment, ['description', 'total_quantity'])
+
+
+# ---------------------------------------------------------
+# Schedules
+# ---------------------------------------------------------
+
+@dataclass
+class _Row:
+    line: int
+    booking: Booking
+    equipment_ids: list
+
+
+def _datetime(value):
+    try:
+        parsed = parse_datetime(value) if isinstance(value, str) else None
+    except ValueError:  # well-formed but impossible, e.g. 2026-02-30 10:00
+        return None
+    if parsed and timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _booking_row(line, record, lookups, default_status):
+    """
+    Returns a _Row, or the reason the record can't be imported.
+    """
+    if '_error' in record:
+        return record['_error']
+    # JSON Lines can hold any type; the lookups below need hashable text
+    for key in ('room', 'username', 'purpose', 'status'):
+        if record.get(key) is not None and not isinstance(record[key], str):
+            return f"{key} must be text"
+    rooms, users, equipment = lookups
+    room_id = rooms.get(record.get('room'))
+    if room_id is None:
+        return f"unknown room {record.get('room')!r}"
+    user_id = users.get(record.get('username'))
+    if user_id is None:
+        return f"unknown user {record.get('username')!r}"
+    start_time, end_time = _datetime(record.get('start_time')), _datetime(record.get('end_time'))
+    if not start_time or not end_time:
+        return "start_time and end_time must be datetimes"
+    if end_time <= start_time:
+        return "end_time must be after start_time"
+    status = record.get('status') or default_status
+    if status not in STATUSES:
+        return f"unknown status {status!r}"
+
+    names = record.get('equipment') or []
+    if isinstance(names, str):
+        names = [name.strip() for name in names.split(';') if name.strip()]
+    if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+        return "equipment must be a list of names or \"A; B\""
+    missing = [name for name in names if name not in equipment]
+    if missing:
+        return f"unknown equipment {', '.join(missing)}"
+
+    purpose = record.get('purpose') or 'Class'
+    too_long = _too_long(Booking, {'purpose': purpose})
+    if too_long:
+        return too_long
+
+    booking = Booking(
+        user_id=user_id, room_id=room_id, start_time=start_time, end_time=end_time,
+        purpose=purpose, status=status,
+    )
+    return _Row(line, booking, sorted({equipment[name] for name in names}))
+
+
+def _sweep(rows, result):
+    """
+    Drops rows that overlap an earlier-starting row of the same room.
+    `rows` must be sorted by (room, start).
+    """
+    kept, room_id, running_end, running_line = [], None, None, None
+    for row in rows:
+        booking = row.booking
+        if booking.room_id != room_id:
+            room_id, running_end = booking.room_id, None
+        if running_end is not None and booking.start_time < running_end:
+            result.reject(row.line, f"overlaps line {running_line} of this file")
+            continue
+        kept.append(row)
+        running_end, running_line = booking.end_time, row.line
+    return kept
+
+
+def _check_stock(rows, result):
+    """
+    Drops rows that would need more units of an item than are free, counting
+    the database's claims and the rows of this chunk admitted before them.
+    Locks the items first (after the room locks, see core.admission).
+    """
+    equipment_ids = sorted({equipment_id for row in rows for equipment_id in row.equipment_ids})
+    if not equipment_ids:
+        return rows
+    admission.lock_equipment(equipment_ids)
+    claims = inventory.claims_by_item(
+        min(row.booking.start_time for row in rows), max(row.booking.end_time for row in rows),
+    )
+    items = {pk: (name, total) for pk, name, total in Equipment.objects.filter(
+        pk__in=equipment_ids).values_list('pk', 'name', 'total_quantity')}
+
+    kept = []
+    for row in sorted(rows, key=lambda row: row.line):
+        start, end = row.booking.start_time, row.booking.end_time
+        short = [
+            items[equipment_id][0] for equipment_id in row.equipment_ids
+            if inventory.peak_in(claims[equipment_id], start, end) >= items[equipment_id][1]
+        ]
+        if short:
+            result.reject(row.line, f"no units left: {', '.join(short)}")
+            continue
+        for equipment_id in row.equipment_ids:
+            claims[equipment_id].append((start, end))
+        kept.append(row)
+    return kept
+
+
+def _admit_chunk(rows, result):
+    """
+    Checks one chunk against the database and itself, and writes what's left.
+    Runs under the room locks so nobody books into the gaps meanwhile.
+    """
+    blocking = [row for row in rows if row.booking.status in availability.BLOCKING_STATUSES]
+    room_ids = {row.booking.room_id for row in blocking}
+
+    def operation():
+        rejected = ImportResult()
+        accepted = [row for row in rows if row.booking.status not in availability.BLOCKING_STATUSES]
+        if blocking:
+            indexes = availability.load_room_indexes(
+                room_ids,
+                min(row.booking.start_time for row in blocking),
+                max(row.booking.end_time for row in blocking),
+            )
+            fresh = []
+            for row in blocking:
+                booking = row.booking
+                if indexes[booking.room_id].find_conflict(booking.start_time, booking.end_time) is not None:
+                    rejected.reject(row.line, "overlaps an existing booking")
+                else:
+                    fresh.append(row)
+            fresh.sort(key=lambda row: (row.booking.room_id, row.booking.start_time, row.line))
+            accepted += _check_stock(_sweep(fresh, rejected), rejected)
+
+        bookings = Booking.objects.bulk_create([row.booking for row in accepted])
+        Booking.equipment.through.objects.bulk_create(
+            Booking.equipment.through(booking_id=row.booking.pk, equipment_id=equipment_id)
+            for row in accepted for equipment_id in row.equipment_ids
+        )
+        return bookings, rejected
+
+    # Retries start from scratch, so rejections are only kept from the run that committed
+    bookings, rejected = admission.admitted(room_ids, operation)
+    result.created += len(bookings)
+    result.rejected += rejected.rejected
+
+    # New rows: nothing was there before (see core.signals)
+    for booking in bookings:
+        booking._original_window = booking._original_status = None
+    if bookings:
+        bookings_changed.send(sender=Booking, bookings=bookings)
+
+
+def import_bookings(records, chunk_size=DEFAULT_CHUNK_SIZE, default_status='approved'):
+    """
+    Loads a schedule. Each row needs room, username, start_time and end_time;
+    purpose, status (default `default_status`) and equipment ("A; B") are
+    optional.
+    """
+    result = ImportResult()
+    lookups = (
+        dict(Room.objects.values_list('name', 'pk')),
+        dict(User.objects.values_list('username', 'pk')),
+        dict(Equipment.objects.values_list('name', 'pk')),
+    )
+    for chunk in _chunks(records, chunk_size):
+        rows = []
+        for line, record in chunk:
+            row = _booking_row(line, record, lookups, default_status)
+            if isinstance(row, str):
+                result.reject(line, row)
+            else:
+                rows.append(row)
+        if rows:
+            _admit_chunk(rows, result)
+    result.rejected.sort()
+    return result
+
+
+def import_records(kind, records, **options):
+    if kind == 'rooms':
+        return import_rooms(records)
+    if kind == 'equipment':
+        return import_equipment(records)
+    return import_bookings(records, **options)
@@ -0,0 +1,90 @@
+# core/inventory.py
+
+"""
+Time-windowed equipment accounting.
+
+Every booking that lists an Equipment item holds one unit of it for the
+booking's duration. Free units for [start, end) are therefore
+
+    total_quantity - (peak number of overlapping claims inside the window)
+
+Two bookings that both fall inside the window but don't overlap each other
+only use one unit between them, which is why this is a sweep over claim
+start/end events rather than a plain COUNT.
+
+All equipment is answered together: one query for the catalogue, one query
+for every claim in the window, then an in-memory sweep per item.
+"""
+
+from collections import defaultdict
+
+from .availability import BLOCKING_STATUSES
+from .models import Booking, Equipment
+
+
+def peak_usage(claims):
+    """
+    Maximum number of simultaneous claims from (start, end) pairs.
+    """
+    events = []
+    for start, end in claims:
+        events.append((start, 1))
+        events.append((end, -1))
+    # Half-open intervals: at equal timestamps, releases happen before claims
+    events.sort(key=lambda event: (event[0], event[1]))
+
+    current = peak = 0
+    for _, delta in events:
+        current += delta
+        peak = max(peak, current)
+    return peak
+
+
+def claims_by_item(start_time, end_time, exclude_booking_id=None, statuses=BLOCKING_STATUSES):
+    """
+    {equipment_id: [(start, end), ...]} for every claim overlapping the
+    window, clipped to it. One query.
+    """
+    claims = Booking.equipment.through.objects.filter(
+        booking__status__in=statuses,
+        booking__start_time__lt=end_time,
+        booking__end_time__gt=start_time,
+    )
+    if exclude_booking_id:
+        claims = claims.exclude(booking_id=exclude_booking_id)
+
+    by_item = defaultdict(list)
+    for equipment_id, claim_start, claim_end in claims.values_list(
+        'equipment_id', 'booking__start_time', 'booking__end_time'
+    ):
+        # Only the part inside the window matters
+        by_item[equipment_id].append((max(claim_start, start_time), min(claim_end, end_time)))
+    return by_item
+
+
+def peak_in(claims, start_time, end_time):
+    """
+    peak_usage() of the claims that overlap [start_time, end_time).
+    """
+    return peak_usage(
+        (max(start, start_time), min(end, end_time)) for start, end in claims if start < end_time and end > start_time
+    )
+
+
+def free_quantities(start_time, end_time, exclude_booking_id=None, statuses=BLOCKING_STATUSES):
+    """
+    Returns {equipment_id: (total_quantity, free_units)} for every item.
+    """
+    by_item = claims_by_item(start_time, end_time, exclude_booking_id, statuses)
+    return {
+        equipment_id: (total, max(total - peak_usage(by_item.get(equipment_id, ())), 0))
+        for equipment_id, total in Equipment.objects.values_list('pk', 'total_quantity')
+    }
+
+
+def unavailable_items(equipment, start_time, end_time, exclude_booking_id=None):
+    """
+    The subset of `equipment` that has no free unit left in the window.
+    """
+    free = free_quantities(start_time, end_time, exclude_booking_id=exclude_booking_id)
+    return [item for item in equipment if free.get(item.pk, (0, 0))[1] < 1]
@@ -0,0 +1,58 @@
+import csv
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import importer
+
+
+class Command(BaseCommand):
+    help = (
+        "Loads rooms, equipment or a semester schedule from CSV/JSONL in chunks. "
+        "Bad or conflicting rows are reported, the rest is imported."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to load (.csv or .jsonl).")
+        parser.add_argument('--kind', choices=importer.KINDS, default='bookings')
+        parser.add_argument('--format', choices=importer.FORMATS, help="Defaults to the file extension.")
+        parser.add_argument(
+            '--chunk-size', type=int, default=importer.DEFAULT_CHUNK_SIZE,
+            help="Schedule rows checked and written per transaction.",
+        )
+        parser.add_argument(
+            '--status', default='approved',
+            help="Status for schedule rows without one (class schedules are pre-approved).",
+        )
+        parser.add_argument('--rejects', help="Write rejected rows (line, reason) to this CSV file.")
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or os.path.splitext(options['path'])[1].lstrip('.').lower()
+        if fmt not in importer.FORMATS:
+            raise CommandError("Pass --format csv or --format jsonl.")
+        if options['status'] not in importer.STATUSES:
+            raise CommandError(f"Unknown --status {options['status']!r}.")
+
+        extra = {}
+        if options['kind'] == 'bookings':
+            extra = {'chunk_size': options['chunk_size'], 'default_status': options['status']}
+        try:
+            with open(options['path'], newline='', encoding='utf-8') as handle:
+                result = importer.import_records(options['kind'], importer.read_records(handle, fmt), **extra)
+        except OSError as error:
+            raise CommandError(str(error))
+
+        self.stdout.write(
+            f"{options['kind']}: {result.created} created, {result.updated} updated, "
+            f"{len(result.rejected)} rejected."
+        )
+        if options['rejects']:
+            with open(options['rejects'], 'w', newline='', encoding='utf-8') as handle:
+                writer = csv.writer(handle)
+                writer.writerow(['line', 'reason'])
+                writer.writerows(result.rejected)
+        else:
+            for line, reason in result.rejected[:20]:
+                self.stderr.write(f"  line {line}: {reason}")
+            if len(result.rejected) > 20:
+                self.stderr.write(f"  ... and {len(result.rejected) - 20} more (use --rejects FILE).")
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core import notifications
+
+
+class Command(BaseCommand):
+    help = "Deletes notifications older than the retention window, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=notifications.DEFAULT_RETENTION_DAYS,
+            help="Keep notifications newer than this many days.",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=notifications.DEFAULT_PRUNE_BATCH,
+            help="Rows deleted per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        deleted = notifications.prune(options['days'], options['batch_size'])
+        self.stdout.write(f"Pruned {deleted} notification(s).")
@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from core import rollups
+
+
+class Command(BaseCommand):
+    help = "Recomputes the room utilization rollups for a window of days (run nightly)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days-back', type=int, default=35,
+            help="Reconcile from this many days before today.",
+        )
+        parser.add_argument(
+            '--days-ahead', type=int, default=120,
+            help="...up to this many days after today (approved future bookings count too).",
+        )
+        parser.add_argument('--start', help="Explicit first day (YYYY-MM-DD), overrides --days-back.")
+        parser.add_argument('--end', help="Explicit last day (YYYY-MM-DD), overrides --days-ahead.")
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        first_day = today - timedelta(days=options['days_back'])
+        last_day = today + timedelta(days=options['days_ahead'])
+        if options['start']:
+            first_day = parse_date(options['start'])
+        if options['end']:
+            last_day = parse_date(options['end'])
+        if not first_day or not last_day or last_day < first_day:
+            raise CommandError("Pass a valid --start/--end range.")
+
+        drifted = rollups.reconcile(first_day, last_day)
+        self.stdout.write(f"Reconciled {first_day} to {last_day}: {drifted} room-day(s) corrected.")
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import outbox
+
+
+class Command(BaseCommand):
+    help = "Emails queued notifications as one digest per user (drains the outbox)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=outbox.DEFAULT_BATCH_SIZE,
+            help="Users whose due notifications are claimed per batch.",
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help="Keep running and check the outbox every --interval seconds.",
+        )
+        parser.add_argument(
+            '--interval', type=int, default=30,
+            help="Seconds between checks when --loop is set.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            # Drain everything that is due, one batch at a time
+            while True:
+                result = outbox.drain(batch_size=options['batch_size'])
+                if result.claimed:
+                    self.stdout.write(
+                        f"Sent {result.sent} digest(s) for {result.claimed} notification(s); "
+                        f"{result.failed} will be retried, {result.skipped} user(s) have no email."
+                    )
+                if result.users < options['batch_size']:
+                    break
+
+            if options['verbosity'] > 1:
+                dead = outbox.dead_letters().count()
+                if dead:
+                    self.stderr.write(f"{dead} notification(s) gave up after {outbox.MAX_ATTEMPTS} attempts.")
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
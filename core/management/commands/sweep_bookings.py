@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import sweeper, waitlist
+
+
+class Command(BaseCommand):
+    help = "Marks approved bookings whose end time has passed as completed, and drops stale waitlist entries."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=sweeper.DEFAULT_BATCH_SIZE,
+            help="Rows updated per transaction.",
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help="Keep running and sweep every --interval seconds.",
+        )
+        parser.add_argument(
+            '--interval', type=int, default=60,
+            help="Seconds between sweeps when --loop is set.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            completed = sweeper.complete_expired_bookings(batch_size=options['batch_size'])
+            if completed:
+                self.stdout.write(f"Completed {completed} booking(s).")
+            elif options['verbosity'] > 1:
+                self.stdout.write(f"Nothing expired (next expiry: {sweeper.next_expiry()}).")
+            expired = waitlist.expire()
+            if expired:
+                self.stdout.write(f"Dropped {expired} waitlist entry(ies) whose start time has passed.")
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,131 @@
+# core/middleware.py
+
+import logging
+import time
+from collections import Counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+
+from .profiling import RequestSample, registry
+
+logger = logging.getLogger('core.profiling')
+
+
+class _QueryRecorder:
+    """
+    connection.execute_wrapper hook: counts and times every query and keeps
+    its SQL "shape" (the statement before parameters are bound) so repeated
+    shapes inside one request can be spotted.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+            self.shapes[sql] += 1
+
+
+def _install(recorder):
+    connection.execute_wrappers.append(recorder)
+
+
+def _uninstall(recorder):
+    connection.execute_wrappers.remove(recorder)
+
+
+class QueryProfilingMiddleware:
+    """
+    Records SQL count, SQL time, template render time and total time for every
+    request, tagged by URL name, into core.profiling.registry and the
+    'core.profiling' log. A query shape repeated PROFILING_N_PLUS_ONE_THRESHOLD
+    times or more in one request is flagged as a likely N+1.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'PROFILING_ENABLED', True)
+        self.threshold = getattr(settings, 'PROFILING_N_PLUS_ONE_THRESHOLD', 5)
+        # Under ASGI, stay async so async views aren't pushed back onto a thread
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        recorder = _QueryRecorder()
+        request._template_seconds = 0.0
+        started = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        return self.finish(request, response, recorder, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        recorder = _QueryRecorder()
+        request._template_seconds = 0.0
+        started = time.perf_counter()
+        # DB connections are per thread and async ORM calls run on the request's
+        # sync thread, so the wrapper has to be installed over there
+        await sync_to_async(_install)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(_uninstall)(recorder)
+        return self.finish(request, response, recorder, time.perf_counter() - started)
+
+    def finish(self, request, response, recorder, total):
+        match = getattr(request, 'resolver_match', None)
+        sample = RequestSample(
+            url_name=(match.url_name if match and match.url_name else 'unresolved'),
+            status=response.status_code,
+            total_ms=total * 1000,
+            sql_count=recorder.count,
+            sql_ms=recorder.seconds * 1000,
+            template_ms=request._template_seconds * 1000,
+            repeated={sql: n for sql, n in recorder.shapes.items() if n >= self.threshold},
+        )
+        registry.record(sample)
+        self.log(sample)
+        return response
+
+    def process_template_response(self, request, response):
+        # TemplateResponse renders after the view returns; time that step
+        render = response.render
+
+        def timed_render():
+            started = time.perf_counter()
+            try:
+                return render()
+            finally:
+                request._template_seconds += time.perf_counter() - started
+
+        response.render = timed_render
+        return response
+
+    def log(self, sample):
+        logger.info(
+            "%s %s total=%.1fms sql=%d/%.1fms template=%.1fms",
+            sample.url_name, sample.status, sample.total_ms,
+            sample.sql_count, sample.sql_ms, sample.template_ms,
+        )
+        for sql, times in sample.repeated.items():
+            logger.warning("Possible N+1 in %s: %d x %s", sample.url_name, times, sql[:200])
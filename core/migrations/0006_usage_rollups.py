@@ -0,0 +1,45 @@
+# Generated by Django 6.0.1 on 2026-10-17 21:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_booking_series'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomDailyUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('booked_minutes', models.PositiveIntegerField(default=0)),
+                ('requested_minutes', models.PositiveIntegerField(default=0)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.room')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'room'], name='usage_daily_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('room', 'day'), name='usage_daily_room_day_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RoomHourlyUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('hour', models.PositiveSmallIntegerField()),
+                ('weekday', models.PositiveSmallIntegerField()),
+                ('booked_minutes', models.PositiveIntegerField(default=0)),
+                ('requested_minutes', models.PositiveIntegerField(default=0)),
+                ('requests', models.PositiveIntegerField(default=0)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.room')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'weekday', 'hour'], name='usage_hourly_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('room', 'day', 'hour'), name='usage_hourly_room_day_hour_uniq')],
+            },
+        ),
+    ]
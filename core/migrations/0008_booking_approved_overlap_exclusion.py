@@ -0,0 +1,37 @@
+# Written by hand: PostgreSQL only, a no-op on other databases (SQLite has no
+# exclusion constraints; there the room lock in core.admission is the guard).
+
+from django.db import migrations
+
+CONSTRAINT = 'booking_no_approved_overlap'
+
+FORWARD = [
+    # btree_gist lets the GiST index compare room_id with "="
+    "CREATE EXTENSION IF NOT EXISTS btree_gist",
+    f"""
+    ALTER TABLE core_booking ADD CONSTRAINT {CONSTRAINT}
+        EXCLUDE USING gist (room_id WITH =, tstzrange(start_time, end_time, '[)') WITH &&)
+        WHERE (status = 'approved')
+    """,
+]
+BACKWARD = [f"ALTER TABLE core_booking DROP CONSTRAINT IF EXISTS {CONSTRAINT}"]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(FORWARD), run(BACKWARD)),
+    ]
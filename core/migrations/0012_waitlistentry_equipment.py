@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-17 22:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_booking_start_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='waitlistentry',
+            name='equipment',
+            field=models.ManyToManyField(blank=True, to='core.equipment'),
+        ),
+    ]
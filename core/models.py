@@ -2,6 +2,8 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 
+from . import availability
+
 # Choices for Profile Roles
 ROLE_CHOICES = (
     ('student', 'Student'),
@@ -46,26 +48,70 @@ class Equipment(models.Model):
         return self.name
 
 
+class BookingSeries(models.Model):
+    """
+    A weekly recurring reservation, e.g. "ComLab 1, Mon & Wed 8-10 AM until
+    the end of the semester". Each date is stored as a regular Booking.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    room = models.ForeignKey(Room, on_delete=models.CASCADE)
+    purpose = models.CharField(max_length=255)
+
+    first_date = models.DateField()
+    until = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    weekdays = models.CharField(max_length=13)  # e.g. "0,2" = Monday & Wednesday
+    interval = models.PositiveSmallIntegerField(default=1)  # every N weeks
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def weekday_list(self):
+        return [int(day) for day in self.weekdays.split(',') if day != '']
+
+    def __str__(self):
+        return f"{self.user.username} - {self.room.name} (series)"
+
+
 class Booking(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     room = models.ForeignKey(Room, on_delete=models.CASCADE)
     equipment = models.ManyToManyField(Equipment, blank=True)
+    series = models.ForeignKey(
+        BookingSeries, on_delete=models.CASCADE, null=True, blank=True, related_name='bookings'
+    )
 
     start_time = models.DateTimeField()
     end_time = models.DateTimeField()
     purpose = models.CharField(max_length=255)
     status = models.CharField(max_length=20, choices=BOOKING_STATUS_CHOICES, default='pending')
 
+    class Meta:
+        indexes = [
+            # Backs the overlap probe in core.availability (covering index)
+            models.Index(fields=['room', 'status', 'start_time', 'end_time'], name='booking_room_avail_idx'),
+            # "Next expiry" watermark for core.sweeper
+            models.Index(fields=['status', 'end_time'], name='booking_status_end_idx'),
+            # Admin queues: one status, keyset-paged by start_time
+            models.Index(fields=['status', 'start_time'], name='booking_status_start_idx'),
+            # Dashboard: a user's bookings, newest first
+            models.Index(fields=['user', '-start_time'], name='booking_user_start_idx'),
+            # Django admin changelist: newest first, and its date filter
+            models.Index(fields=['start_time', 'id'], name='booking_start_idx'),
+        ]
+        # On PostgreSQL, migration 0008 also adds an exclusion constraint so two
+        # approved bookings can never overlap in the same room
+
     def clean(self):
+        # BookingForm already probed this exact window (see availability.mark_checked)
+        if availability.is_checked(self):
+            return
+
         # Prevent Double Booking
-        overlapping = Booking.objects.filter(
-            room=self.room,
-            status='approved',
-            start_time__lt=self.end_time,
-            end_time__gt=self.start_time
-        ).exclude(id=self.id)
-
-        if overlapping.exists():
+        conflict = availability.find_conflict(
+            self.room, self.start_time, self.end_time,
+            statuses=('approved',), exclude_id=self.id,
+        )
+        if conflict:
             raise ValidationError(f"Room {self.room.name} is already booked for this time.")
 
     def save(self, *args, **kwargs):
@@ -76,8 +122,134 @@ class Booking(models.Model):
         return f"{self.user.username} - {self.room.name}"
 
 
+class WaitlistEntry(models.Model):
+    """
+    A request that was refused because the slot was taken. When a booking in
+    that room is cancelled, rejected or moved, core.waitlist turns the
+    earliest compatible entry into a pending booking and tells the user.
+    """
+    STATUS_CHOICES = (
+        ('waiting', 'Waiting'),
+        ('promoted', 'Promoted'),
+    )
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    room = models.ForeignKey(Room, on_delete=models.CASCADE)
+    equipment = models.ManyToManyField(Equipment, blank=True)  # carried over to the booking
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    purpose = models.CharField(max_length=255)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='waiting')
+    booking = models.OneToOneField(Booking, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # "Who is waiting for this room around this time?" Only waiting rows
+            models.Index(
+                fields=['room', 'start_time', 'end_time'], condition=models.Q(status='waiting'),
+                name='waitlist_room_window_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} waiting for {self.room.name}"
+
+
 class Notification(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     message = models.CharField(max_length=255)
     is_read = models.BooleanField(default=False)
-    created_at = models.DateTimeField(auto_now_add=True)
\ No newline at end of file
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Newest-first feed per user (and its cursor pages)
+            models.Index(fields=['user', '-created_at', '-id'], name='notif_user_feed_idx'),
+            # Retention pruning
+            models.Index(fields=['created_at'], name='notif_created_idx'),
+            # "Mark all as read" only touches the unread ones
+            models.Index(fields=['user'], condition=models.Q(is_read=False), name='notif_user_unread_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username}: {self.message}"
+
+
+class NotificationOutbox(models.Model):
+    """
+    A notification that still has to go out by email. Written in the same
+    transaction as the notification itself (core.notifications), drained by
+    the `send_notification_emails` worker (core.outbox).
+    """
+    notification = models.OneToOneField(Notification, on_delete=models.CASCADE, related_name='outbox')
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    available_at = models.DateTimeField()  # not picked up before this (digest delay, retry backoff)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        indexes = [
+            # The worker only ever looks at what is still unsent
+            models.Index(
+                fields=['available_at'], condition=models.Q(sent_at__isnull=True), name='outbox_due_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}: notification {self.notification_id}"
+
+
+class NotificationCounter(models.Model):
+    """
+    Denormalized unread count per user, kept in step by core.notifications
+    so the navbar badge never has to COUNT the notifications table.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True)
+    unread = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user.username}: {self.unread} unread"
+
+class RoomDailyUsage(models.Model):
+    """
+    Per room and local day: minutes booked (approved/completed) and minutes
+    requested (approved/completed/rejected). Maintained incrementally by
+    core.rollups and reconciled nightly (`rollup_usage`).
+    """
+    room = models.ForeignKey(Room, on_delete=models.CASCADE)
+    day = models.DateField()
+    booked_minutes = models.PositiveIntegerField(default=0)
+    requested_minutes = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['room', 'day'], name='usage_daily_room_day_uniq'),
+        ]
+        indexes = [
+            # Semester reports read every room for a day range
+            models.Index(fields=['day', 'room'], name='usage_daily_day_idx'),
+        ]
+
+
+class RoomHourlyUsage(models.Model):
+    """
+    Same numbers per local hour, plus how many requests touched the hour,
+    for the "top demanded time slots" report.
+    """
+    room = models.ForeignKey(Room, on_delete=models.CASCADE)
+    day = models.DateField()
+    hour = models.PositiveSmallIntegerField()
+    weekday = models.PositiveSmallIntegerField()  # 0 = Monday, stored so reports can GROUP BY it
+    booked_minutes = models.PositiveIntegerField(default=0)
+    requested_minutes = models.PositiveIntegerField(default=0)
+    requests = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['room', 'day', 'hour'], name='usage_hourly_room_day_hour_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'weekday', 'hour'], name='usage_hourly_day_idx'),
+        ]
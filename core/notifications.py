@@ -0,0 +1,163 @@
+# core/notifications.py
+
+"""
+Notification writes and the per-user unread counter.
+
+Every write that changes how many unread notifications a user has goes
+through here, so NotificationCounter stays in step without ever counting
+the notifications table on a page view.
+"""
+
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import outbox
+from .models import Notification, NotificationCounter
+from .signals import notifications_changed
+
+FEED_PAGE_SIZE = 10
+DEFAULT_RETENTION_DAYS = 90
+DEFAULT_PRUNE_BATCH = 1000
+
+
+def _adjust_counters(deltas):
+    """
+    Applies {user_id: +/-n} to the unread counters, one UPDATE per distinct n.
+    """
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=user_id) for user_id in deltas], ignore_conflicts=True
+    )
+    by_amount = defaultdict(list)
+    for user_id, delta in deltas.items():
+        by_amount[delta].append(user_id)
+    for delta, user_ids in by_amount.items():
+        # Never below zero, even if the counter had drifted
+        NotificationCounter.objects.filter(user_id__in=user_ids).update(
+            unread=Greatest(F('unread') + delta, Value(0))
+        )
+
+
+def notify_many(messages):
+    """
+    Creates notifications from (user_id, message) pairs in one INSERT, and
+    queues them for email (core.outbox) in the same transaction.
+    """
+    messages = list(messages)
+    if not messages:
+        return []
+    with transaction.atomic():
+        created = Notification.objects.bulk_create(
+            Notification(user_id=user_id, message=message) for user_id, message in messages
+        )
+        outbox.enqueue(created)
+        _adjust_counters(Counter(user_id for user_id, _ in messages))
+    notifications_changed.send(sender=Notification, user_ids={user_id for user_id, _ in messages})
+    return created
+
+
+def notify(user, message):
+    return notify_many([(user.pk, message)])[0]
+
+
+def unread_count(user):
+    return (
+        NotificationCounter.objects.filter(user=user).values_list('unread', flat=True).first() or 0
+    )
+
+
+async def aunread_count(user):
+    unread = await NotificationCounter.objects.filter(user=user).values_list('unread', flat=True).afirst()
+    return unread or 0
+
+
+def mark_read(user, notification_ids=None):
+    """
+    Marks the given notifications (or all of them) as read. Nothing is deleted.
+    Returns how many were actually unread.
+    """
+    with transaction.atomic():
+        unread = Notification.objects.filter(user=user, is_read=False)
+        if notification_ids is not None:
+            unread = unread.filter(pk__in=notification_ids)
+        changed = unread.update(is_read=True)
+        if notification_ids is None:
+            # Marking everything read is also a cheap moment to heal any drift
+            NotificationCounter.objects.update_or_create(user=user, defaults={'unread': 0})
+        else:
+            _adjust_counters({user.pk: -changed})
+    if changed:
+        notifications_changed.send(sender=Notification, user_ids=[user.pk])
+    return changed
+
+
+def mark_read_many(notification_ids):
+    """
+    mark_read() across users (the Django admin action). Returns how many were
+    actually unread.
+    """
+    with transaction.atomic():
+        # Locked, so a concurrent mark_read() can't make us decrement twice
+        unread = list(
+            Notification.objects.select_for_update()
+            .filter(pk__in=notification_ids, is_read=False)
+            .values_list('pk', 'user_id')
+        )
+        Notification.objects.filter(pk__in=[pk for pk, _ in unread]).update(is_read=True)
+        _adjust_counters({user_id: -count for user_id, count in Counter(user_id for _, user_id in unread).items()})
+    if unread:
+        notifications_changed.send(sender=Notification, user_ids={user_id for _, user_id in unread})
+    return len(unread)
+
+
+def delete_many(notification_ids):
+    """
+    Deletes notifications across users (the Django admin), taking the unread
+    ones off the counters. Returns how many were deleted.
+    """
+    with transaction.atomic():
+        doomed = list(
+            Notification.objects.select_for_update()
+            .filter(pk__in=notification_ids)
+            .values_list('pk', 'user_id', 'is_read')
+        )
+        Notification.objects.filter(pk__in=[pk for pk, _, _ in doomed]).delete()
+        unread = Counter(user_id for _, user_id, is_read in doomed if not is_read)
+        _adjust_counters({user_id: -count for user_id, count in unread.items()})
+    if doomed:
+        notifications_changed.send(sender=Notification, user_ids={user_id for _, user_id, _ in doomed})
+    return len(doomed)
+
+
+def prune(retention_days=DEFAULT_RETENTION_DAYS, batch_size=DEFAULT_PRUNE_BATCH):
+    """
+    Deletes notifications older than the retention window, `batch_size` rows
+    per transaction, keeping the unread counters correct. Meant for the
+    `prune_notifications` management command, not the request path.
+    """
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                Notification.objects.filter(created_at__lt=cutoff)
+                .order_by('created_at')
+                .values_list('pk', 'user_id', 'is_read')[:batch_size]
+            )
+            if not batch:
+                break
+            Notification.objects.filter(pk__in=[pk for pk, _, _ in batch]).delete()
+            pruned_unread = Counter(user_id for _, user_id, is_read in batch if not is_read)
+            _adjust_counters({user_id: -count for user_id, count in pruned_unread.items()})
+            deleted += len(batch)
+        notifications_changed.send(sender=Notification, user_ids={user_id for _, user_id, _ in batch})
+        if len(batch) < batch_size:
+            break
+    return deleted
@@ -0,0 +1,176 @@
+# core/outbox.py
+
+"""
+Email delivery for notifications (transactional outbox).
+
+Views never talk to the mail server. Every notification gets a
+NotificationOutbox row in the same transaction (core.notifications), so a
+status change and its email either both happen or neither does. The
+`send_notification_emails` worker then drains the outbox:
+
+    1. claim a batch of users and all their due rows (a short transaction
+       that leases them for LEASE, so a second worker skips them and a
+       crashed one's rows come back)
+    2. group them per user: one digest email however many updates piled up
+       (new rows wait DIGEST_DELAY first, so a burst of decisions coalesces)
+    3. send through Django's email backend (settings.EMAIL_BACKEND)
+    4. mark sent, or push available_at back with exponential backoff;
+       after MAX_ATTEMPTS a row is left alone (see last_error)
+
+Delivery is at-least-once: a worker killed between sending and marking will
+send that digest again once the lease runs out.
+"""
+
+from dataclasses import dataclass
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F, Min
+from django.utils import timezone
+
+from .models import NotificationOutbox
+
+DEFAULT_BATCH_SIZE = 200
+MAX_ATTEMPTS = 6
+LEASE = timedelta(minutes=5)
+BACKOFF_BASE = timedelta(minutes=1)
+BACKOFF_MAX = timedelta(hours=2)
+
+
+@dataclass
+class DrainResult:
+    claimed: int = 0  # outbox rows picked up
+    users: int = 0  # users those rows belong to
+    sent: int = 0  # digest emails sent
+    failed: int = 0  # digests that will be retried
+    skipped: int = 0  # users without an email address
+
+
+def digest_delay():
+    return timedelta(seconds=getattr(settings, 'NOTIFICATION_DIGEST_DELAY', 120))
+
+
+def backoff(attempts):
+    """
+    Wait before retry number `attempts` (1 min, 2, 4, ... capped at BACKOFF_MAX).
+    """
+    return min(BACKOFF_BASE * 2 ** max(attempts - 1, 0), BACKOFF_MAX)
+
+
+def enqueue(notifications):
+    """
+    Queues freshly created notifications for email. Call inside the
+    transaction that created them.
+    """
+    available_at = timezone.now() + digest_delay()
+    NotificationOutbox.objects.bulk_create(
+        NotificationOutbox(notification_id=n.pk, user_id=n.user_id, available_at=available_at)
+        for n in notifications
+    )
+
+
+def _claim(now, batch_size):
+    """
+    Leases every due row of up to `batch_size` users (the ones waiting
+    longest), so each user's updates go out in one digest instead of being
+    split across batches. Returns (row ids, number of users).
+    """
+    due = NotificationOutbox.objects.filter(sent_at__isnull=True, available_at__lte=now, attempts__lt=MAX_ATTEMPTS)
+    user_ids = list(
+        due.values('user_id').annotate(waiting_since=Min('available_at'))
+        .order_by('waiting_since', 'user_id')
+        .values_list('user_id', flat=True)[:batch_size]
+    )
+    if not user_ids:
+        return [], 0
+    with transaction.atomic():
+        rows = list(
+            due.select_for_update(skip_locked=True)
+            .filter(user_id__in=user_ids)
+            .order_by('pk')
+            .values_list('pk', 'user_id')
+        )
+        if rows:
+            NotificationOutbox.objects.filter(pk__in=[pk for pk, _ in rows]).update(
+                available_at=now + LEASE, attempts=F('attempts') + 1
+            )
+    return [pk for pk, _ in rows], len({user_id for _, user_id in rows})
+
+
+def digest_message(user, rows):
+    notes = [row.notification for row in rows]
+    if len(notes) == 1:
+        subject = "CvSUReserve: your booking was updated"
+    else:
+        subject = f"CvSUReserve: {len(notes)} booking updates"
+    lines = [f"Hi {user.first_name or user.username},", ""]
+    for note in notes:
+        lines.append(f"- {note.message} ({timezone.localtime(note.created_at):%b %d, %I:%M %p})")
+    lines += ["", "You can see all your bookings on your CvSUReserve dashboard."]
+    return EmailMessage(subject, "\n".join(lines), to=[user.email])
+
+
+def _retry_later(rows, error, now):
+    attempts = max(row.attempts for row in rows)
+    NotificationOutbox.objects.filter(pk__in=[row.pk for row in rows]).update(
+        available_at=now + backoff(attempts), last_error=f"{type(error).__name__}: {error}"[:255],
+    )
+
+
+def drain(batch_size=DEFAULT_BATCH_SIZE, now=None):
+    """
+    Sends the due notifications of up to `batch_size` users, one digest each.
+    """
+    now = now or timezone.now()
+    result = DrainResult()
+    ids, result.users = _claim(now, batch_size)
+    if not ids:
+        return result
+    result.claimed = len(ids)
+
+    rows = (
+        NotificationOutbox.objects.filter(pk__in=ids)
+        .select_related('user', 'notification')
+        .order_by('user_id', 'notification__created_at', 'pk')
+    )
+    digests = [(user, list(group)) for user, group in groupby(rows, key=lambda row: row.user)]
+
+    done = []
+    try:
+        connection = get_connection()
+        connection.open()
+    except Exception as error:  # mail server unreachable: every digest waits
+        for _, user_rows in digests:
+            _retry_later(user_rows, error, now)
+        result.failed = len(digests)
+        return result
+
+    try:
+        for user, user_rows in digests:
+            if not user.email:
+                done += user_rows
+                result.skipped += 1
+                continue
+            try:
+                connection.send_messages([digest_message(user, user_rows)])
+            except Exception as error:  # SMTP / socket errors: retry this user later
+                _retry_later(user_rows, error, now)
+                result.failed += 1
+            else:
+                done += user_rows
+                result.sent += 1
+    finally:
+        connection.close()
+
+    NotificationOutbox.objects.filter(pk__in=[row.pk for row in done]).update(sent_at=now, last_error='')
+    return result
+
+
+def dead_letters():
+    """
+    Rows that ran out of attempts.
+    """
+    return NotificationOutbox.objects.filter(sent_at__isnull=True, attempts__gte=MAX_ATTEMPTS)
@@ -0,0 +1,137 @@
+# core/pagination.py
+
+"""
+Keyset (a.k.a. seek) pagination over (<datetime field>, id).
+
+Unlike Django's Paginator this never runs COUNT(*) or OFFSET, so page N costs
+the same as page 1: one index range read of `per_page + 1` rows.
+
+The admin changelists can't use keysets (they page by number), so they get
+EstimatedCountPaginator instead, which at least keeps the count cheap.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.db.models.fields import AutoFieldMixin
+from django.utils.encoding import force_str
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+
+@dataclass
+class KeysetPage:
+    items: list
+    next_cursor: str | None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def make_cursor(value, pk):
+    return urlsafe_base64_encode(f"{value.isoformat()}|{pk}".encode())
+
+
+def encode_cursor(obj, field='start_time'):
+    return make_cursor(getattr(obj, field), obj.pk)
+
+
+def decode_cursor(token):
+    """
+    Returns (timestamp, pk), or None for a missing or tampered cursor.
+    """
+    if not token:
+        return None
+    try:
+        start, pk = force_str(urlsafe_base64_decode(token)).split('|')
+        return datetime.fromisoformat(start), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _seek(queryset, cursor, per_page, descending, field):
+    if descending:
+        queryset = queryset.order_by(f'-{field}', '-pk')
+    else:
+        queryset = queryset.order_by(field, 'pk')
+
+    position = decode_cursor(cursor)
+    if position:
+        value, pk = position
+        if descending:
+            after = Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk})
+        else:
+            after = Q(**{f'{field}__gt': value}) | Q(**{field: value, 'pk__gt': pk})
+        queryset = queryset.filter(after)
+
+    # One extra row tells us whether there is a next page
+    return queryset[:per_page + 1]
+
+
+def _page(rows, per_page, field):
+    items = rows[:per_page]
+    next_cursor = encode_cursor(items[-1], field) if len(rows) > per_page else None
+    return KeysetPage(items=items, next_cursor=next_cursor)
+
+
+def paginate_keyset(queryset, cursor, per_page, descending=False, field='start_time'):
+    """
+    Returns the page of `queryset` that comes right after `cursor`.
+    """
+    rows = list(_seek(queryset, cursor, per_page, descending, field))
+    return _page(rows, per_page, field)
+
+
+async def apaginate_keyset(queryset, cursor, per_page, descending=False, field='start_time'):
+    """
+    Async version of paginate_keyset() for the ASGI views.
+    """
+    rows = [row async for row in _seek(queryset, cursor, per_page, descending, field)]
+    return _page(rows, per_page, field)
+
+
+# ---------------------------------------------------------
+# Numbered pages with a cheap count (Django admin)
+# ---------------------------------------------------------
+
+def estimated_count(queryset):
+    """
+    An upper bound on the size of an unfiltered queryset: its highest
+    primary key, read off the pk index. Rows lost to deletes only make the
+    last pages come up short, never unreachable. None for filtered
+    querysets or non-integer keys.
+    """
+    if queryset.query.where or not isinstance(queryset.model._meta.pk, AutoFieldMixin):
+        return None
+    return queryset.order_by('-pk').values_list('pk', flat=True).first()
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator whose count never reads the whole table. The admin changelist
+    asks for it on every page view, so it counts up to a limit (COUNT over a
+    LIMIT subquery) and, when the limit is hit:
+
+    * an unfiltered list uses estimated_count(), so every page can be reached
+    * a filtered list shows LOOKAHEAD_PAGES pages past the one asked for
+      (`page`); walking forward moves the limit along, so the count costs
+      about what the page's own OFFSET already does
+    """
+
+    COUNT_LIMIT = 10_000
+    LOOKAHEAD_PAGES = 10
+
+    def __init__(self, *args, page=1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.page_hint = page
+
+    @cached_property
+    def count(self):
+        limit = max(self.COUNT_LIMIT, (self.page_hint + self.LOOKAHEAD_PAGES) * self.per_page)
+        counted = self.object_list.order_by()[:limit].count()
+        if counted < limit:
+            return counted
+        return max(estimated_count(self.object_list) or 0, counted)
@@ -0,0 +1,100 @@
+# core/profiling.py
+
+"""
+In-memory request metrics for the profiling panel.
+
+QueryProfilingMiddleware (core.middleware) records one RequestSample per
+request. Samples are grouped by URL name and kept in a bounded window per
+route, so the numbers always describe recent traffic and memory use stays
+flat. Everything here is per process; each worker reports its own traffic.
+"""
+
+import threading
+from collections import Counter, deque
+from dataclasses import dataclass, field
+
+from django.conf import settings
+
+# Upper bounds (ms) of the latency histogram buckets; the last one is open-ended
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+# N+1 shapes kept per route. IN lists of every length are distinct shapes,
+# so past twice this the rarest ones are dropped
+MAX_SUSPECTS = 50
+
+
+@dataclass
+class RequestSample:
+    url_name: str
+    status: int
+    total_ms: float
+    sql_count: int = 0
+    sql_ms: float = 0.0
+    template_ms: float = 0.0
+    repeated: dict = field(default_factory=dict)  # N+1 suspects: {sql shape: times}
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class RouteStats:
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.suspects = Counter()  # requests per N+1 shape, the most common MAX_SUSPECTS or so
+
+    def add(self, sample):
+        self.samples.append(sample)
+        for shape in sample.repeated:
+            self.suspects[shape] += 1
+        if len(self.suspects) > 2 * MAX_SUSPECTS:
+            self.suspects = Counter(dict(self.suspects.most_common(MAX_SUSPECTS)))
+
+    def summary(self):
+        samples = list(self.samples)
+        totals = [s.total_ms for s in samples]
+        histogram = [0] * (len(BUCKETS_MS) + 1)
+        for value in totals:
+            histogram[next((i for i, bound in enumerate(BUCKETS_MS) if value <= bound), len(BUCKETS_MS))] += 1
+        count = len(samples) or 1
+        return {
+            'requests': len(samples),
+            'p50_ms': _percentile(totals, 50),
+            'p95_ms': _percentile(totals, 95),
+            'p99_ms': _percentile(totals, 99),
+            'avg_sql_count': sum(s.sql_count for s in samples) / count,
+            'max_sql_count': max((s.sql_count for s in samples), default=0),
+            'avg_sql_ms': sum(s.sql_ms for s in samples) / count,
+            'avg_template_ms': sum(s.template_ms for s in samples) / count,
+            'histogram': dict(zip([f"<={b}ms" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"], histogram)),
+            'n_plus_one': [
+                {'sql': shape, 'requests': hits} for shape, hits in self.suspects.most_common(5)
+            ],
+        }
+
+
+class ProfileRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, sample):
+        window = getattr(settings, 'PROFILING_WINDOW', 500)
+        with self._lock:
+            route = self._routes.get(sample.url_name)
+            if route is None:
+                route = self._routes[sample.url_name] = RouteStats(window)
+            route.add(sample)
+
+    def snapshot(self):
+        with self._lock:
+            return {name: route.summary() for name, route in sorted(self._routes.items())}
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+registry = ProfileRegistry()
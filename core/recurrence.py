@@ -0,0 +1,82 @@
+# core/recurrence.py
+
+"""
+Recurring booking series.
+
+A series is a small RRULE subset: FREQ=WEEKLY;INTERVAL=n;BYDAY=...;UNTIL=...
+It is expanded into concrete (start, end) windows, all of them are checked
+against the room's schedule with ONE range query plus in-memory probes, and
+the occurrences are written with a single bulk_create.
+"""
+
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import availability
+from .models import Booking
+from .signals import bookings_changed
+
+WEEKDAY_CHOICES = (
+    (0, 'Mon'), (1, 'Tue'), (2, 'Wed'), (3, 'Thu'), (4, 'Fri'), (5, 'Sat'), (6, 'Sun'),
+)
+# Roughly two semesters of three meetings a week
+MAX_OCCURRENCES = 200
+# Longest first_date..until span; expansion walks it a day at a time
+MAX_SPAN_DAYS = 2 * 366
+
+
+def expand(first_date, until, weekdays, start_time, end_time, interval=1):
+    """
+    Yields aware (start, end) datetimes for every date the series meets.
+    """
+    tz = timezone.get_current_timezone()
+    weekdays = set(weekdays)
+    week_zero = first_date - timedelta(days=first_date.weekday())
+
+    day = first_date
+    while day <= until:
+        weeks_in = (day - week_zero).days // 7
+        if day.weekday() in weekdays and weeks_in % interval == 0:
+            yield (
+                timezone.make_aware(datetime.combine(day, start_time), tz),
+                timezone.make_aware(datetime.combine(day, end_time), tz),
+            )
+        day += timedelta(days=1)
+
+
+def series_windows(series):
+    return list(expand(
+        series.first_date, series.until, series.weekday_list(),
+        series.start_time, series.end_time, series.interval,
+    ))
+
+
+def find_conflicts(room, windows, statuses=availability.BLOCKING_STATUSES):
+    """
+    Returns the windows that collide with the room's existing bookings.
+    """
+    if not windows:
+        return []
+    index = availability.load_room_indexes(
+        [room.pk], windows[0][0], windows[-1][1], statuses=statuses,
+    )[room.pk]
+    return [(start, end) for start, end in windows if index.find_conflict(start, end) is not None]
+
+
+def create_occurrences(series, windows):
+    """
+    Saves the series' bookings in one INSERT. Callers validate `windows` first
+    (under the room lock, see core.admission.save_series).
+    """
+    bookings = Booking.objects.bulk_create(
+        Booking(
+            user_id=series.user_id, room_id=series.room_id, series=series,
+            start_time=start, end_time=end, purpose=series.purpose,
+        )
+        for start, end in windows
+    )
+    # bulk_create skips post_save, so tell the caches once the rows are visible
+    transaction.on_commit(lambda: bookings_changed.send(sender=Booking, bookings=bookings))
+    return bookings
@@ -0,0 +1,125 @@
+# core/roles.py
+
+"""
+Who is this user? Role lookups without a Profile query per request.
+
+RoleBackend (settings.AUTHENTICATION_BACKENDS) loads the session user the
+way Django does, but joins the Profile in the same query, or, when the
+profile is already cached, skips the join. Either way request.user arrives
+with:
+
+    user.profile           (or None cached, for users without one)
+    user.role              'student' / 'faculty' / 'admin' / None
+    user.is_booking_staff  may use the approval pages (is_staff or role 'admin')
+
+Permission checks call is_booking_staff(user), which only reads those
+attributes. The cache entry is dropped whenever the Profile is saved or
+deleted (core.signals), and again when that change commits. The default
+cache is shared by every worker (settings.CACHES), so they all see the
+drop; with a per-process cache (locmem) other processes could keep an old
+role for up to ROLE_CACHE_TIMEOUT.
+"""
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Profile
+
+ROLE_CACHE_TIMEOUT = 60 * 5
+STAFF_ROLES = ('admin',)
+_NO_PROFILE = 'none'
+
+
+def _key(user_id):
+    return f"role:{user_id}"
+
+
+def forget(user_id):
+    cache.delete(_key(user_id))
+    # And again once the change is committed: a request in between still
+    # read the old profile, and may have cached it
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: cache.delete(_key(user_id)))
+
+
+def _attach(user, profile):
+    Profile.user.field.remote_field.set_cached_value(user, profile)  # user.profile, no query
+    user.role = profile.role if profile else None
+    user.is_booking_staff = user.is_staff or user.role in STAFF_ROLES
+
+
+def _from_cache(user, cached):
+    if cached == _NO_PROFILE:
+        profile = None
+    else:
+        profile_id, role, department = cached
+        profile = Profile(id=profile_id, user=user, role=role, department=department)
+    _attach(user, profile)
+
+
+def _to_cache(user):
+    """
+    Caches the profile that came with the user (select_related) and attaches it.
+    """
+    try:
+        profile = user.profile
+    except Profile.DoesNotExist:
+        profile = None
+    cache.set(
+        _key(user.pk),
+        (profile.pk, profile.role, profile.department) if profile else _NO_PROFILE,
+        ROLE_CACHE_TIMEOUT,
+    )
+    _attach(user, profile)
+
+
+def resolve(user):
+    """
+    Attaches profile/role to a user that didn't come through RoleBackend
+    (e.g. one loaded in a shell or a test). Memoized on the user object.
+    """
+    if hasattr(user, 'is_booking_staff') or not user.is_authenticated:
+        return user
+    cached = cache.get(_key(user.pk))
+    if cached is not None:
+        _from_cache(user, cached)
+    else:
+        _to_cache(user)  # one query for the profile, then cached
+    return user
+
+
+def role(user):
+    return getattr(resolve(user), 'role', None)
+
+
+def is_booking_staff(user):
+    return bool(getattr(resolve(user), 'is_booking_staff', False))
+
+
+class RoleBackend(ModelBackend):
+    """
+    ModelBackend that hands out users with their role attached.
+    """
+
+    def get_user(self, user_id):
+        cached = cache.get(_key(user_id))
+        users = get_user_model()._default_manager
+        if cached is None:
+            users = users.select_related('profile')
+        try:
+            user = users.get(pk=user_id)
+        except get_user_model().DoesNotExist:
+            return None
+        if not self.user_can_authenticate(user):
+            return None
+        if cached is None:
+            _to_cache(user)
+        else:
+            _from_cache(user, cached)
+        return user
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        user = super().authenticate(request, username=username, password=password, **kwargs)
+        return resolve(user) if user else None
@@ -0,0 +1,298 @@
+# core/rollups.py
+
+"""
+Room utilization rollups.
+
+RoomDailyUsage / RoomHourlyUsage hold, per room and local day (and hour),
+the minutes that were booked and requested. Reports over a whole semester
+read a few thousand rollup rows instead of scanning bookings. The daily rows
+only count the open hours (grid.DAY_START_HOUR to DAY_END_HOUR), the window
+occupancy is measured against; the hourly rows keep every hour for
+top_slots().
+
+The tables are kept current incrementally: every booking change (see
+core.signals) is turned into +/- deltas between what the booking used to
+contribute and what it contributes now, and those are applied with one
+upsert per table per batch. `rollup_usage` (nightly) recomputes a window of
+days from the bookings table and repairs any drift.
+
+    booked     approved or completed bookings (the room was actually taken)
+    requested  booked + rejected (somebody wanted the slot)
+"""
+
+from collections import defaultdict
+from datetime import date, datetime, time as dt_time, timedelta
+
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .grid import DAY_END_HOUR, DAY_START_HOUR
+from .models import Booking, Room, RoomDailyUsage, RoomHourlyUsage
+
+BOOKED_STATUSES = ('approved', 'completed')
+REQUESTED_STATUSES = ('approved', 'completed', 'rejected')
+# Occupancy is measured against the hours the grid shows as bookable
+OPEN_MINUTES = (DAY_END_HOUR - DAY_START_HOUR) * 60
+MAX_REPORT_DAYS = 400
+
+
+def _hours(start_time, end_time):
+    """
+    Yields (local day, hour, minutes) for every local hour the window touches.
+    """
+    tz = timezone.get_current_timezone()
+    cursor = start_time.astimezone(tz)
+    end = end_time.astimezone(tz)
+    while cursor < end:
+        next_hour = cursor.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        stop = min(next_hour, end)
+        yield cursor.date(), cursor.hour, int((stop - cursor).total_seconds() // 60)
+        cursor = stop
+
+
+def _add(hourly, room_id, status, start_time, end_time, sign=1):
+    """
+    Adds (or with sign=-1 removes) one booking's share to `hourly`:
+    {(room_id, day, hour): [booked, requested, requests]}.
+    """
+    if status not in REQUESTED_STATUSES or not (room_id and start_time and end_time):
+        return
+    booked = status in BOOKED_STATUSES
+    for day, hour, minutes in _hours(start_time, end_time):
+        row = hourly[(room_id, day, hour)]
+        if booked:
+            row[0] += sign * minutes
+        row[1] += sign * minutes
+        row[2] += sign
+
+
+def _daily(hourly):
+    """
+    Sums hourly deltas per (room, day), counting only the open hours, so a
+    day never holds more than OPEN_MINUTES of booked time.
+    """
+    daily = defaultdict(lambda: [0, 0])
+    for (room_id, day, hour), (booked, requested, _) in hourly.items():
+        if not DAY_START_HOUR <= hour < DAY_END_HOUR:
+            continue
+        row = daily[(room_id, day)]
+        row[0] += booked
+        row[1] += requested
+    return daily
+
+
+def _bump(model, key_fields, deltas, value_fields, defaults=lambda key: {}, batch_size=500):
+    """
+    Adds `deltas` ({(room_id, day, ...): [values]}) to the matching rows,
+    creating missing ones. One INSERT ... ON CONFLICT DO UPDATE per
+    `batch_size` keys (PostgreSQL and SQLite both have it).
+
+    A new row starts at max(delta, 0). An existing row gets
+    max(row + delta, 0); negative deltas can't travel in the inserted row
+    (the columns are unsigned), so they are picked out by key in a CASE.
+    """
+    deltas = [(key, values) for key, values in deltas.items() if any(values)]
+    if not deltas:
+        return
+    meta = model._meta
+    ops = connection.ops
+    greatest = 'GREATEST' if connection.vendor == 'postgresql' else 'MAX'
+    extra_fields = list(defaults(deltas[0][0]))
+    columns = [meta.get_field(name).column for name in (*key_fields, *extra_fields, *value_fields)]
+    key_columns = columns[:len(key_fields)]
+    table = ops.quote_name(meta.db_table)
+
+    def adapt(value):
+        return ops.adapt_datefield_value(value) if isinstance(value, date) else value
+
+    for position in range(0, len(deltas), batch_size):
+        batch = deltas[position:position + batch_size]
+        rows, params = [], []
+        for key, values in batch:
+            rows.append('(%s)' % ', '.join(['%s'] * len(columns)))
+            params += [adapt(part) for part in key]
+            params += list(defaults(key).values())
+            params += [max(value, 0) for value in values]
+
+        assignments, case_params = [], []
+        match = ' AND '.join(f'excluded.{ops.quote_name(column)} = %s' for column in key_columns)
+        for index, name in enumerate(value_fields):
+            column = ops.quote_name(meta.get_field(name).column)
+            negative = [(key, values[index]) for key, values in batch if values[index] < 0]
+            delta = f'excluded.{column}'
+            if negative:
+                delta = 'CASE %s ELSE excluded.%s END' % (' '.join([f'WHEN {match} THEN %s'] * len(negative)), column)
+                for key, value in negative:
+                    case_params += [adapt(part) for part in key] + [value]
+            # Never below zero, even if the rollup had drifted
+            assignments.append(f'{column} = {greatest}({table}.{column} + {delta}, 0)')
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(ops.quote_name(column) for column in columns)}) "
+                f"VALUES {', '.join(rows)} "
+                f"ON CONFLICT ({', '.join(ops.quote_name(column) for column in key_columns)}) "
+                f"DO UPDATE SET {', '.join(assignments)}",
+                params + case_params,
+            )
+
+
+def record_changes(bookings, deleted=False, created=False):
+    """
+    Moves each booking's contribution from its original state (remembered by
+    core.signals on load) to its current state. Just-created bookings had no
+    original state in the table, whatever they were constructed with.
+    """
+    hourly = defaultdict(lambda: [0, 0, 0])
+    for booking in bookings:
+        original_window = getattr(booking, '_original_window', None)
+        if original_window and not created:
+            room_id, start_time, end_time = original_window
+            _add(hourly, room_id, getattr(booking, '_original_status', None), start_time, end_time, sign=-1)
+        if not deleted:
+            _add(hourly, booking.room_id, booking.__dict__.get('status'), booking.start_time, booking.end_time)
+
+    hourly = {key: values for key, values in hourly.items() if any(values)}
+    if not hourly:
+        return
+    # Hourly and daily move together; no savepoint needed inside a caller's transaction
+    with transaction.atomic(savepoint=False):
+        _bump(
+            RoomHourlyUsage, ('room_id', 'day', 'hour'), hourly,
+            ('booked_minutes', 'requested_minutes', 'requests'),
+            defaults=lambda key: {'weekday': key[1].weekday()},
+        )
+        _bump(RoomDailyUsage, ('room_id', 'day'), _daily(hourly), ('booked_minutes', 'requested_minutes'))
+
+
+def _local_bounds(first_day, last_day):
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(first_day, dt_time.min), tz),
+        timezone.make_aware(datetime.combine(last_day + timedelta(days=1), dt_time.min), tz),
+    )
+
+
+def reconcile(first_day, last_day, chunk_size=2000):
+    """
+    Recomputes the rollups for [first_day, last_day] from the bookings table.
+    Returns how many (room, day) rows were wrong or missing.
+    """
+    start, end = _local_bounds(first_day, last_day)
+    hourly = defaultdict(lambda: [0, 0, 0])
+    bookings = (
+        Booking.objects.filter(status__in=REQUESTED_STATUSES, start_time__lt=end, end_time__gt=start)
+        .values_list('room_id', 'status', 'start_time', 'end_time')
+        .iterator(chunk_size=chunk_size)
+    )
+    for room_id, status, start_time, end_time in bookings:
+        _add(hourly, room_id, status, start_time, end_time)
+    # Bookings crossing the window's edges only count inside it
+    hourly = {key: values for key, values in hourly.items() if first_day <= key[1] <= last_day}
+    daily = _daily(hourly)
+
+    with transaction.atomic():
+        current = {
+            (room_id, day): [booked, requested]
+            for room_id, day, booked, requested in RoomDailyUsage.objects.filter(
+                day__range=(first_day, last_day)
+            ).values_list('room_id', 'day', 'booked_minutes', 'requested_minutes')
+        }
+        drifted = sum(
+            1 for key in set(current) | set(daily)
+            if current.get(key, [0, 0]) != daily.get(key, [0, 0])
+        )
+        RoomHourlyUsage.objects.filter(day__range=(first_day, last_day)).delete()
+        RoomDailyUsage.objects.filter(day__range=(first_day, last_day)).delete()
+        RoomHourlyUsage.objects.bulk_create(
+            RoomHourlyUsage(
+                room_id=room_id, day=day, hour=hour, weekday=day.weekday(),
+                booked_minutes=booked, requested_minutes=requested, requests=requests,
+            )
+            for (room_id, day, hour), (booked, requested, requests) in hourly.items()
+        )
+        RoomDailyUsage.objects.bulk_create(
+            RoomDailyUsage(room_id=room_id, day=day, booked_minutes=booked, requested_minutes=requested)
+            for (room_id, day), (booked, requested) in daily.items()
+        )
+    return drifted
+
+
+def _period(day, group):
+    return day - timedelta(days=day.weekday()) if group == 'week' else day
+
+
+def utilization(first_day, last_day, room_ids=None, group='day'):
+    """
+    Occupancy per room per day (or ISO week) for [first_day, last_day],
+    read from RoomDailyUsage only.
+    """
+    rooms = Room.objects.order_by('name')
+    usage = RoomDailyUsage.objects.filter(day__range=(first_day, last_day))
+    if room_ids:
+        rooms = rooms.filter(pk__in=room_ids)
+        usage = usage.filter(room_id__in=room_ids)
+    rooms = list(rooms.values('id', 'name', 'type', 'capacity'))
+
+    # Open minutes per period (a week cut by the range has fewer days)
+    open_minutes = defaultdict(int)
+    day = first_day
+    while day <= last_day:
+        open_minutes[_period(day, group)] += OPEN_MINUTES
+        day += timedelta(days=1)
+    total_open = sum(open_minutes.values())
+
+    booked = defaultdict(lambda: defaultdict(int))
+    requested = defaultdict(int)
+    for room_id, day, booked_minutes, requested_minutes in usage.values_list(
+        'room_id', 'day', 'booked_minutes', 'requested_minutes'
+    ):
+        # Capped, so rows written before the open-hours clip can't pass 100%
+        booked[room_id][_period(day, group)] += min(booked_minutes, OPEN_MINUTES)
+        requested[room_id] += requested_minutes
+
+    seat_minutes_used = seat_minutes_open = 0
+    for room in rooms:
+        periods = booked[room['id']]
+        room_booked = sum(periods.values())
+        room['booked_minutes'] = room_booked
+        room['requested_minutes'] = requested[room['id']]
+        room['occupancy'] = round(room_booked / total_open, 4) if total_open else 0.0
+        room['periods'] = [
+            {
+                'period': period.isoformat(),
+                'booked_minutes': periods.get(period, 0),
+                'occupancy': round(periods.get(period, 0) / minutes, 4),
+            }
+            for period, minutes in sorted(open_minutes.items())
+        ]
+        seat_minutes_used += room_booked * room['capacity']
+        seat_minutes_open += total_open * room['capacity']
+
+    return {
+        'group': group,
+        'open_minutes_per_day': OPEN_MINUTES,
+        'rooms': rooms,
+        # Big rooms weigh more: share of all seat-hours on offer that were booked
+        'capacity_weighted_occupancy': round(seat_minutes_used / seat_minutes_open, 4) if seat_minutes_open else 0.0,
+    }
+
+
+def top_slots(first_day, last_day, room_ids=None, limit=10):
+    """
+    The (weekday, hour) slots with the most requests, read from RoomHourlyUsage.
+    """
+    usage = RoomHourlyUsage.objects.filter(day__range=(first_day, last_day))
+    if room_ids:
+        usage = usage.filter(room_id__in=room_ids)
+    return list(
+        usage.values('weekday', 'hour')
+        .annotate(
+            requests=Sum('requests'),
+            requested_minutes=Sum('requested_minutes'),
+            booked_minutes=Sum('booked_minutes'),
+        )
+        .filter(requests__gt=0)
+        .order_by('-requests', '-requested_minutes', 'weekday', 'hour')[:limit]
+    )
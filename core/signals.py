@@ -0,0 +1,127 @@
+# core/signals.py
+
+"""
+Booking and notification change hooks.
+
+Model.save()/delete() are covered by Django's own post_save/post_delete.
+Bulk code paths (bulk_create, bulk_update, QuerySet.update) skip those, so
+they send `bookings_changed` / `notifications_changed` instead. Everything
+that caches booking- or notification-derived data listens here, and so does
+the waitlist (freed slots are offered to waiting requests).
+"""
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import Signal, receiver
+
+from . import availability, fragments, grid, rollups, roles
+from .models import Booking, Equipment, Notification, Profile, Room
+
+# Sent after bulk writes. Receives `bookings`: list of Booking instances.
+bookings_changed = Signal()
+# Sent after bulk writes. Receives `user_ids`: the users whose notifications changed.
+notifications_changed = Signal()
+
+
+def _window(booking):
+    return booking.room_id, booking.start_time, booking.end_time
+
+
+@receiver(post_init, sender=Booking)
+def remember_original_window(sender, instance, **kwargs):
+    # So an edit that moves a booking also refreshes the slot it left
+    instance._original_window = _window(instance)
+    # ...and the admin section it left (read from __dict__ so a deferred
+    # status field isn't fetched just for this)
+    instance._original_status = instance.__dict__.get('status')
+
+
+def _invalidate(bookings):
+    windows = set()
+    for booking in bookings:
+        windows.add(_window(booking))
+        original = getattr(booking, '_original_window', None)
+        if original:
+            windows.add(original)
+    for room_id, start_time, end_time in windows:
+        if room_id and start_time and end_time:
+            grid.invalidate(room_id, start_time, end_time)
+
+
+def _promote_waiters(bookings, deleted=False):
+    """
+    Hands the windows these bookings stopped blocking (cancelled, rejected,
+    deleted or moved) to the waitlist, once the change is committed. A user
+    who cancels or deletes a booking first leaves the waitlist for that
+    window, so their own entry can't bring it straight back.
+    """
+    freed, withdrawn = [], []
+    for booking in bookings:
+        original = getattr(booking, '_original_window', None)
+        if not original or not all(original):
+            continue
+        if getattr(booking, '_original_status', None) not in availability.BLOCKING_STATUSES:
+            continue
+        status = booking.__dict__.get('status')
+        if deleted or status not in availability.BLOCKING_STATUSES or original != _window(booking):
+            freed.append(original)
+        if deleted or status == 'cancelled':
+            withdrawn.append((booking.user_id, original))
+    if freed:
+        from . import waitlist  # imports notifications, which imports this module
+        if withdrawn:
+            waitlist.withdraw(withdrawn)
+        transaction.on_commit(lambda: waitlist.promote_logged(freed), robust=True)
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def booking_saved_or_deleted(sender, instance, signal, **kwargs):
+    _invalidate([instance])
+    if not kwargs.get('created'):
+        _promote_waiters([instance], deleted=signal is post_delete)
+    rollups.record_changes([instance], deleted=signal is post_delete, created=kwargs.get('created', False))
+    # Equipment is saved right after this (form.save_m2m) in the same
+    # transaction, and bump() repeats on commit, so no m2m_changed receiver is
+    # needed: connecting one would cost an extra SELECT on every m2m add
+    fragments.bump_bookings([instance], previous_statuses=[instance._original_status])
+    instance._original_window = _window(instance)
+    instance._original_status = instance.status
+
+
+@receiver(bookings_changed)
+def bookings_bulk_changed(sender, bookings, **kwargs):
+    _invalidate(bookings)
+    _promote_waiters(bookings)
+    rollups.record_changes(bookings)
+    fragments.bump_bookings(bookings)
+    for booking in bookings:
+        booking._original_window = _window(booking)
+        booking._original_status = booking.__dict__.get('status')
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def notification_saved_or_deleted(sender, instance, **kwargs):
+    fragments.bump_notifications([instance.user_id])
+
+
+@receiver(notifications_changed)
+def notifications_bulk_changed(sender, user_ids, **kwargs):
+    fragments.bump_notifications(user_ids)
+
+
+@receiver(post_save, sender=Equipment)
+@receiver(post_delete, sender=Equipment)
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def catalog_changed(sender, **kwargs):
+    # Names show up in every table, and they change rarely: start over
+    fragments.bump(fragments.CATALOG)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def profile_saved_or_deleted(sender, instance, **kwargs):
+    # Next request reloads the role (core.roles)
+    roles.forget(instance.user_id)
@@ -0,0 +1,122 @@
+# core/suggestions.py
+
+"""
+What to offer when the requested room/time is taken.
+
+    * the nearest free windows of the same length in the same room
+      (earlier or later, within SEARCH_DAYS either side, bookable hours only)
+    * other active rooms of the same type, with at least the same capacity,
+      that are free for the exact requested window
+
+Cost: one query for the candidate rooms and ONE range fetch of the bookings
+of all those rooms over the search span (availability.load_room_indexes).
+The gaps are then found in memory from the sorted intervals.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime, time as dt_time, timedelta
+
+from django.utils import timezone
+
+from .availability import load_room_indexes
+from .grid import DAY_END_HOUR, DAY_START_HOUR
+from .models import Room
+
+SEARCH_DAYS = 2
+MAX_TIMES = 3
+MAX_ROOMS = 3
+
+
+@dataclass
+class Suggestions:
+    times: list = field(default_factory=list)  # [(start, end)] in the same room
+    rooms: list = field(default_factory=list)  # [Room] free for the requested window
+
+    def __bool__(self):
+        return bool(self.times or self.rooms)
+
+
+def _open_hours(first_day, last_day):
+    """
+    Yields the bookable [start, end) of every local day in the range.
+    """
+    tz = timezone.get_current_timezone()
+    day = first_day
+    while day <= last_day:
+        yield (
+            timezone.make_aware(datetime.combine(day, dt_time(DAY_START_HOUR)), tz),
+            timezone.make_aware(datetime.combine(day, dt_time(DAY_END_HOUR)), tz),
+        )
+        day += timedelta(days=1)
+
+
+def free_gaps(index, span_start, span_end):
+    """
+    Free [start, end) stretches of one room's RoomIntervalIndex inside the span.
+    """
+    cursor = span_start
+    for start, end, _ in index.overlapping(span_start, span_end):
+        if start > cursor:
+            yield cursor, start
+        cursor = max(cursor, end)
+    if cursor < span_end:
+        yield cursor, span_end
+
+
+def nearest_times(index, start_time, end_time, earliest=None, limit=MAX_TIMES):
+    """
+    The free windows of the same length closest to the requested start,
+    at most one per gap (the spot in the gap nearest to what was asked).
+    """
+    duration = end_time - start_time
+    local_start = timezone.localtime(start_time)
+    candidates = []
+    for open_start, open_end in _open_hours(
+        local_start.date() - timedelta(days=SEARCH_DAYS), local_start.date() + timedelta(days=SEARCH_DAYS)
+    ):
+        if earliest:
+            open_start = max(open_start, earliest)
+            if open_start >= open_end:
+                continue
+        for gap_start, gap_end in free_gaps(index, open_start, open_end):
+            if gap_end - gap_start < duration:
+                continue
+            # Slide the requested window into the gap as little as possible
+            start = min(max(start_time, gap_start), gap_end - duration)
+            if start == start_time:
+                continue  # that's the slot that was refused
+            candidates.append((abs(start - start_time), start))
+    candidates.sort()
+    return [(start, start + duration) for _, start in candidates[:limit]]
+
+
+def suggest(room, start_time, end_time, exclude_id=None, now=None):
+    """
+    Suggestions for a booking of `room` between start_time and end_time that
+    could not be admitted. `exclude_id` is the booking being edited, if any.
+    """
+    now = now or timezone.now()
+    alternatives = list(
+        Room.objects.filter(is_active=True, type=room.type, capacity__gte=room.capacity)
+        .exclude(pk=room.pk)
+        .order_by('capacity', 'name')
+    )
+
+    # One fetch wide enough for every window we might look at
+    day = timezone.localtime(start_time).date()
+    opening = list(_open_hours(day - timedelta(days=SEARCH_DAYS), day + timedelta(days=SEARCH_DAYS)))
+    span_start = min(opening[0][0], start_time)
+    span_end = max(opening[-1][1], end_time)
+    indexes = load_room_indexes([room.pk] + [other.pk for other in alternatives], span_start, span_end)
+
+    own = indexes[room.pk]
+    if exclude_id:
+        own.remove(exclude_id)
+
+    return Suggestions(
+        times=nearest_times(own, start_time, end_time, earliest=now),
+        rooms=[
+            other for other in alternatives
+            if indexes[other.pk].find_conflict(start_time, end_time) is None
+        ][:MAX_ROOMS],
+    )
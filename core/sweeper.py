@@ -0,0 +1,67 @@
+# core/sweeper.py
+
+"""
+Background completion of expired bookings.
+
+This used to run as a full-table UPDATE inside the dashboard and admin views,
+which meant every page view took the SQLite write lock. It now runs from the
+`sweep_bookings` management command (cron, systemd timer or `--loop`).
+
+The "next expiry" watermark is the earliest end_time among approved bookings.
+It is read straight off the (status, end_time) index, so a tick where nothing
+has expired costs one index seek and never writes.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Booking
+from .signals import bookings_changed
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def next_expiry():
+    """
+    Earliest end_time of an approved booking, or None if there are none.
+    """
+    return (
+        Booking.objects.filter(status='approved')
+        .order_by('end_time')
+        .values_list('end_time', flat=True)
+        .first()
+    )
+
+
+def complete_expired_bookings(now=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Marks approved bookings that ended before `now` as completed.
+
+    Works in batches of `batch_size` rows, each in its own short transaction,
+    so writers from the booking flow are never blocked for long.
+    Returns the number of bookings completed.
+    """
+    now = now or timezone.now()
+
+    watermark = next_expiry()
+    if watermark is None or watermark >= now:
+        return 0
+
+    completed = 0
+    while True:
+        with transaction.atomic():
+            expired = list(
+                Booking.objects.filter(status='approved', end_time__lt=now)
+                .order_by('end_time')
+                .only('pk', 'user_id', 'room_id', 'start_time', 'end_time')[:batch_size]
+            )
+            if not expired:
+                break
+            completed += Booking.objects.filter(
+                pk__in=[booking.pk for booking in expired], status='approved'
+            ).update(status='completed')
+        # QuerySet.update() skips post_save; refresh the cached tables
+        bookings_changed.send(sender=Booking, bookings=expired)
+        if len(expired) < batch_size:
+            break
+    return completed
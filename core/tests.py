@@ -1,3 +1,1693 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import os
+import tempfile
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache, caches
+from django.core.management import CommandError, call_command
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase as DjangoTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+
+from benchmarks import bench_views, datagen
+
+from . import (
+    admission, availability, checks, decisions, export, fragments, grid, ics, importer, inventory, notifications,
+    outbox, pagination, recurrence, roles, rollups, suggestions, sweeper, views, waitlist,
+)
+from .forms import BookingForm
+from .middleware import QueryProfilingMiddleware
+from .models import (
+    Booking, BookingSeries, Equipment, Notification, NotificationOutbox, Profile, Room, RoomDailyUsage,
+    RoomHourlyUsage, WaitlistEntry,
+)
+from .profiling import MAX_SUSPECTS, RequestSample, RouteStats, registry as profile_registry
+
+
+# Every run builds a scratch database whose pks repeat, so the tests never
+# use the shared (file/redis) caches from settings: each run gets its own
+TEST_CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'tests-{alias}'}
+    for alias in ('default', 'fragments')
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class TestCase(DjangoTestCase):
+    pass
+
+
+class BookingTestMixin:
+    """
+    Small fixture helpers shared by the test cases below.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('student', password='pass12345')
+        cls.staff = User.objects.create_user('registrar', password='pass12345', is_staff=True)
+        cls.room = Room.objects.create(name='ComLab 1', type='Laboratory', capacity=40)
+        cls.other_room = Room.objects.create(name='ComLab 2', type='Laboratory', capacity=40)
+        cls.base = (timezone.now() + timedelta(days=7)).replace(minute=0, second=0, microsecond=0)
+
+    def setUp(self):
+        super().setUp()
+        # Fragment versions and cached roles are keyed by pk, and pks repeat between tests
+        caches[fragments.FRAGMENT_CACHE].clear()
+        cache.delete_many([f"role:{user.pk}" for user in (self.user, self.staff)])
+
+    def at(self, hours):
+        return self.base + timedelta(hours=hours)
+
+    def start_in_open_hours(self):
+        # Daily rollups only count 07:00-21:00; pin the base at 09:00 local
+        # for tests that read them, whatever time the suite runs at
+        day = timezone.localdate() + timedelta(days=7)
+        self.base = timezone.make_aware(datetime.combine(day, dt_time(9)))
+
+    def make_booking(self, start, end, status='pending', room=None, user=None):
+        return Booking.objects.create(
+            user=user or self.user, room=room or self.room,
+            start_time=self.at(start), end_time=self.at(end),
+            purpose='Class', status=status,
+        )
+
+
+class RoomIntervalIndexTests(TestCase):
+    def test_probe_finds_overlap_hidden_behind_long_interval(self):
+        index = availability.RoomIntervalIndex([(0, 10, 1), (2, 3, 2), (12, 14, 3)])
+        self.assertEqual(index.find_conflict(5, 6), 1)
+        self.assertEqual(index.find_conflict(13, 20), 3)
+        self.assertIsNone(index.find_conflict(10, 12))
+
+    def test_probe_skips_excluded_booking(self):
+        index = availability.RoomIntervalIndex([(0, 10, 1), (4, 6, 2)])
+        self.assertEqual(index.find_conflict(5, 6, exclude_id=1), 2)
+        self.assertIsNone(index.find_conflict(8, 9, exclude_id=1))
+
+    def test_add_and_remove_keep_index_consistent(self):
+        index = availability.RoomIntervalIndex()
+        index.add(5, 8, 1)
+        index.add(0, 2, 2)
+        self.assertEqual(index.find_conflict(6, 7), 1)
+        self.assertTrue(index.remove(1))
+        self.assertIsNone(index.find_conflict(6, 7))
+        self.assertEqual(len(index), 1)
+
+
+class AvailabilityTests(BookingTestMixin, TestCase):
+    def form_data(self, start, end, room=None):
+        return {
+            'room': (room or self.room).pk,
+            'start_time': timezone.localtime(self.at(start)).strftime('%Y-%m-%dT%H:%M'),
+            'end_time': timezone.localtime(self.at(end)).strftime('%Y-%m-%dT%H:%M'),
+            'purpose': 'Thesis defense',
+        }
+
+    def test_form_rejects_overlap_with_pending_booking(self):
+        self.make_booking(1, 3)
+        form = BookingForm(data=self.form_data(2, 4))
+        self.assertFalse(form.is_valid())
+        self.assertIn('already booked', form.non_field_errors()[0])
+
+    def test_form_ignores_rejected_and_other_rooms(self):
+        self.make_booking(1, 3, status='rejected')
+        self.make_booking(1, 3, room=self.other_room)
+        self.assertTrue(BookingForm(data=self.form_data(2, 4)).is_valid())
+
+    def test_form_submit_runs_a_single_conflict_probe(self):
+        form = BookingForm(data=self.form_data(2, 4))
+        form.instance.user = self.user
+        with CaptureQueriesContext(connection) as captured:
+            self.assertTrue(form.is_valid())
+            form.save()
+        probes = [q for q in captured if q['sql'].startswith('SELECT "core_booking"."id"')]
+        self.assertEqual(len(probes), 1)
+
+    def test_model_clean_still_guards_direct_saves(self):
+        self.make_booking(1, 3, status='approved')
+        with self.assertRaises(ValidationError):
+            self.make_booking(2, 4)
+
+    def test_load_room_indexes_matches_db_probe(self):
+        booking = self.make_booking(1, 3, status='approved')
+        indexes = availability.load_room_indexes([self.room.pk], self.at(0), self.at(24))
+        self.assertEqual(indexes[self.room.pk].find_conflict(self.at(2), self.at(5)), booking.pk)
+        self.assertEqual(availability.find_conflict(self.room, self.at(2), self.at(5)), booking.pk)
+
+
+class SweeperTests(BookingTestMixin, TestCase):
+    def test_sweep_completes_only_expired_approved_bookings(self):
+        expired = self.make_booking(-200, -199, status='approved')
+        pending = self.make_booking(-198, -197, status='pending')
+        upcoming = self.make_booking(1, 2, status='approved')
+
+        self.assertEqual(sweeper.complete_expired_bookings(batch_size=1), 1)
+        statuses = dict(Booking.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses[expired.pk], 'completed')
+        self.assertEqual(statuses[pending.pk], 'pending')
+        self.assertEqual(statuses[upcoming.pk], 'approved')
+
+    def test_sweep_is_a_single_read_when_nothing_expired(self):
+        self.make_booking(1, 2, status='approved')
+        with self.assertNumQueries(1):
+            self.assertEqual(sweeper.complete_expired_bookings(), 0)
+
+    def test_dashboard_no_longer_writes(self):
+        self.make_booking(-200, -199, status='approved')
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(reverse('dashboard'))
+        self.assertFalse([q for q in captured if q['sql'].startswith('UPDATE "core_booking"')])
+
+
+class AdminQueuePaginationTests(BookingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.staff)
+        self.next_slot = 0
+
+    def seed(self, count, status):
+        for _ in range(count):
+            booking = self.make_booking(self.next_slot, self.next_slot + 1, status=status)
+            booking.equipment.create(name='Projector', description='', total_quantity=1)
+            self.next_slot += 2
+
+    def test_admin_page_query_budget_does_not_grow_with_rows(self):
+        self.seed(1, 'pending')
+        self.seed(1, 'approved')
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(reverse('admin_approval_list'))
+
+        self.seed(40, 'approved')
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(reverse('admin_approval_list'))
+
+        # session + user, then list + equipment prefetch for pending and approved
+        self.assertEqual(len(large), 6)
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(len(response.context['approved_bookings']), views.ADMIN_PAGE_SIZE)
+
+    def test_keyset_pages_walk_every_row_once(self):
+        self.seed(30, 'completed')
+        seen = []
+        url = reverse('admin_approval_history')
+        cursor = ''
+        while True:
+            with self.assertNumQueries(4):
+                response = self.client.get(url, {'after': cursor})
+            seen.extend(booking.pk for booking in response.context['history_bookings'])
+            if not response.context['page'].has_next:
+                break
+            cursor = response.context['page'].next_cursor
+        self.assertEqual(len(seen), 30)
+        self.assertEqual(len(set(seen)), 30)
+
+    def test_history_is_not_loaded_with_the_main_page(self):
+        self.seed(2, 'completed')
+        response = self.client.get(reverse('admin_approval_list'))
+        self.assertNotIn('history_bookings', response.context)
+
+
+class BulkDecisionTests(BookingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.start_in_open_hours()  # so the approvals reach both rollup tables
+
+    def test_bulk_approval_checks_conflicts_in_one_pass(self):
+        first = self.make_booking(1, 3)
+        # Same slot in the same room, created behind the form's back
+        clash = Booking.objects.bulk_create([
+            Booking(user=self.user, room=self.room, start_time=self.at(2), end_time=self.at(4), purpose='x')
+        ])[0]
+        elsewhere = self.make_booking(1, 3, room=self.other_room)
+
+        # select + probe + update + insert, counter upkeep, plus savepoints,
+        # the outbox insert, then one upsert per rollup table
+        with self.assertNumQueries(13):
+            result = decisions.decide_bookings([first.pk, clash.pk, elsewhere.pk, 999], 'approved')
+
+        self.assertEqual({b.pk for b in result.updated}, {first.pk, elsewhere.pk})
+        self.assertEqual([b.pk for b in result.conflicts], [clash.pk])
+        self.assertEqual(result.missing, [999])
+        self.assertEqual(Notification.objects.count(), 2)
+
+    def test_bulk_endpoint_json(self):
+        bookings = [self.make_booking(i * 2, i * 2 + 1) for i in range(3)]
+        self.client.force_login(self.staff)
+        response = self.client.post(
+            reverse('bulk_booking_decision'),
+            data={'booking_ids': [b.pk for b in bookings], 'status': 'rejected'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.json()['updated']), sorted(b.pk for b in bookings))
+        self.assertFalse(Booking.objects.exclude(status='rejected').exists())
+
+    def test_bulk_endpoint_is_staff_only(self):
+        booking = self.make_booking(1, 2)
+        self.client.force_login(self.user)
+        self.client.post(reverse('bulk_booking_decision'), {'booking_ids': [booking.pk], 'status': 'approved'})
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'pending')
+
+    def test_only_pending_or_approved_bookings_are_decided(self):
+        cancelled = self.make_booking(1, 2, status='cancelled')
+        completed = self.make_booking(3, 4, status='completed')
+        approved = self.make_booking(5, 6, status='approved')
+        result = decisions.decide_bookings([cancelled.pk, completed.pk, approved.pk], 'approved')
+        self.assertEqual(result.updated, [])
+        self.assertEqual({b.pk for b in result.skipped}, {cancelled.pk, completed.pk, approved.pk})
+
+        # Revoking an approval is allowed, "un-cancelling" is not
+        result = decisions.decide_bookings([cancelled.pk, approved.pk], 'rejected')
+        self.assertEqual([b.pk for b in result.updated], [approved.pk])
+        self.assertEqual([b.pk for b in result.skipped], [cancelled.pk])
+        self.assertEqual(
+            dict(Booking.objects.values_list('pk', 'status')),
+            {cancelled.pk: 'cancelled', completed.pk: 'completed', approved.pk: 'rejected'},
+        )
+
+    def test_bulk_endpoint_warns_when_nothing_selected(self):
+        self.client.force_login(self.staff)
+        response = self.client.post(reverse('bulk_booking_decision'), {'status': 'approved'}, follow=True)
+        self.assertIn('Select at least one booking', ' '.join(str(m) for m in response.context['messages']))
+        response = self.client.post(
+            reverse('bulk_booking_decision'), data={'booking_ids': [], 'status': 'approved'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class AdmissionTests(BookingTestMixin, TestCase):
+    def form(self, start, end):
+        form = BookingForm(data=AvailabilityTests.form_data(self, start, end), defer_conflict_check=True)
+        form.instance.user = self.user
+        return form
+
+    def test_slot_taken_after_validation_is_rejected_under_lock(self):
+        form = self.form(2, 4)
+        self.assertTrue(form.is_valid())
+        self.make_booking(3, 5, user=self.staff)  # someone else got there first
+        with self.assertRaises(ValidationError):
+            admission.save_booking(form)
+        self.assertEqual(Booking.objects.filter(user=self.user).count(), 0)
+
+    def test_create_view_probes_once_and_reports_conflicts(self):
+        self.client.force_login(self.user)
+        data = AvailabilityTests.form_data(self, 2, 4)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(reverse('create_booking'), data)
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        probes = [q for q in captured if q['sql'].startswith('SELECT "core_booking"."id"')]
+        self.assertEqual(len(probes), 1)
+
+        response = self.client.post(reverse('create_booking'), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'already booked')
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_lock_errors_are_retried_then_reported(self):
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise OperationalError('database is locked')
+            return 'done'
+
+        with mock.patch('core.admission.time.sleep') as sleep:
+            self.assertEqual(admission.run_with_retry(flaky), 'done')
+            self.assertEqual(sleep.call_count, 2)
+
+            def always_locked():
+                raise OperationalError('database is locked')
+
+            with self.assertRaises(admission.AdmissionBusy):
+                admission.run_with_retry(always_locked)
+
+    def test_equipment_stock_is_counted_again_under_lock(self):
+        projector = Equipment.objects.create(name='Projector', description='', total_quantity=1)
+        data = AvailabilityTests.form_data(self, 2, 4)
+        data['equipment'] = [projector.pk]
+        form = BookingForm(data=data, defer_conflict_check=True)
+        form.instance.user = self.user
+        self.assertTrue(form.is_valid())
+        # Someone in another room takes the last unit meanwhile
+        self.make_booking(2, 3, room=self.other_room, user=self.staff).equipment.add(projector)
+        with self.assertRaisesMessage(ValidationError, 'no units left'):
+            admission.save_booking(form)
+        self.assertFalse(Booking.objects.filter(user=self.user).exists())
+
+    @skipUnless(connection.vendor == 'postgresql', "lock_timeout is PostgreSQL only")
+    def test_lock_waits_are_bounded(self):
+        def operation():
+            with connection.cursor() as cursor:
+                cursor.execute('SHOW lock_timeout')
+                return cursor.fetchone()[0]
+
+        # '0' would mean "wait forever"
+        self.assertNotEqual(admission.admitted([self.room.pk], operation), '0')
+
+
+class SlotSuggestionTests(BookingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        # 10 AM local a week out, so every window below is inside bookable hours
+        self.base = timezone.make_aware(datetime.combine(timezone.localdate() + timedelta(days=7), dt_time(10)))
+
+    def test_nearest_free_windows_in_the_same_room(self):
+        self.make_booking(0, 2, status='approved')   # 10-12
+        self.make_booking(3, 4)                      # 13-14 (pending still blocks)
+        self.make_booking(-1, 0, status='rejected')  # 9-10 is free again
+
+        found = suggestions.suggest(self.room, self.at(1), self.at(2))
+        self.assertEqual(found.times, [
+            (self.at(2), self.at(3)),    # 12-1 PM, right after
+            (self.at(-1), self.at(0)),   # 9-10 AM
+            (self.at(4), self.at(5)),    # 2-3 PM
+        ])
+
+    def test_alternative_rooms_match_type_and_capacity(self):
+        self.make_booking(0, 2, status='approved')
+        busy = Room.objects.create(name='ComLab 3', type='Laboratory', capacity=50)
+        Booking.objects.create(
+            user=self.user, room=busy, start_time=self.at(1), end_time=self.at(3), purpose='x', status='approved',
+        )
+        big = Room.objects.create(name='ComLab 4', type='Laboratory', capacity=60)
+        Room.objects.create(name='ComLab 5', type='Laboratory', capacity=20)  # too small
+        Room.objects.create(name='ComLab 6', type='Laboratory', capacity=40, is_active=False)
+        Room.objects.create(name='Lecture Hall', type='Lecture', capacity=200)
+
+        # One query for the rooms, one range fetch for all their bookings
+        with self.assertNumQueries(2):
+            found = suggestions.suggest(self.room, self.at(1), self.at(2))
+        self.assertEqual(found.rooms, [self.other_room, big])  # smallest that fits first
+
+    def test_editing_ignores_the_booking_itself(self):
+        mine = self.make_booking(0, 1)
+        self.make_booking(1, 2)
+        found = suggestions.suggest(self.room, self.at(1), self.at(2), exclude_id=mine.pk)
+        self.assertEqual(found.times[0], (self.at(0), self.at(1)))
+
+    def test_conflict_error_comes_with_suggestions(self):
+        self.make_booking(0, 2, status='approved')
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('create_booking'), AvailabilityTests.form_data(self, 1, 2))
+        self.assertContains(response, 'already booked')
+        found = response.context['form'].slot_suggestions
+        self.assertEqual(found.times[0], (self.at(2), self.at(3)))
+        self.assertEqual(found.rooms, [self.other_room])
+        self.assertContains(response, f'data-room="{self.other_room.pk}"')
+
+        # Other errors don't trigger the lookup
+        response = self.client.post(reverse('create_booking'), AvailabilityTests.form_data(self, 2, 1))
+        self.assertIsNone(response.context['form'].slot_suggestions)
+
+
+class WaitlistTests(BookingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.waiter = User.objects.create_user('waiter', password='pass12345')
+
+    def wait(self, start, end, user=None, room=None):
+        return waitlist.join(user or self.waiter, room or self.room, self.at(start), self.at(end), 'Review')
+
+    def test_refused_request_joins_the_waitlist_once(self):
+        self.make_booking(1, 3, status='approved')
+        self.client.force_login(self.waiter)
+        data = AvailabilityTests.form_data(self, 1, 2)
+        response = self.client.post(reverse('create_booking'), data)
+        self.assertContains(response, 'on the waitlist')
+        self.client.post(reverse('create_booking'), data)
+
+        entry = WaitlistEntry.objects.get()
+        self.assertEqual(
+            (entry.user, entry.room, entry.start_time, entry.status), (self.waiter, self.room, self.at(1), 'waiting'),
+        )
+
+    def test_waiter_can_leave_the_waitlist(self):
+        self.make_booking(1, 3, status='approved')
+        self.client.force_login(self.waiter)
+        response = self.client.post(reverse('create_booking'), AvailabilityTests.form_data(self, 1, 2))
+        entry = WaitlistEntry.objects.get()
+        self.assertContains(response, reverse('leave_waitlist', args=[entry.pk]))
+
+        self.client.force_login(self.user)  # someone else's entry is left alone
+        self.client.post(reverse('leave_waitlist', args=[entry.pk]))
+        self.client.force_login(self.waiter)
+        self.assertEqual(self.client.get(reverse('leave_waitlist', args=[entry.pk])).status_code, 405)
+        self.assertTrue(WaitlistEntry.objects.exists())
+        self.client.post(reverse('leave_waitlist', args=[entry.pk]))
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+    def test_double_submit_is_not_waitlisted(self):
+        self.client.force_login(self.user)
+        data = AvailabilityTests.form_data(self, 1, 2)
+        self.client.post(reverse('create_booking'), data)
+        response = self.client.post(reverse('create_booking'), data)  # blocked by their own request
+        self.assertNotContains(response, 'on the waitlist')
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+    def test_cancelling_withdraws_own_entries_instead_of_promoting_them(self):
+        mine = self.make_booking(1, 3)
+        # Waiting for part of a slot they then booked themselves
+        WaitlistEntry.objects.create(user=self.user, room=self.room, start_time=self.at(1), end_time=self.at(2))
+        other = self.wait(1, 2)
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('cancel_booking', args=[mine.pk]))
+        self.assertFalse(Booking.objects.filter(user=self.user).exists())
+        other.refresh_from_db()
+        self.assertEqual(list(WaitlistEntry.objects.values_list('pk', 'status')), [(other.pk, 'promoted')])
+
+    def test_past_entries_are_expired_by_the_sweeper(self):
+        self.wait(1, 2)
+        WaitlistEntry.objects.create(user=self.staff, room=self.room, start_time=self.at(-200), end_time=self.at(-199))
+        out = io.StringIO()
+        call_command('sweep_bookings', stdout=out)
+        self.assertIn('Dropped 1 waitlist', out.getvalue())
+        self.assertEqual(WaitlistEntry.objects.get().user, self.waiter)
+
+    def test_promotion_keeps_the_requested_equipment(self):
+        projector = Equipment.objects.create(name='Projector', description='', total_quantity=1)
+        mine = self.make_booking(1, 3)
+        entry = self.wait(1, 2)
+        entry.equipment.set([projector])
+        loaned = self.make_booking(1, 2, room=self.other_room, user=self.staff)
+        loaned.equipment.set([projector])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            mine.delete()
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 'waiting')  # the room is free, the only projector isn't
+
+        loaned.delete()
+        waitlist.promote([(self.room.pk, self.at(1), self.at(2))])  # the next freed window
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, 'promoted')
+        self.assertEqual(list(entry.booking.equipment.all()), [projector])
+
+    def test_failed_promotion_is_logged_not_raised(self):
+        mine = self.make_booking(1, 3)
+        self.wait(1, 2)
+        with mock.patch.object(waitlist, 'promote', side_effect=admission.AdmissionBusy("busy")):
+            with self.assertLogs('core.waitlist', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+                mine.delete()
+        self.assertEqual(WaitlistEntry.objects.get().status, 'waiting')
+
+    def test_cancellation_promotes_the_earliest_waiter(self):
+        mine = self.make_booking(1, 3)
+        first = self.wait(1, 2)
+        second = self.wait(1, 2, user=self.staff)
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('cancel_booking', args=[mine.pk]))
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.status, second.status), ('promoted', 'waiting'))
+        booking = first.booking
+        self.assertEqual((booking.user, booking.status, booking.start_time), (self.waiter, 'pending', self.at(1)))
+        self.assertIn('freed up', Notification.objects.get(user=self.waiter).message)
+
+    def test_rejection_promotes_every_waiter_that_fits(self):
+        pending = self.make_booking(1, 4)
+        self.make_booking(4, 5, status='approved')
+        still_blocked = self.wait(3, 5)  # overlaps the approved 4-5 booking
+        early = self.wait(1, 2)
+        late = self.wait(2, 3, user=self.staff)
+        with self.captureOnCommitCallbacks(execute=True):
+            decisions.decide_bookings([pending.pk], 'rejected')
+
+        statuses = dict(WaitlistEntry.objects.values_list('pk', 'status'))
+        self.assertEqual(
+            [statuses[still_blocked.pk], statuses[early.pk], statuses[late.pk]], ['waiting', 'promoted', 'promoted'],
+        )
+
+    def test_waiter_who_booked_elsewhere_is_skipped(self):
+        mine = self.make_booking(1, 2)
+        self.wait(1, 2)
+        self.make_booking(1, 2, room=self.other_room, user=self.waiter)
+        with self.captureOnCommitCallbacks(execute=True):
+            mine.delete()
+        self.assertEqual(WaitlistEntry.objects.get().status, 'waiting')
+
+    def test_waiters_are_found_with_one_indexed_lookup(self):
+        for i in range(5):
+            self.wait(1, 2, user=User.objects.create_user(f'w{i}'))
+        self.wait(1, 2, room=self.other_room)  # a different room is not looked at
+        freed = [(self.room.pk, self.at(1), self.at(2))]
+        # One indexed lookup finds the waiters, however many there are
+        with CaptureQueriesContext(connection) as captured:
+            promoted = waitlist.promote(freed)
+        self.assertEqual(len(promoted), 1)
+        selects = [q for q in captured if 'FROM "core_waitlistentry"' in q['sql']]
+        self.assertEqual(len(selects), 1)
+        self.assertIn('waitlist_room_window_idx', WaitlistEntry.objects.filter(
+            room=self.room, status='waiting', start_time__lt=self.at(2), end_time__gt=self.at(1),
+        ).explain())
+
+
+class EquipmentInventoryTests(BookingTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.projector = Equipment.objects.create(name='Projector', description='', total_quantity=1)
+        cls.speakers = Equipment.objects.create(name='Speakers', description='', total_quantity=2)
+
+    def claim(self, start, end, *items, room=None, status='pending'):
+        booking = self.make_booking(start, end, room=room or self.other_room, status=status)
+        booking.equipment.set(items)
+        return booking
+
+    def test_peak_not_sum_of_claims_in_window(self):
+        self.claim(0, 1, self.speakers)
+        self.claim(2, 3, self.speakers, room=self.room)
+        with self.assertNumQueries(2):
+            free = inventory.free_quantities(self.at(0), self.at(4))
+        self.assertEqual(free[self.speakers.pk], (2, 1))
+        self.assertEqual(free[self.projector.pk], (1, 1))
+
+    def test_rejected_claims_release_units(self):
+        self.claim(0, 2, self.projector, status='rejected')
+        self.assertEqual(inventory.free_quantities(self.at(1), self.at(3))[self.projector.pk], (1, 1))
+
+    def test_form_rejects_over_allocation(self):
+        self.claim(0, 2, self.projector)
+        form = BookingForm(data={
+            'room': self.room.pk,
+            'start_time': timezone.localtime(self.at(1)).strftime('%Y-%m-%dT%H:%M'),
+            'end_time': timezone.localtime(self.at(3)).strftime('%Y-%m-%dT%H:%M'),
+            'purpose': 'Seminar',
+            'equipment': [self.projector.pk, self.speakers.pk],
+        })
+        self.assertFalse(form.is_valid())
+        self.assertIn('Projector', form.non_field_errors()[0])
+        self.assertNotIn('Speakers', form.non_field_errors()[0])
+
+    def test_availability_endpoint(self):
+        self.claim(0, 2, self.projector)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('equipment_availability'), {
+            'start': self.at(1).isoformat(), 'end': self.at(3).isoformat(),
+        })
+        free = {item['id']: item['free'] for item in response.json()['equipment']}
+        self.assertEqual(free, {self.projector.pk: 0, self.speakers.pk: 2})
+
+    def test_availability_endpoint_rejects_bad_datetimes(self):
+        self.client.force_login(self.user)
+        url = reverse('equipment_availability')
+        for start, end in (
+            ('2026-13-01T10:00', '2026-13-01T11:00'),  # well-formed, out of range
+            ('2026-06-01T10:00', '2026-06-01T09:00+08:00'),  # naive vs aware, and backwards
+            ('2026-06-01T10:00', 'soon'),
+        ):
+            with self.subTest(start=start, end=end):
+                self.assertEqual(self.client.get(url, {'start': start, 'end': end}).status_code, 400)
+        mixed = self.client.get(url, {'start': '2026-06-01T10:00', 'end': '2026-06-01T11:00+08:00'})
+        self.assertEqual(mixed.status_code, 200)
+
+
+class BookingExportTests(BookingTestMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.projector = Equipment.objects.create(name='Projector', description='', total_quantity=5)
+
+    def setUp(self):
+        super().setUp()
+        self.bookings = [self.make_booking(i * 2, i * 2 + 1, status='approved') for i in range(5)]
+        self.bookings[0].equipment.set([self.projector])
+        self.make_booking(1, 2, room=self.other_room)
+
+    def read(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv_streams_rows_with_room_user_and_equipment(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('export_bookings'), {'rooms': self.room.pk})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(io.StringIO(self.read(response))))
+        self.assertEqual([int(r['booking_id']) for r in rows], [b.pk for b in self.bookings])
+        self.assertEqual(rows[0]['equipment'], 'Projector')
+        self.assertEqual(rows[0]['room'], self.room.name)
+        self.assertEqual(rows[0]['username'], self.user.username)
+
+    def test_csv_cells_are_not_formulas(self):
+        self.bookings[0].purpose = '=HYPERLINK("http://evil.example","x")'
+        self.bookings[0].save()
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('export_bookings'), {'rooms': self.room.pk})
+        rows = list(csv.DictReader(io.StringIO(self.read(response))))
+        self.assertEqual(rows[0]['purpose'], '\'=HYPERLINK("http://evil.example","x")')
+        self.assertEqual(rows[1]['purpose'], self.bookings[1].purpose)
+
+    def test_bad_dates_are_a_400(self):
+        self.client.force_login(self.staff)
+        for params in ({'start': '2026-02-30'}, {'end': 'soon'}):
+            self.assertEqual(self.client.get(reverse('export_bookings'), params).status_code, 400)
+        with self.assertRaises(CommandError):
+            call_command('export_bookings', '--start', '2026-13-01', stdout=io.StringIO())
+
+    def test_bad_cursor_is_a_400_not_a_restart(self):
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get(reverse('export_bookings'), {'after': 'garbage'}).status_code, 400)
+        with self.assertRaises(CommandError):
+            call_command('export_bookings', '--after', 'garbage', stdout=io.StringIO())
+
+    def test_one_equipment_prefetch_per_chunk(self):
+        queryset = export.export_queryset(room_ids=[self.room.pk])
+        with CaptureQueriesContext(connection) as captured:
+            rows = list(export.rows(queryset, chunk_size=2))
+        self.assertEqual(len(rows), 5)
+        # One booking query, then one equipment query per chunk of 2
+        self.assertEqual(len(captured), 1 + 3)
+
+    def test_jsonl_resumes_from_cursor(self):
+        self.client.force_login(self.staff)
+        url = reverse('export_bookings')
+        first = [json.loads(line) for line in self.read(self.client.get(url, {'format': 'jsonl'})).splitlines()]
+        self.assertEqual(len(first), 6)
+        rest = self.read(self.client.get(url, {'format': 'jsonl', 'after': first[2]['cursor']})).splitlines()
+        self.assertEqual([json.loads(line)['booking_id'] for line in rest], [r['booking_id'] for r in first[3:]])
+
+    async def test_asgi_export_streams_asynchronously(self):
+        await self.async_client.aforce_login(self.staff)
+        response = await self.async_client.get(reverse('export_bookings'), {'format': 'jsonl'})
+        self.assertTrue(response.is_async)
+        lines = b''.join([part async for part in response.streaming_content]).splitlines()
+        self.assertEqual(len(lines), 6)
+
+    def test_export_is_staff_only_and_command_filters(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('export_bookings')).status_code, 403)
+
+        out = io.StringIO()
+        call_command('export_bookings', '--format', 'jsonl', '--status', 'pending', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([r['room'] for r in rows], [self.other_room.name])
+
+
+class ScheduleImportTests(BookingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.start_in_open_hours()
+
+    def stamp(self, hours):
+        return timezone.localtime(self.at(hours)).strftime('%Y-%m-%d %H:%M')
+
+    def schedule(self, rows):
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(['room', 'username', 'start_time', 'end_time', 'purpose', 'equipment', 'status'])
+        writer.writerows(rows)
+        out.seek(0)
+        return importer.read_records(out, 'csv')
+
+    def test_catalogues_are_upserted_by_name(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'rooms.jsonl')
+            with open(path, 'w') as handle:
+                handle.write(json.dumps({'name': 'ComLab 1', 'type': 'Laboratory', 'capacity': 45}) + '\n')
+                handle.write(json.dumps({'name': 'AVR', 'type': 'Auditorium', 'capacity': 300}) + '\n')
+                handle.write(json.dumps({'name': 'Broken', 'type': 'Lecture', 'capacity': 'many'}) + '\n')
+                handle.write('{not json\n')
+            out, err = io.StringIO(), io.StringIO()
+            call_command('import_schedule', path, '--kind', 'rooms', stdout=out, stderr=err)
+
+        self.assertIn('1 created, 1 updated, 2 rejected', out.getvalue())
+        self.assertIn('line 3: capacity must be a positive number', err.getvalue())
+        self.assertEqual(Room.objects.get(name='ComLab 1').capacity, 45)
+        self.assertTrue(Room.objects.filter(name='AVR', capacity=300).exists())
+
+    def test_schedule_rows_are_checked_against_db_and_each_other(self):
+        projector = Equipment.objects.create(name='Projector', description='', total_quantity=3)
+        self.make_booking(0, 1, status='approved')
+        rows = [
+            ['ComLab 1', 'student', self.stamp(1), self.stamp(3), 'IT 101', 'Projector', ''],   # line 2: ok
+            ['ComLab 1', 'student', self.stamp(0), self.stamp(2), 'IT 102', '', ''],            # 3: hits the DB row
+            ['ComLab 9', 'student', self.stamp(5), self.stamp(6), '', '', ''],                  # 4: unknown room
+            ['ComLab 2', 'student', self.stamp(2), self.stamp(1), '', '', ''],                  # 5: backwards
+            ['ComLab 2', 'registrar', self.stamp(1), self.stamp(2), 'IT 103', '', ''],          # 6: ok
+            ['ComLab 1', 'registrar', self.stamp(2), self.stamp(4), 'IT 104', '', ''],          # 7: overlaps line 2
+            ['ComLab 1', 'registrar', self.stamp(2), self.stamp(4), 'Old', '', 'cancelled'],    # 8: history, ok
+            ['ComLab 2', 'student', self.stamp(1), self.stamp(2), 'IT 105', 'Laser', ''],       # 9: unknown item
+        ]
+        # Chunks of 2 rows: line 7 is only caught because line 2 was committed first
+        result = importer.import_bookings(self.schedule(rows), chunk_size=2)
+
+        self.assertEqual(result.created, 3)
+        self.assertEqual([line for line, _ in result.rejected], [3, 4, 5, 7, 9])
+        self.assertIn('existing booking', dict(result.rejected)[3])
+        imported = Booking.objects.get(purpose='IT 101')
+        self.assertEqual((imported.status, list(imported.equipment.all())), ('approved', [projector]))
+        # Bulk writes still reach the rollups
+        self.assertEqual(
+            RoomDailyUsage.objects.get(room=self.room, day=timezone.localtime(self.at(1)).date()).booked_minutes,
+            60 + 120,
+        )
+
+    def test_overlaps_inside_one_chunk_are_swept(self):
+        rows = [
+            ['ComLab 1', 'student', self.stamp(3), self.stamp(5), 'B', '', ''],
+            ['ComLab 1', 'student', self.stamp(1), self.stamp(4), 'A', '', ''],
+            ['ComLab 1', 'student', self.stamp(5), self.stamp(6), 'C', '', ''],
+        ]
+        result = importer.import_bookings(self.schedule(rows))
+        # Sorted by start: A keeps its slot, B overlaps it, C fits after A
+        self.assertEqual(result.rejected, [(2, 'overlaps line 3 of this file')])
+        self.assertEqual(set(Booking.objects.values_list('purpose', flat=True)), {'A', 'C'})
+
+    def test_jsonl_rows_with_wrong_types_are_rejected(self):
+        good = {'room': 'ComLab 1', 'username': 'student', 'start_time': self.stamp(1), 'end_time': self.stamp(2)}
+        records = [
+            dict(good, room=['ComLab 1']),
+            dict(good, username={'name': 'student'}),
+            dict(good, purpose=42),
+            dict(good, equipment=[1, 2]),
+            dict(good, start_time='2026-02-30 10:00'),
+            dict(good, purpose='IT 101'),
+        ]
+        result = importer.import_bookings(enumerate(records, start=1))
+        self.assertEqual(result.created, 1)
+        self.assertEqual([reason for _, reason in result.rejected], [
+            'room must be text', 'username must be text', 'purpose must be text',
+            'equipment must be a list of names or "A; B"', 'start_time and end_time must be datetimes',
+        ])
+
+    def test_values_over_the_column_limits_are_rejected(self):
+        rooms = importer.import_rooms(enumerate([
+            {'name': 'R' * 101, 'type': 'Lecture', 'capacity': 30},
+            {'name': 'AVR', 'type': 'T' * 51, 'capacity': 30},
+            {'name': 'AVR', 'type': 'Auditorium', 'capacity': 10 ** 12},
+            {'name': 'AVR', 'type': 'Auditorium', 'capacity': 300},
+        ], start=1))
+        self.assertEqual(rooms.created, 1)
+        self.assertEqual([reason for _, reason in rooms.rejected], [
+            'name is longer than 100 characters', 'type is longer than 50 characters',
+            'capacity must be a positive number',
+        ])
+
+        equipment = importer.import_equipment(enumerate([
+            {'name': 'Projector', 'description': ['HDMI'], 'total_quantity': 2},
+            {'name': 'Projector', 'total_quantity': 2 ** 40},
+        ], start=1))
+        self.assertEqual(equipment.created, 0)
+        self.assertEqual([reason for _, reason in equipment.rejected], [
+            'description must be text', 'total_quantity must be a number',
+        ])
+
+        good = {'room': 'ComLab 1', 'username': 'student', 'start_time': self.stamp(1), 'end_time': self.stamp(2)}
+        result = importer.import_bookings(enumerate([dict(good, purpose='P' * 256)], start=1))
+        self.assertEqual(result.rejected, [(1, 'purpose is longer than 255 characters')])
+
+    def test_rows_cannot_overbook_equipment(self):
+        projector = Equipment.objects.create(name='Projector', description='', total_quantity=1)
+        Equipment.objects.create(name='Speaker', description='', total_quantity=5)
+        self.make_booking(0, 1, status='approved').equipment.add(projector)
+        rows = [
+            ['ComLab 2', 'student', self.stamp(0), self.stamp(1), 'A', 'Projector; Speaker', ''],  # DB holds it
+            ['ComLab 2', 'student', self.stamp(1), self.stamp(2), 'B', 'Projector', ''],           # ok
+            ['ComLab 1', 'student', self.stamp(1), self.stamp(2), 'C', 'Projector', ''],           # line 3 has it
+            ['ComLab 1', 'student', self.stamp(1), self.stamp(2), 'D', 'Projector', 'cancelled'],  # history, ok
+        ]
+        result = importer.import_bookings(self.schedule(rows))
+
+        self.assertEqual(result.rejected, [(2, 'no units left: Projector'), (4, 'no units left: Projector')])
+        self.assertEqual(set(Booking.objects.filter(purpose__in='ABCD').values_list('purpose', flat=True)), {'B', 'D'})
+
+    def test_chunk_cost_does_not_grow_with_rows(self):
+        def load(count, offset):
+            rows = [
+                ['ComLab 1', 'student', self.stamp(offset + i), self.stamp(offset + i + 1), 'x', '', '']
+                for i in range(count)
+            ]
+            with CaptureQueriesContext(connection) as captured:
+                result = importer.import_bookings(self.schedule(rows))
+            self.assertEqual(result.created, count)
+            return len(captured)
+
+        self.assertEqual(load(3, 0), load(60, 10))
+
+
+class AvailabilityGridTests(BookingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client.force_login(self.user)
+        self.day = timezone.localdate() + timedelta(days=3)
+        self.morning = grid.day_bounds(self.day)[0]  # 07:00 local
+
+    def book(self, hour, length, status='pending', room=None):
+        start = self.morning + timedelta(hours=hour)
+        return Booking.objects.create(
+            user=self.user, room=room or self.room, start_time=start,
+            end_time=start + timedelta(hours=length), purpose='Class', status=status,
+        )
+
+    def fetch(self, **params):
+        params.setdefault('start', self.day.isoformat())
+        params.setdefault('days', 7)
+        return self.client.get(reverse('room_availability_grid'), params).json()
+
+    def cells(self, data, room, day_index=0):
+        return data['days'][day_index]['rooms'][str(room.pk)]
+
+    def test_grid_marks_pending_and_booked_slots(self):
+        self.book(1, 2)
+        self.book(5, 1, status='approved')
+        data = self.fetch(slot=60)
+        self.assertEqual(self.cells(data, self.room)[:7], [None, 'pending', 'pending', None, None, 'booked', None])
+        self.assertEqual(set(self.cells(data, self.other_room)), {None})
+
+    def test_week_is_one_booking_query_then_cached(self):
+        with CaptureQueriesContext(connection) as cold:
+            self.fetch()
+        with CaptureQueriesContext(connection) as warm:
+            self.fetch()
+        booking_queries = lambda captured: [q for q in captured if 'FROM "core_booking"' in q['sql']]
+        self.assertEqual(len(booking_queries(cold)), 1)
+        self.assertEqual(len(booking_queries(warm)), 0)
+
+    def test_save_and_decision_invalidate_only_their_day(self):
+        self.fetch()
+        booking = self.book(2, 1)
+        data = self.fetch()
+        self.assertEqual(self.cells(data, self.room)[2], 'pending')
+
+        decisions.decide_bookings([booking.pk], 'approved')
+        with CaptureQueriesContext(connection) as captured:
+            data = self.fetch()
+        self.assertEqual(self.cells(data, self.room)[2], 'booked')
+        # Only the touched day was rebuilt, in a single range query
+        self.assertEqual(len([q for q in captured if 'FROM "core_booking"' in q['sql']]), 1)
+
+        booking.delete()
+        self.assertEqual(self.cells(self.fetch(), self.room)[2], None)
+
+    def test_token_is_replaced_again_on_commit(self):
+        key = grid._version_key(self.room.pk, self.day)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book(2, 1)
+            during = cache.get(key)
+        # A grid built before the commit was cached under `during`; it's orphaned now
+        self.assertNotEqual(cache.get(key), during)
+
+    def test_impossible_start_date_is_a_400(self):
+        for name in ('room_availability_grid', 'room_availability_grid_async'):
+            with self.subTest(view=name):
+                response = self.client.get(reverse(name), {'start': '2026-02-30'})
+                self.assertEqual(response.status_code, 400)
+
+
+class NotificationTests(BookingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def test_counter_follows_writes_and_reads(self):
+        notifications.notify_many([(self.user.pk, 'one'), (self.user.pk, 'two'), (self.staff.pk, 'hi')])
+        self.assertEqual(notifications.unread_count(self.user), 2)
+        self.assertEqual(notifications.unread_count(self.staff), 1)
+
+        first = Notification.objects.filter(user=self.user).first()
+        self.assertEqual(notifications.mark_read(self.user, [first.pk]), 1)
+        self.assertEqual(notifications.mark_read(self.user, [first.pk]), 0)
+        self.assertEqual(notifications.unread_count(self.user), 1)
+
+        self.client.get(reverse('clear_notifications'))
+        self.assertEqual(notifications.unread_count(self.user), 0)
+        # Marking read keeps the rows
+        self.assertEqual(Notification.objects.filter(user=self.user).count(), 2)
+
+    def test_dashboard_badge_skips_count_query(self):
+        notifications.notify(self.user, 'approved')
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['unread_count'], 1)
+        self.assertFalse([q for q in captured if 'COUNT(' in q['sql']])
+
+    def test_feed_cursor_pages(self):
+        notifications.notify_many((self.user.pk, f"n{i}") for i in range(25))
+        url = reverse('notification_feed')
+        first = self.client.get(url).json()
+        second = self.client.get(url, {'before': first['next']}).json()
+        third = self.client.get(url, {'before': second['next']}).json()
+        ids = [n['id'] for page in (first, second, third) for n in page['notifications']]
+        self.assertEqual(len(ids), 25)
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertIsNone(third['next'])
+
+    def test_prune_deletes_old_rows_and_fixes_counter(self):
+        notifications.notify_many([(self.user.pk, 'old'), (self.user.pk, 'new')])
+        Notification.objects.filter(message='old').update(created_at=timezone.now() - timedelta(days=200))
+        self.assertEqual(notifications.prune(retention_days=90, batch_size=1), 1)
+        self.assertEqual(list(Notification.objects.values_list('message', flat=True)), ['new'])
+        self.assertEqual(notifications.unread_count(self.user), 1)
+
+
+class NotificationOutboxTests(BookingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        User.objects.filter(pk=self.user.pk).update(email='student@cvsu.edu.ph')
+        self.later = timezone.now() + outbox.digest_delay() + timedelta(seconds=1)
+
+    def test_decisions_queue_email_without_sending(self):
+        bookings = [self.make_booking(i * 2, i * 2 + 1) for i in range(2)]
+        self.client.force_login(self.staff)
+        self.client.get(reverse('update_booking_status', args=[bookings[0].pk, 'approved']))
+        decisions.decide_bookings([bookings[1].pk], 'rejected')
+
+        self.assertEqual(mail.outbox, [])
+        queued = NotificationOutbox.objects.filter(sent_at__isnull=True)
+        self.assertEqual(
+            set(queued.values_list('notification_id', flat=True)),
+            set(Notification.objects.values_list('pk', flat=True)),
+        )
+        self.assertEqual(queued.count(), 2)
+
+    def test_worker_sends_one_digest_per_user(self):
+        notifications.notify_many([(self.user.pk, 'first'), (self.user.pk, 'second'), (self.staff.pk, 'hi')])
+        # Still inside the digest delay: nothing goes out yet
+        self.assertEqual(outbox.drain(now=timezone.now()).claimed, 0)
+
+        result = outbox.drain(now=self.later)
+        self.assertEqual((result.claimed, result.sent, result.skipped), (3, 1, 1))  # staff has no email
+        self.assertEqual(len(mail.outbox), 1)
+        message = mail.outbox[0]
+        self.assertEqual(message.to, ['student@cvsu.edu.ph'])
+        self.assertIn('2 booking updates', message.subject)
+        self.assertLess(message.body.index('first'), message.body.index('second'))
+        self.assertFalse(NotificationOutbox.objects.filter(sent_at__isnull=True).exists())
+        self.assertEqual(outbox.drain(now=self.later).claimed, 0)
+
+    def test_failed_sends_back_off_then_give_up(self):
+        notifications.notify(self.user, 'approved')
+        failing = mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('mail server down'),
+        )
+        with failing:
+            self.assertEqual(outbox.drain(now=self.later).failed, 1)
+        row = NotificationOutbox.objects.get()
+        self.assertEqual(row.attempts, 1)
+        self.assertEqual(row.available_at, self.later + outbox.backoff(1))
+        self.assertIn('mail server down', row.last_error)
+        # Not due again until the backoff is over
+        self.assertEqual(outbox.drain(now=self.later + timedelta(seconds=30)).claimed, 0)
+
+        now = row.available_at
+        with failing:
+            for attempt in range(2, outbox.MAX_ATTEMPTS + 1):
+                outbox.drain(now=now)
+                row.refresh_from_db()
+                self.assertEqual(row.available_at - now, outbox.backoff(attempt))
+                now = row.available_at
+        self.assertEqual(outbox.dead_letters().count(), 1)
+        self.assertEqual(outbox.drain(now=now).claimed, 0)
+        self.assertEqual(mail.outbox, [])
+
+    def test_command_drains_in_batches(self):
+        notifications.notify_many([(self.user.pk, f"n{i}") for i in range(5)])
+        notifications.notify_many([(self.staff.pk, f"s{i}") for i in range(2)])
+        User.objects.filter(pk=self.staff.pk).update(email='registrar@example.com')
+        NotificationOutbox.objects.update(available_at=timezone.now())
+        out = io.StringIO()
+        call_command('send_notification_emails', '--batch-size', '1', stdout=out)
+        self.assertFalse(NotificationOutbox.objects.filter(sent_at__isnull=True).exists())
+        # A batch is a user with all their rows: one digest each, never split
+        self.assertEqual(
+            sorted(m.subject for m in mail.outbox),
+            ["CvSUReserve: 2 booking updates", "CvSUReserve: 5 booking updates"],
+        )
+
+
+class RecurringSeriesTests(BookingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+        # A Monday two weeks out
+        today = timezone.localdate()
+        self.monday = today + timedelta(days=14 - today.weekday())
+
+    def series_data(self, **overrides):
+        data = {
+            'room': self.room.pk,
+            'first_date': self.monday.isoformat(),
+            'until': (self.monday + timedelta(weeks=4, days=-1)).isoformat(),
+            'weekdays': ['0', '2'],
+            'start_time': '08:00',
+            'end_time': '10:00',
+            'interval': 1,
+            'purpose': 'CS 101 Lab',
+        }
+        data.update(overrides)
+        return data
+
+    def test_series_expands_and_bulk_inserts(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(reverse('create_booking_series'), self.series_data())
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+
+        series = BookingSeries.objects.get()
+        starts = [timezone.localtime(b.start_time) for b in series.bookings.order_by('start_time')]
+        self.assertEqual(len(starts), 8)  # 4 weeks x Mon/Wed
+        self.assertEqual({s.weekday() for s in starts}, {0, 2})
+        self.assertEqual({s.hour for s in starts}, {8})
+        inserts = [q for q in captured if q['sql'].startswith('INSERT INTO "core_booking"')]
+        self.assertEqual(len(inserts), 1)
+
+    def test_long_series_are_refused_without_expanding_them(self):
+        response = self.client.post(reverse('create_booking_series'), self.series_data(until='2600-01-01'))
+        self.assertContains(response, f'at most {recurrence.MAX_SPAN_DAYS} days')
+        with mock.patch.object(recurrence, 'MAX_OCCURRENCES', 3):
+            response = self.client.post(reverse('create_booking_series'), self.series_data())
+        self.assertContains(response, 'at most 3 dates')
+        self.assertFalse(BookingSeries.objects.exists())
+
+    def test_one_conflicting_date_rejects_the_series(self):
+        tz = timezone.get_current_timezone()
+        wednesday = self.monday + timedelta(days=9)
+        Booking.objects.create(
+            user=self.staff, room=self.room, purpose='Exam', status='approved',
+            start_time=timezone.make_aware(datetime.combine(wednesday, dt_time(9)), tz),
+            end_time=timezone.make_aware(datetime.combine(wednesday, dt_time(11)), tz),
+        )
+        response = self.client.post(reverse('create_booking_series'), self.series_data())
+        self.assertContains(response, 'already booked on')
+        self.assertFalse(BookingSeries.objects.exists())
+
+    def test_admin_approves_whole_series_with_one_notification(self):
+        self.client.post(reverse('create_booking_series'), self.series_data(weekdays=['4']))
+        series = BookingSeries.objects.get()
+        self.client.force_login(self.staff)
+        self.client.get(reverse('update_series_status', args=[series.pk, 'approved']))
+        self.assertEqual(set(series.bookings.values_list('status', flat=True)), {'approved'})
+        self.assertEqual(Notification.objects.filter(user=self.user).count(), 1)
+
+
+class UsageRollupTests(BookingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.start_in_open_hours()
+
+    def snapshot(self):
+        # Rows a booking moved out of stay behind as zeros; reconcile drops them
+        return (
+            sorted(RoomDailyUsage.objects.filter(requested_minutes__gt=0).values_list(
+                'room_id', 'day', 'booked_minutes', 'requested_minutes',
+            )),
+            sorted(RoomHourlyUsage.objects.filter(requests__gt=0).values_list(
+                'room_id', 'day', 'hour', 'weekday', 'booked_minutes', 'requested_minutes', 'requests',
+            )),
+        )
+
+    def day(self, hours):
+        return timezone.localtime(self.at(hours)).date()
+
+    def test_transitions_update_rollups(self):
+        booking = self.make_booking(1, 3)
+        self.assertFalse(RoomDailyUsage.objects.exists())  # pending doesn't count yet
+
+        decisions.decide_bookings([booking.pk], 'approved')
+        usage = RoomDailyUsage.objects.get(room=self.room, day=self.day(1))
+        self.assertEqual((usage.booked_minutes, usage.requested_minutes), (120, 120))
+        self.assertEqual(RoomHourlyUsage.objects.filter(room=self.room).count(), 2)
+
+        decisions.decide_bookings([booking.pk], 'rejected')  # revoked: wanted, but not used
+        usage.refresh_from_db()
+        self.assertEqual((usage.booked_minutes, usage.requested_minutes), (0, 120))
+
+    def test_incremental_rollups_match_reconciliation(self):
+        moved = self.make_booking(1, 2, status='approved')
+        pending = [self.make_booking(4 + i, 5 + i, room=self.other_room) for i in range(3)]
+        decisions.decide_bookings([b.pk for b in pending], 'approved')
+        decisions.decide_bookings([pending[0].pk], 'rejected')
+        moved.start_time, moved.end_time = self.at(6), self.at(8)
+        moved.save()
+        self.make_booking(10, 11, status='approved').delete()
+
+        incremental = self.snapshot()
+        first, last = self.day(-24), self.day(48)
+        self.assertEqual(rollups.reconcile(first, last), 0)
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_occupancy_only_counts_open_hours(self):
+        # 05:00 to 23:00 on one day: 18 hours booked, 14 of them while open
+        booking = Booking.objects.create(
+            user=self.user, room=self.room, purpose='Exam week',
+            start_time=self.at(-4), end_time=self.at(14), status='approved',
+        )
+        usage = RoomDailyUsage.objects.get(room=self.room)
+        self.assertEqual(usage.booked_minutes, rollups.OPEN_MINUTES)
+        self.assertEqual(RoomHourlyUsage.objects.filter(room=self.room).count(), 18)
+        report = rollups.utilization(self.day(0), self.day(0), [self.room.pk])
+        self.assertEqual(report['rooms'][0]['occupancy'], 1.0)
+
+        booking.status = 'rejected'
+        booking.save()
+        usage.refresh_from_db()
+        self.assertEqual((usage.booked_minutes, usage.requested_minutes), (0, rollups.OPEN_MINUTES))
+        first = self.day(0)
+        self.assertEqual(rollups.reconcile(first, first), 0)
+
+    def test_one_upsert_per_table(self):
+        bookings = [
+            Booking(room=room, start_time=self.at(i), end_time=self.at(i + 1), status='approved')
+            for i in range(3) for room in (self.room, self.other_room)
+        ]
+        with CaptureQueriesContext(connection) as captured:
+            rollups.record_changes(bookings, created=True)
+        self.assertEqual(len(captured), 2)
+        self.assertEqual(RoomHourlyUsage.objects.filter(booked_minutes=60).count(), 6)
+
+    def test_reconcile_repairs_drift(self):
+        self.make_booking(1, 2, status='approved')
+        RoomDailyUsage.objects.update(booked_minutes=999)
+        RoomHourlyUsage.objects.all().delete()
+        out = io.StringIO()
+        call_command('rollup_usage', '--days-back', '1', '--days-ahead', '30', stdout=out)
+        self.assertIn('1 room-day(s) corrected', out.getvalue())
+        self.assertEqual(RoomDailyUsage.objects.get().booked_minutes, 60)
+        self.assertEqual(RoomHourlyUsage.objects.get().requests, 1)
+
+    def test_utilization_endpoint_reads_rollups_only(self):
+        self.make_booking(1, 3, status='approved')
+        self.make_booking(1, 2, room=self.other_room, status='rejected')
+        self.client.force_login(self.staff)
+        day = self.day(1).isoformat()
+        with CaptureQueriesContext(connection) as captured:
+            report = self.client.get(reverse('utilization'), {'start': day, 'end': day}).json()
+        self.assertFalse([q for q in captured if 'FROM "core_booking"' in q['sql']])
+
+        rooms = {room['name']: room for room in report['rooms']}
+        self.assertEqual(rooms[self.room.name]['booked_minutes'], 120)
+        self.assertAlmostEqual(rooms[self.room.name]['occupancy'], round(120 / rollups.OPEN_MINUTES, 4))
+        self.assertEqual(rooms[self.other_room.name]['requested_minutes'], 60)
+        top = report['top_slots'][0]
+        self.assertEqual((top['hour'], top['requests']), (timezone.localtime(self.at(1)).hour, 2))
+        self.assertEqual(self.client.get(reverse('utilization'), {'start': '2026-02-30'}).status_code, 400)
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('utilization')).status_code, 403)
+
+
+class RoleResolverTests(BookingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.profile = Profile.objects.create(user=self.user, role='student', department='DCS')
+
+    def user_queries(self, url):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        return response, [q['sql'] for q in captured if 'FROM "auth_user"' in q['sql'] or 'core_profile' in q['sql']]
+
+    def test_role_comes_with_the_session_user(self):
+        self.client.login(username='student', password='pass12345')
+        cache.delete('role:%s' % self.user.pk)
+
+        # Cold: the profile is joined into the user query
+        response, queries = self.user_queries(reverse('login_redirect'))
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        self.assertEqual(len(queries), 1)
+        self.assertIn('JOIN "core_profile"', queries[0])
+
+        # Warm: plain user query, role from the cache
+        response, queries = self.user_queries(reverse('login_redirect'))
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('core_profile', queries[0])
+        self.assertEqual(response.wsgi_request.user.role, 'student')
+        self.assertEqual(response.wsgi_request.user.profile.department, 'DCS')
+
+    def test_profile_save_invalidates_cached_role(self):
+        self.client.login(username='student', password='pass12345')
+        self.assertEqual(self.client.get(reverse('admin_approval_list')).status_code, 403)
+
+        self.profile.role = 'admin'
+        self.profile.save()
+        self.assertEqual(self.client.get(reverse('admin_approval_list')).status_code, 200)
+        self.assertRedirects(
+            self.client.get(reverse('login_redirect')), reverse('admin_approval_list'), fetch_redirect_response=False,
+        )
+
+    def test_role_is_dropped_again_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.profile.role = 'admin'
+            self.profile.save()
+            # A request that read the old profile before the commit caches it
+            cache.set('role:%s' % self.user.pk, 'stale')
+        self.assertIsNone(cache.get('role:%s' % self.user.pk))
+
+    def test_staff_without_profile(self):
+        self.client.force_login(self.staff)
+        self.client.get(reverse('admin_approval_list'))
+        user = self.client.get(reverse('login_redirect')).wsgi_request.user
+        with self.assertNumQueries(0):
+            self.assertTrue(roles.is_booking_staff(user))
+            self.assertIsNone(roles.role(user))
+            self.assertFalse(hasattr(user, 'profile'))  # cached as missing, no query
+
+    def test_login_redirects_straight_home(self):
+        response = self.client.post(reverse('login'), {'username': 'registrar', 'password': 'pass12345'})
+        self.assertRedirects(response, reverse('admin_approval_list'), fetch_redirect_response=False)
+        self.client.logout()
+        response = self.client.post(reverse('login'), {'username': 'student', 'password': 'pass12345'})
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        # ?next= still wins
+        response = self.client.post(
+            reverse('login') + '?next=/availability/', {'username': 'student', 'password': 'pass12345'},
+        )
+        self.assertRedirects(response, '/availability/', fetch_redirect_response=False)
+
+
+class FragmentCacheTests(BookingTestMixin, TestCase):
+    def booking_queries(self, url):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        return response, [q for q in captured if 'FROM "core_booking"' in q['sql']]
+
+    def test_repeat_dashboard_view_skips_booking_queries(self):
+        self.make_booking(1, 2)
+        self.client.force_login(self.user)
+        _, first = self.booking_queries(reverse('dashboard'))
+        response, second = self.booking_queries(reverse('dashboard'))
+        self.assertTrue(first)
+        self.assertEqual(second, [])
+        self.assertContains(response, self.room.name)
+
+    def test_booking_and_notification_changes_refresh_the_dashboard(self):
+        booking = self.make_booking(1, 2)
+        self.client.force_login(self.user)
+        self.client.get(reverse('dashboard'))
+
+        decisions.decide_bookings([booking.pk], 'approved')  # bulk path + notification
+        response = self.client.get(reverse('dashboard'))
+        self.assertContains(response, 'bg-success">Approved')
+        self.assertContains(response, f"{self.room.name} has been approved")
+
+        self.make_booking(3, 4, room=self.other_room)  # post_save path
+        self.assertContains(self.client.get(reverse('dashboard')), self.other_room.name)
+
+    def test_admin_sections_follow_status_and_catalog_changes(self):
+        booking = self.make_booking(1, 2)
+        self.client.force_login(self.staff)
+        self.client.get(reverse('admin_approval_list'))
+        _, queries = self.booking_queries(reverse('admin_approval_list'))
+        self.assertEqual(queries, [])
+
+        booking.status = 'approved'
+        booking.save()
+        response = self.client.get(reverse('admin_approval_list'))
+        self.assertContains(response, 'No pending requests')
+        self.assertContains(response, 'Revoke')
+
+        self.room.name = 'ComLab 1 (renovated)'
+        self.room.save()
+        self.assertContains(self.client.get(reverse('admin_approval_list')), 'ComLab 1 (renovated)')
+
+
+class IndexUsageTests(BookingTestMixin, TestCase):
+    """
+    EXPLAIN the hot queries and check they are served by the intended index.
+    """
+
+    def plan(self, queryset):
+        if connection.vendor == 'postgresql':
+            # Tiny test tables would otherwise always be seq-scanned
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+    def assertUsesIndex(self, queryset, index_name, sorted_by_index=True):
+        plan = self.plan(queryset)
+        self.assertIn(index_name, plan)
+        if sorted_by_index and connection.vendor == 'sqlite':
+            self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_dashboard_reads_user_bookings_newest_first(self):
+        self.assertUsesIndex(views.dashboard_bookings(self.user), 'booking_user_start_idx')
+
+    def test_admin_queue_pages_by_status_and_start(self):
+        # A later page: the seek condition must not break the index order
+        after = pagination.make_cursor(self.at(1), 1)
+        self.assertUsesIndex(pagination._seek(
+            views.admin_bookings('pending'), after, views.ADMIN_PAGE_SIZE, False, 'start_time',
+        ), 'booking_status_start_idx')
+
+    def test_sweeper_reads_expiry_index(self):
+        self.assertUsesIndex(
+            Booking.objects.filter(status='approved').order_by('end_time').values_list('end_time')[:1],
+            'booking_status_end_idx',
+        )
+        self.assertUsesIndex(
+            Booking.objects.filter(status='approved', end_time__lt=timezone.now()).order_by('end_time')[:500],
+            'booking_status_end_idx',
+        )
+
+    def test_overlap_probe_uses_covering_index(self):
+        probe = Booking.objects.filter(
+            availability.overlap_filter(self.at(1), self.at(2)),
+            room=self.room, status__in=availability.BLOCKING_STATUSES,
+        ).values_list('pk', flat=True)[:1]
+        self.assertUsesIndex(probe, 'booking_room_avail_idx')
+
+    def test_notification_indexes(self):
+        self.assertUsesIndex(views.recent_notifications(self.user), 'notif_user_feed_idx')
+        # Partial index: only unread rows are in it
+        self.assertUsesIndex(
+            Notification.objects.filter(user=self.user, is_read=False), 'notif_user_unread_idx',
+        )
+
+    def test_admin_changelist_reads_start_index(self):
+        # Default order (the changelist adds -pk) and the "when" filter
+        self.assertUsesIndex(Booking.objects.order_by('-start_time', '-pk')[:100], 'booking_start_idx')
+        self.assertUsesIndex(
+            Booking.objects.filter(start_time__gte=self.at(0)).order_by('-start_time', '-pk')[:100],
+            'booking_start_idx',
+        )
+
+    @skipUnless(connection.vendor == 'postgresql', "exclusion constraints are PostgreSQL only")
+    def test_database_rejects_overlapping_approved_bookings(self):
+        self.make_booking(1, 3, status='approved')
+        self.make_booking(2, 4)  # pending may overlap
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            # bulk_create skips Booking.clean(): only the constraint stands in the way
+            Booking.objects.bulk_create([Booking(
+                user=self.user, room=self.room, start_time=self.at(2), end_time=self.at(4),
+                purpose='x', status='approved',
+            )])
+
+
+class BookingAdminTests(BookingTestMixin, TestCase):
+    changelist = reverse_lazy('admin:core_booking_changelist')
+
+    def setUp(self):
+        super().setUp()
+        self.admin_user = User.objects.create_superuser('root', password='pass12345')
+        self.client.force_login(self.admin_user)
+
+    def changelist_queries(self, params=None):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(self.changelist, params or {})
+        self.assertEqual(response.status_code, 200)
+        return response, [q['sql'] for q in captured]
+
+    def test_changelist_cost_does_not_grow_with_rows(self):
+        self.make_booking(1, 2)
+        _, few = self.changelist_queries()
+        Booking.objects.bulk_create(
+            Booking(user=self.user, room=self.other_room, start_time=self.at(i), end_time=self.at(i + 1), purpose='x')
+            for i in range(40)
+        )
+        response, many = self.changelist_queries()
+        self.assertEqual(len(few), len(many))
+        self.assertEqual(response.context['cl'].result_count, 41)
+        # Every count is capped: no COUNT(*) over the whole table
+        self.assertTrue(all('LIMIT' in sql for sql in many if 'COUNT(' in sql))
+
+    def test_filters_and_search(self):
+        mine = self.make_booking(1, 2, status='approved')
+        self.make_booking(3, 4, status='pending')
+        self.make_booking(1, 2, status='approved', user=self.staff, room=self.other_room)
+
+        def shown(params):
+            response, _ = self.changelist_queries(params)
+            return [booking.pk for booking in response.context['cl'].result_list]
+
+        self.assertEqual(shown({'status__exact': 'approved', 'when': 'upcoming', 'q': 'stud'}), [mine.pk])
+        self.assertEqual(len(shown({'room__id__exact': self.room.pk})), 2)
+        self.assertEqual(shown({'q': str(mine.pk)}), [mine.pk])
+        numbered = User.objects.create_user('2021001234')
+        theirs = self.make_booking(5, 6, user=numbered)
+        self.assertEqual(shown({'q': '2021001'}), [theirs.pk])  # a username prefix, not an id
+        self.assertEqual(shown({'when': 'past'}), [])
+
+    def test_count_is_capped(self):
+        bookings = [self.make_booking(i, i + 1) for i in range(6)]
+        pending = Booking.objects.filter(status='pending').order_by('pk')
+        with mock.patch.multiple(pagination.EstimatedCountPaginator, COUNT_LIMIT=4, LOOKAHEAD_PAGES=1):
+            paginator = pagination.EstimatedCountPaginator(pending, 2)
+            self.assertEqual((paginator.count, paginator.num_pages), (4, 2))
+            # Asking for page 2 moves the limit along, so page 3 shows up
+            paginator = pagination.EstimatedCountPaginator(pending, 2, page=2)
+            self.assertEqual(paginator.num_pages, 3)
+            self.assertEqual(len(paginator.page(3)), 2)
+
+            # Unfiltered: the highest id, so every page can be reached
+            bookings[2].delete()
+            paginator = pagination.EstimatedCountPaginator(Booking.objects.order_by('pk'), 2)
+            self.assertEqual(paginator.count, 6)
+            self.assertEqual(len(paginator.page(3)), 1)  # a deleted row makes the last page short
+
+    def test_bulk_actions_use_decision_path(self):
+        first = self.make_booking(1, 3)
+        clash = self.make_booking(2, 4)
+        response = self.client.post(self.changelist, {
+            'action': 'approve_selected', '_selected_action': [first.pk, clash.pk],
+        }, follow=True)
+        first.refresh_from_db()
+        clash.refresh_from_db()
+        # Checked against each other in one pass: only the earlier one fits
+        self.assertEqual((first.status, clash.status), ('approved', 'pending'))
+        self.assertEqual(Notification.objects.filter(user=self.user).count(), 1)
+        self.assertIn('already booked', ' '.join(str(m) for m in response.context['messages']))
+
+        self.client.post(self.changelist, {'action': 'reject_selected', '_selected_action': [clash.pk]})
+        clash.refresh_from_db()
+        self.assertEqual(clash.status, 'rejected')
+
+    def test_notification_mark_read_action_keeps_counters(self):
+        notifications.notify_many([(self.user.pk, 'a'), (self.user.pk, 'b'), (self.staff.pk, 'c')])
+        selected = Notification.objects.exclude(message='b').values_list('pk', flat=True)
+        self.client.post(reverse('admin:core_notification_changelist'), {
+            'action': 'mark_read', '_selected_action': list(selected),
+        })
+        self.assertEqual(notifications.unread_count(self.user), 1)
+        self.assertEqual(notifications.unread_count(self.staff), 0)
+        self.assertEqual(notifications.mark_read_many(selected), 0)
+
+    def test_notification_deletes_keep_counters(self):
+        notifications.notify_many([(self.user.pk, 'a'), (self.user.pk, 'b'), (self.staff.pk, 'c')])
+        first, second, third = Notification.objects.order_by('pk')
+        self.assertEqual(self.client.get(reverse('admin:core_notification_add')).status_code, 403)
+
+        self.client.post(reverse('admin:core_notification_delete', args=[first.pk]), {'post': 'yes'})
+        self.assertEqual(notifications.unread_count(self.user), 1)
+
+        self.client.post(reverse('admin:core_notification_changelist'), {
+            'action': 'delete_selected', '_selected_action': [second.pk, third.pk], 'post': 'yes',
+        })
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual((notifications.unread_count(self.user), notifications.unread_count(self.staff)), (0, 0))
+
+
+class CalendarFeedTests(BookingTestMixin, TestCase):
+    def get(self, url, **headers):
+        response = self.client.get(url, headers=headers)
+        if response.status_code == 200:
+            response.body = b''.join(response.streaming_content).decode()
+        return response
+
+    def test_user_feed_lists_approved_bookings(self):
+        approved = self.make_booking(1, 2, status='approved')
+        self.make_booking(3, 4, status='pending')
+        response = self.get(ics.feed_url('user', self.user.pk))
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        self.assertIn(f'UID:booking-{approved.pk}@cvsureserve', response.body)
+        self.assertEqual(response.body.count('BEGIN:VEVENT'), 1)
+        self.assertIn(f"DTSTART:{self.at(1).astimezone(dt_timezone.utc):%Y%m%dT%H%M%SZ}", response.body)
+        self.assertTrue(response.body.startswith('BEGIN:VCALENDAR\r\n'))
+
+    def test_unchanged_feed_is_304_without_queries(self):
+        self.make_booking(1, 2, status='approved')
+        url = ics.feed_url('room', self.room.pk)
+        first = self.get(url)
+        with self.assertNumQueries(0):
+            again = self.get(url, if_none_match=first['ETag'])
+            since = self.get(url, if_modified_since=first['Last-Modified'])
+        self.assertEqual((again.status_code, since.status_code), (304, 304))
+        self.assertEqual(again['ETag'], first['ETag'])
+
+        # Approving a booking in the room changes the version
+        pending = self.make_booking(3, 4)
+        decisions.decide_bookings([pending.pk], 'approved')
+        changed = self.get(url, if_none_match=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.body.count('BEGIN:VEVENT'), 2)
+
+    def test_deactivated_user_feed_stops_answering(self):
+        self.make_booking(1, 2, status='approved')
+        url = ics.feed_url('user', self.user.pk)
+        first = self.get(url)
+        with self.assertNumQueries(1):  # the is_active check, then the 304
+            self.assertEqual(self.get(url, if_none_match=first['ETag']).status_code, 304)
+
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.get(url, if_none_match=first['ETag']).status_code, 404)
+
+    def test_moving_a_booking_bumps_both_rooms(self):
+        booking = self.make_booking(1, 2, status='approved')
+        urls = [ics.feed_url('room', room.pk) for room in (self.room, self.other_room)]
+        etags = [self.get(url)['ETag'] for url in urls]
+        booking.room = self.other_room
+        booking.save()
+        for url, etag in zip(urls, etags):
+            self.assertEqual(self.get(url, if_none_match=etag).status_code, 200)
+
+    def test_tokens_are_signed_per_kind(self):
+        url = ics.feed_url('room', self.room.pk)
+        self.assertEqual(self.client.get(url.replace('.ics', 'x.ics')).status_code, 404)
+        # A room's token doesn't open the user with the same id
+        token = url.rsplit('/', 1)[1]
+        self.assertEqual(self.client.get(reverse('user_calendar', args=[token[:-4]])).status_code, 404)
+
+    def test_long_text_is_escaped_and_folded(self):
+        booking = self.make_booking(1, 2, status='approved')
+        Booking.objects.filter(pk=booking.pk).update(purpose='Thesis defense; panel, ' + 'é' * 80)
+        fragments.bump(f"room:{self.room.pk}")
+        text = self.get(ics.feed_url('room', self.room.pk)).body
+        self.assertTrue(all(len(line.encode()) <= 75 for line in text.split('\r\n')))
+        unfolded = text.replace('\r\n ', '')
+        self.assertIn('SUMMARY:Thesis defense\\; panel\\, ' + 'é' * 80 + '\r\n', unfolded)
+
+    def test_feed_list_and_dashboard_link(self):
+        self.client.force_login(self.user)
+        feeds = self.client.get(reverse('calendar_feeds')).json()
+        self.assertTrue(feeds['mine'].endswith(ics.feed_url('user', self.user.pk)))
+        self.assertEqual([room['name'] for room in feeds['rooms']], ['ComLab 1', 'ComLab 2'])
+        self.assertContains(self.client.get(reverse('dashboard')), ics.feed_url('user', self.user.pk))
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Runs the benchmark scenarios on a small dataset so a view that grows past
+    its recorded query budget (benchmarks/query_budgets.json) fails the suite.
+    """
+
+    def setUp(self):
+        bench_views.clear_caches()
+
+    def test_core_views_stay_within_query_budgets(self):
+        data = datagen.generate(users=20, rooms=5, bookings=300)
+        budgets = json.loads(bench_views.BUDGETS_FILE.read_text())
+        for view, user, request in bench_views.scenarios(data):
+            # Cold (every cache missed) and warm (fragment hits) are budgeted apart
+            for suffix, (queries, _, _) in bench_views.measure_both(user, request, repeat=3):
+                with self.subTest(view=view + suffix):
+                    self.assertLessEqual(queries, budgets[view + suffix])
+
+
+class SharedCacheCheckTests(TestCase):
+    def test_locmem_refused_with_several_workers(self):
+        # The tests run on locmem (TEST_CACHES)
+        with mock.patch.dict(os.environ, {'WEB_CONCURRENCY': '4'}):
+            self.assertEqual(
+                [error.id for error in checks.shared_caches_check(None)], ['core.E001', 'core.E001'],
+            )
+        with mock.patch.dict(os.environ, {'WEB_CONCURRENCY': '1'}):
+            self.assertEqual(checks.shared_caches_check(None), [])
+
+
+@override_settings(PROFILING_N_PLUS_ONE_THRESHOLD=3)
+class ProfilingMiddlewareTests(BookingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        profile_registry.reset()
+
+    def test_requests_are_recorded_by_url_name(self):
+        self.client.force_login(self.user)
+        self.client.get(reverse('dashboard'))
+        stats = profile_registry.snapshot()['dashboard']
+        self.assertEqual(stats['requests'], 1)
+        self.assertGreater(stats['avg_sql_count'], 0)
+        self.assertGreater(stats['avg_template_ms'], 0)
+
+    def test_repeated_query_shapes_are_flagged(self):
+        def n_plus_one(request):
+            for room in Room.objects.all():
+                list(Booking.objects.filter(room=room))
+            return HttpResponse('ok')
+
+        Room.objects.create(name='ComLab 3', type='Laboratory', capacity=40)
+        middleware = QueryProfilingMiddleware(n_plus_one)
+        request = RequestFactory().get('/')
+        request.resolver_match = None
+        with self.assertLogs('core.profiling', level='WARNING') as logs:
+            middleware(request)
+        self.assertIn('Possible N+1', logs.output[0])
+        self.assertEqual(len(profile_registry.snapshot()['unresolved']['n_plus_one']), 1)
+
+    def test_suspect_shapes_stay_bounded(self):
+        route = RouteStats(window=10)
+        route.add(RequestSample('x', 200, 1.0, repeated={'SELECT hot': 5}))
+        for size in range(1, 500):
+            params = ', '.join(['%s'] * size)
+            route.add(RequestSample('x', 200, 1.0, repeated={f'SELECT ... IN ({params})': 5, 'SELECT hot': 5}))
+        self.assertLessEqual(len(route.suspects), 2 * MAX_SUSPECTS)
+        self.assertEqual(route.summary()['n_plus_one'][0], {'sql': 'SELECT hot', 'requests': 500})
+
+    def test_panel_is_staff_only(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('profiling_panel')).status_code, 403)
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('profiling_panel'), {'format': 'json'})
+        self.assertIn('routes', response.json())
+
+
+class AsyncViewTests(BookingTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        profile_registry.reset()
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+
+    async def test_async_dashboard_matches_sync_dashboard(self):
+        booking = await Booking.objects.acreate(
+            user=self.user, room=self.room, start_time=self.at(1), end_time=self.at(2), purpose='Class',
+        )
+        await sync_to_async(notifications.notify)(self.user, 'approved')
+        response = await self.async_client.get(reverse('dashboard_async'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([b.pk for b in response.context['bookings']], [booking.pk])
+        self.assertEqual(response.context['unread_count'], 1)
+        self.assertContains(response, self.room.name)
+        # The async path through the profiling middleware still sees the queries
+        stats = profile_registry.snapshot()['dashboard_async']
+        self.assertGreater(stats['avg_sql_count'], 0)
+
+    def test_async_dashboard_reads_nothing_behind_cached_fragments(self):
+        self.make_booking(1, 2)
+        self.client.get(reverse('dashboard'))  # fills the fragments
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('dashboard_async'))
+        self.assertContains(response, self.room.name)
+        tables = ('FROM "core_booking"', 'FROM "core_notification"')
+        self.assertFalse([q for q in captured if any(table in q['sql'] for table in tables)])
+
+    async def test_async_json_views_match_sync_views(self):
+        await sync_to_async(notifications.notify_many)(
+            (self.user.pk, f"n{i}") for i in range(15)
+        )
+        for sync_name, async_name, params in (
+            ('notification_feed', 'notification_feed_async', {}),
+            ('room_availability_grid', 'room_availability_grid_async', {'days': 2, 'slot': 30}),
+        ):
+            expected = await sync_to_async(self.client.get)(reverse(sync_name), params)
+            actual = await self.async_client.get(reverse(async_name), params)
+            self.assertEqual(actual.json(), expected.json())
+
+    async def test_async_views_require_login(self):
+        await self.async_client.alogout()
+        response = await self.async_client.get(reverse('dashboard_async'))
+        self.assertEqual(response.status_code, 302)
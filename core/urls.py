@@ -9,8 +9,24 @@ urlpatterns = [
     # Student Dashboard & Actions
     path('dashboard/', views.DashboardView.as_view(), name='dashboard'),
     path('book/', views.BookingCreateView.as_view(), name='create_booking'),
+    path('book/recurring/', views.BookingSeriesCreateView.as_view(), name='create_booking_series'),
+    path('waitlist/<int:entry_id>/leave/', views.leave_waitlist, name='leave_waitlist'),
     path('cancel-booking/<int:booking_id>/', views.CancelBookingView.as_view(), name='cancel_booking'),
+    path('availability/grid/', views.room_availability_grid, name='room_availability_grid'),
+    path('equipment/availability/', views.equipment_availability, name='equipment_availability'),
     path('notifications/clear/', views.clear_notifications, name='clear_notifications'),
+    path('notifications/', views.notification_feed, name='notification_feed'),
+    path('notifications/read/', views.mark_notifications_read, name='mark_notifications_read'),
+
+    # Calendar feeds (signed URLs, polled by calendar apps)
+    path('calendar/', views.calendar_feeds, name='calendar_feeds'),
+    path('calendar/room/<str:token>.ics', views.CalendarFeedView.as_view(kind='room'), name='room_calendar'),
+    path('calendar/user/<str:token>.ics', views.CalendarFeedView.as_view(kind='user'), name='user_calendar'),
+
+    # Async (ASGI) versions of the read-heavy pages
+    path('async/dashboard/', views.dashboard_async, name='dashboard_async'),
+    path('async/notifications/', views.notification_feed_async, name='notification_feed_async'),
+    path('async/availability/grid/', views.room_availability_grid_async, name='room_availability_grid_async'),
 
     # Authentication
     path('signup/', views.SignupView.as_view(), name='signup'),
@@ -19,6 +35,12 @@ urlpatterns = [
 
     # Admin Panel
     path('admin-approval/', views.AdminApprovalListView.as_view(), name='admin_approval_list'),
+    path('admin-approval/history/', views.AdminHistoryView.as_view(), name='admin_approval_history'),
     path('update-booking/<int:booking_id>/<str:new_status>/', views.BookingStatusUpdateView.as_view(), name='update_booking_status'),
+    path('update-series/<int:series_id>/<str:new_status>/', views.SeriesStatusUpdateView.as_view(), name='update_series_status'),
+    path('update-booking/bulk/', views.BulkBookingDecisionView.as_view(), name='bulk_booking_decision'),
+    path('admin-profiling/', views.ProfilingPanelView.as_view(), name='profiling_panel'),
+    path('admin-approval/export/', views.BookingExportView.as_view(), name='export_bookings'),
+    path('admin-utilization/', views.UtilizationView.as_view(), name='utilization'),
     path('edit-booking/<int:pk>/', views.BookingUpdateView.as_view(), name='edit_booking'),
 ]
\ No newline at end of file
@@ -1,27 +1,115 @@
+import asyncio
+import json
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+
 from django.contrib import messages
 from django.contrib.auth import login
+from django.contrib.auth.views import LoginView
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.shortcuts import redirect, get_object_or_404
+from django.contrib.messages.views import SuccessMessageMixin
+from django.core.exceptions import ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.shortcuts import redirect, get_object_or_404, resolve_url
+from django.template.response import TemplateResponse
 from django.urls import reverse_lazy
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.functional import SimpleLazyObject
+from django.utils.http import http_date
 
 # Class-Based View Imports
+from django.views.decorators.http import require_POST
 from django.views.generic import TemplateView, ListView, CreateView, View, UpdateView
-from .forms import BookingForm
+from .forms import BookingForm, BookingSeriesForm
 
 # Models & Forms
-from .models import Booking, Profile, Notification
+from . import admission, export, fragments, grid, ics, inventory, notifications, rollups, roles, waitlist
+from .decisions import DECISION_STATUSES, decide_bookings, decide_series
+from .models import Booking, BookingSeries, Profile, Notification, Room
+from .pagination import apaginate_keyset, decode_cursor, paginate_keyset
+from .profiling import registry as profile_registry
+
+# Rows per page on the admin approval queue
+ADMIN_PAGE_SIZE = 25
+HISTORY_STATUSES = ('rejected', 'cancelled', 'completed')
+
+
+def admin_bookings(*statuses):
+    """
+    Admin queue rows with everything the tables render loaded up front
+    (user, room and equipment), so each page costs a fixed number of queries.
+    """
+    return Booking.objects.filter(status__in=statuses).select_related(
+        'user', 'room'
+    ).prefetch_related('equipment')
+
+def dashboard_bookings(user):
+    # The table shows booking.room.name on every row
+    return Booking.objects.filter(user=user).select_related('room').order_by('-start_time')
+
 
-# UPDATES THE STATUS OF THE BOOKINGS USING TIME
-def update_past_bookings():
+def recent_notifications(user):
+    # The last 5 notifications for this user (served by the feed index)
+    return Notification.objects.filter(user=user).order_by('-created_at', '-id')[:5]
+
+
+def grid_query(request):
     """
-    Auto-completes bookings that have passed.
+    Reads ?start=&days=&slot=&rooms= for the availability grid.
+    Raises ValueError with a message for the client on bad input.
     """
-    now = timezone.now()
-    # Check for 'approved' bookings where the end_time is older than 'now'
-    Booking.objects.filter(status='approved', end_time__lt=now).update(status='completed')
+    try:
+        first_day = parse_date(request.GET.get('start', '')) or timezone.localdate()
+    except ValueError:  # well-formed but impossible, e.g. 2026-02-30
+        raise ValueError("start must be a valid date (YYYY-MM-DD).")
+    try:
+        days = min(max(int(request.GET.get('days', 7)), 1), grid.MAX_DAYS)
+        slot_minutes = int(request.GET.get('slot', 60))
+        room_filter = [int(pk) for pk in request.GET.get('rooms', '').split(',') if pk]
+    except ValueError:
+        raise ValueError("days, slot and rooms must be numbers.")
+    if slot_minutes not in grid.SLOT_CHOICES:
+        raise ValueError(f"slot must be one of {grid.SLOT_CHOICES}.")
+    return first_day, days, slot_minutes, room_filter
+
+
+def grid_rooms(room_filter):
+    rooms = Room.objects.filter(is_active=True).order_by('name')
+    if room_filter:
+        rooms = rooms.filter(pk__in=room_filter)
+    return rooms.values('id', 'name', 'type', 'capacity')
+
+
+def grid_payload(slot_minutes, rooms, occupancy):
+    return {
+        'slot_minutes': slot_minutes,
+        'slots': grid.slot_labels(slot_minutes),
+        'rooms': rooms,
+        'days': [
+            {'date': day.isoformat(), 'rooms': {str(room_id): cells for room_id, cells in block.items()}}
+            for day, block in occupancy.items()
+        ],
+    }
+
+
+def feed_payload(page, unread):
+    return {
+        'unread': unread,
+        'notifications': [
+            {'id': n.pk, 'message': n.message, 'is_read': n.is_read, 'created_at': n.created_at.isoformat()}
+            for n in page.items
+        ],
+        'next': page.next_cursor,
+    }
+
+# NOTE: Past bookings are auto-completed by the `sweep_bookings` management
+# command (see core/sweeper.py), so the views below never write on a GET.
 
 # ---------------------------------------------------------
 # 1. LANDING PAGE & STATIC PAGES
@@ -38,38 +126,160 @@ class DashboardView(LoginRequiredMixin, ListView):
     context_object_name = 'bookings'
 
     def get_queryset(self):
-        # 1. Run the auto-complete check
-        update_past_bookings()
-        # 2. Get bookings
-        return Booking.objects.filter(user=self.request.user).order_by('-start_time')
+        return dashboard_bookings(self.request.user)
 
     # ADD THIS FUNCTION TO GET NOTIFICATIONS
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Fetch the last 5 notifications for this user
-        context['notifications'] = Notification.objects.filter(
-            user=self.request.user
-        ).order_by('-created_at')[:5]
-        # (Assuming your Notification model has a 'created_at' or 'date' field)
+        context['notifications'] = recent_notifications(self.request.user)
+        # The tables are cached fragments; these querysets only run on a miss
+        context['fragment_versions'] = fragments.dashboard_versions(self.request.user)
+        context['fragment_timeout'] = fragments.FRAGMENT_TIMEOUT
+        # Badge number comes from the denormalized counter, not a COUNT(*)
+        context['unread_count'] = notifications.unread_count(self.request.user)
+        # Signed, so no query
+        context['calendar_url'] = ics.feed_url('user', self.request.user.pk)
         return context
 # ---------------------------------------------------------
 # 3. CREATE BOOKING (Create)
 # ---------------------------------------------------------
-class BookingCreateView(LoginRequiredMixin, CreateView):
+class AdmittedBookingMixin(SuccessMessageMixin):
+    """
+    Saves the booking form through core.admission (room lock + final slot
+    check) instead of a plain form.save(). A slot lost to a concurrent
+    request comes back as a normal form error.
+    """
+    admit = staticmethod(admission.save_booking)
+    defer_conflict_check = False
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        if self.defer_conflict_check:
+            kwargs['defer_conflict_check'] = True
+        return kwargs
+
+    def form_valid(self, form):
+        try:
+            saved = self.admit(form)
+        except ValidationError as error:
+            form.add_error(None, error)
+            return self.form_invalid(form)
+        except admission.AdmissionBusy as error:
+            form.add_error(None, str(error))
+            return self.form_invalid(form)
+
+        self.object = saved
+        messages.success(self.request, self.get_success_message(form.cleaned_data))
+        return redirect(self.get_success_url())
+
+
+class BookingCreateView(LoginRequiredMixin, AdmittedBookingMixin, CreateView):
     model = Booking
     form_class = BookingForm
     template_name = 'core/booking_form.html'
     success_url = reverse_lazy('dashboard')  # <--- CHANGE THIS from 'success_page'
+    success_message = "Reservation submitted successfully!"
+    defer_conflict_check = True
 
     def form_valid(self, form):
         # 1. Attach the user
         form.instance.user = self.request.user
 
-        # 2. Add a success message (Optional but recommended)
-        messages.success(self.request, "Reservation submitted successfully!")
+        # 2. Save under the room lock, then add the success message and redirect
+        return super().form_valid(form)
+
+    def form_invalid(self, form):
+        # Slot taken: keep the request on the waitlist (core.waitlist) so it
+        # is promoted automatically if the slot frees up
+        if form.taken_slot:
+            room, start_time, end_time, _ = form.taken_slot
+            form.waitlisted = waitlist.join(
+                self.request.user, room, start_time, end_time, form.cleaned_data.get('purpose'),
+                form.cleaned_data.get('equipment') or (),
+            )
+        return super().form_invalid(form)
+
+
+@login_required
+@require_POST
+def leave_waitlist(request, entry_id):
+    # Opt out of an automatic waitlist entry (BookingCreateView.form_invalid)
+    if waitlist.leave(request.user, entry_id):
+        messages.info(request, "You left the waitlist for that slot.")
+    return redirect('create_booking')
+
+@login_required
+def equipment_availability(request):
+    """
+    Free units per equipment item for ?start=...&end=... (ISO datetimes).
+    The booking form calls this to grey out items that are fully booked.
+    """
+    try:
+        # parse_datetime raises on well-formed but impossible values (month 13)
+        start_time = parse_datetime(request.GET.get('start', ''))
+        end_time = parse_datetime(request.GET.get('end', ''))
+    except ValueError:
+        start_time = end_time = None
+    if not start_time or not end_time:
+        return JsonResponse({'error': "Pass valid start and end datetimes."}, status=400)
+
+    # datetime-local inputs have no offset; read them in the site's timezone.
+    # Both are aware before comparing, in case only one had an offset
+    if timezone.is_naive(start_time):
+        start_time = timezone.make_aware(start_time)
+    if timezone.is_naive(end_time):
+        end_time = timezone.make_aware(end_time)
+    if end_time <= start_time:
+        return JsonResponse({'error': "Pass valid start and end datetimes."}, status=400)
+
+    exclude = request.GET.get('exclude')
+    free = inventory.free_quantities(
+        start_time, end_time, exclude_booking_id=int(exclude) if exclude and exclude.isdigit() else None
+    )
+    return JsonResponse({
+        'equipment': [
+            {'id': pk, 'total': total, 'free': units}
+            for pk, (total, units) in free.items()
+        ]
+    })
+
+
+@login_required
+def room_availability_grid(request):
+    """
+    Rooms x time-slot occupancy for a date range, e.g.
+    ?start=2026-06-01&days=7&slot=30&rooms=1,2,3 (rooms defaults to all active).
+    Cells are null (free), "pending" or "booked".
+    """
+    try:
+        first_day, days, slot_minutes, room_filter = grid_query(request)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+
+    rooms = list(grid_rooms(room_filter))
+    occupancy = grid.availability_grid([room['id'] for room in rooms], first_day, days, slot_minutes)
+    return JsonResponse(grid_payload(slot_minutes, rooms, occupancy))
 
-        # 3. Let Django handle the save and redirect
+
+class BookingSeriesCreateView(LoginRequiredMixin, AdmittedBookingMixin, CreateView):
+    """
+    Books the same room on the same weekdays for a whole date range.
+    """
+    model = BookingSeries
+    form_class = BookingSeriesForm
+    template_name = 'core/booking_series_form.html'
+    success_url = reverse_lazy('dashboard')
+    # The form already expanded every date; they are re-checked under the lock
+    admit = staticmethod(admission.save_series)
+
+    def get_success_message(self, cleaned_data):
+        return f"Recurring reservation submitted ({self.date_count} dates)!"
+
+    def form_valid(self, form):
+        form.instance.user = self.request.user
+        self.date_count = len(form.windows)
         return super().form_valid(form)
+
 # ---------------------------------------------------------
 # 4. ADMIN APPROVAL (Read - Staff Only)
 # ---------------------------------------------------------
@@ -79,26 +289,65 @@ class AdminApprovalListView(UserPassesTestMixin, ListView):
     context_object_name = 'bookings'  # This is the 'Pending' list
 
     def test_func(self):
-        return self.request.user.is_staff
+        return roles.is_booking_staff(self.request.user)
 
-    def get_queryset(self):
-        # 1. TRIGGER THE CHECK (Update statuses before loading)
-        update_past_bookings()
+    # Each section is a cached fragment, so the pages are lazy: they only
+    # hit the database when the template misses the cache
+
+    def get_template_names(self):
+        # ListView's version peeks at object_list.model, which would load the page
+        return [self.template_name]
 
-        # Return pending requests
-        return Booking.objects.filter(status='pending').order_by('start_time')
+    def get_queryset(self):
+        # 1. Pending requests, one keyset page at a time
+        self.pending_page = SimpleLazyObject(lambda: paginate_keyset(
+            admin_bookings('pending'), self.request.GET.get('pending_after'), ADMIN_PAGE_SIZE
+        ))
+        return SimpleLazyObject(lambda: self.pending_page.items)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context['pending_page'] = self.pending_page
 
         # 2. Approved List (Only show UPCOMING approved bookings)
-        context['approved_bookings'] = Booking.objects.filter(status='approved').order_by('start_time')
+        approved_page = SimpleLazyObject(lambda: paginate_keyset(
+            admin_bookings('approved'), self.request.GET.get('approved_after'), ADMIN_PAGE_SIZE
+        ))
+        context['approved_bookings'] = SimpleLazyObject(lambda: approved_page.items)
+        context['approved_page'] = approved_page
+
+        # 3. History is loaded lazily from AdminHistoryView
+        context['fragment_versions'] = fragments.admin_versions()
+        context['fragment_timeout'] = fragments.FRAGMENT_TIMEOUT
+        return context
 
-        # 3. History List (Add 'completed' here so they appear in history!)
-        context['history_bookings'] = Booking.objects.filter(
-            status__in=['rejected', 'cancelled', 'completed']  # <--- ADD 'completed'
-        ).order_by('-start_time')
 
+class AdminHistoryView(UserPassesTestMixin, ListView):
+    """
+    Reservation history rows, fetched by the admin page on demand.
+    """
+    model = Booking
+    template_name = 'core/partials/admin_history_rows.html'
+    context_object_name = 'history_bookings'
+
+    def test_func(self):
+        return roles.is_booking_staff(self.request.user)
+
+    def get_template_names(self):
+        return [self.template_name]
+
+    def get_queryset(self):
+        self.page = SimpleLazyObject(lambda: paginate_keyset(
+            admin_bookings(*HISTORY_STATUSES), self.request.GET.get('after'), ADMIN_PAGE_SIZE,
+            descending=True,
+        ))
+        return SimpleLazyObject(lambda: self.page.items)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['page'] = self.page
+        context['fragment_versions'] = fragments.admin_versions()
+        context['fragment_timeout'] = fragments.FRAGMENT_TIMEOUT
         return context
 
 # ---------------------------------------------------------
@@ -106,23 +355,186 @@ class AdminApprovalListView(UserPassesTestMixin, ListView):
 # ---------------------------------------------------------
 class BookingStatusUpdateView(UserPassesTestMixin, View):
     def test_func(self):
-        return self.request.user.is_staff
+        return roles.is_booking_staff(self.request.user)
 
     def get(self, request, booking_id, new_status):
-        booking = get_object_or_404(Booking, id=booking_id)
+        if new_status in DECISION_STATUSES:
+            result = decide_bookings([booking_id], new_status)
+            if result.missing:
+                raise Http404("Booking not found.")
+            for booking in result.skipped:
+                messages.error(request, f"This booking is {booking.status} and can't be {new_status}.")
+            for booking in result.conflicts:
+                messages.error(request, f"{booking.room.name} is already booked for this time.")
 
-        if new_status in ['approved', 'rejected']:
-            booking.status = new_status
-            booking.save()
+        return redirect('admin_approval_list')
 
-            # Create Notification
-            Notification.objects.create(
-                user=booking.user,
-                message=f"Your booking for {booking.room.name} has been {new_status}."
-            )
+
+class SeriesStatusUpdateView(UserPassesTestMixin, View):
+    """
+    Approve or reject every pending date of a recurring series in one click.
+    """
+    def test_func(self):
+        return roles.is_booking_staff(self.request.user)
+
+    def get(self, request, series_id, new_status):
+        series = get_object_or_404(BookingSeries.objects.select_related('room'), id=series_id)
+        if new_status in DECISION_STATUSES:
+            result = decide_series(series, new_status)
+            messages.success(request, f"{len(result.updated)} date(s) {new_status}.")
+            if result.conflicts:
+                messages.error(request, f"{len(result.conflicts)} date(s) skipped: room already booked for that time.")
 
         return redirect('admin_approval_list')
 
+
+class BulkBookingDecisionView(UserPassesTestMixin, View):
+    """
+    POST many booking IDs and one decision ('approved' or 'rejected').
+
+    Accepts a form post (booking_ids=1&booking_ids=2&status=approved) from the
+    admin page, or a JSON body {"booking_ids": [...], "status": "..."} from
+    API clients, which get a JSON summary back.
+    """
+    def test_func(self):
+        return roles.is_booking_staff(self.request.user)
+
+    def post(self, request):
+        wants_json = request.content_type == 'application/json'
+        try:
+            if wants_json:
+                payload = json.loads(request.body)
+                booking_ids, new_status = payload['booking_ids'], payload['status']
+            else:
+                booking_ids, new_status = request.POST.getlist('booking_ids'), request.POST.get('status')
+            if not booking_ids:
+                raise ValueError("no bookings selected")
+            result = decide_bookings(booking_ids, new_status)
+        except (ValueError, TypeError, KeyError):
+            if wants_json:
+                return JsonResponse({'error': "Expected booking_ids and an approved/rejected status."}, status=400)
+            messages.warning(request, "Select at least one booking and a valid action.")
+            return redirect('admin_approval_list')
+
+        if wants_json:
+            return JsonResponse({
+                'updated': [booking.pk for booking in result.updated],
+                'conflicts': [booking.pk for booking in result.conflicts],
+                'missing': result.missing,
+                'skipped': [booking.pk for booking in result.skipped],
+            })
+
+        if result.updated:
+            messages.success(request, f"{len(result.updated)} booking(s) {new_status}.")
+        if result.conflicts:
+            messages.error(request, f"{len(result.conflicts)} booking(s) skipped: room already booked for that time.")
+        if result.skipped:
+            messages.warning(
+                request, f"{len(result.skipped)} booking(s) skipped: already cancelled, completed or decided."
+            )
+        return redirect('admin_approval_list')
+
+class ProfilingPanelView(UserPassesTestMixin, TemplateView):
+    """
+    Recent per-route timings from QueryProfilingMiddleware (this process only).
+    Add ?format=json for the raw numbers.
+    """
+    template_name = 'core/profiling.html'
+
+    def test_func(self):
+        return roles.is_booking_staff(self.request.user)
+
+    def get(self, request, *args, **kwargs):
+        if request.GET.get('format') == 'json':
+            return JsonResponse({'routes': profile_registry.snapshot()})
+        return super().get(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['routes'] = profile_registry.snapshot()
+        return context
+
+
+class UtilizationView(UserPassesTestMixin, View):
+    """
+    Room occupancy and the most requested time slots, from the usage rollups
+    (core.rollups), e.g. ?start=2026-06-01&end=2026-10-31&group=week&rooms=1,2
+    """
+
+    def test_func(self):
+        return roles.is_booking_staff(self.request.user)
+
+    def get(self, request):
+        try:
+            last_day = parse_date(request.GET.get('end', '')) or timezone.localdate()
+            first_day = parse_date(request.GET.get('start', '')) or last_day - timedelta(days=119)
+        except ValueError:  # well-formed but impossible, e.g. 2026-02-30
+            return JsonResponse({'error': "start and end must be valid dates (YYYY-MM-DD)."}, status=400)
+        group = request.GET.get('group', 'day')
+        if group not in ('day', 'week'):
+            return JsonResponse({'error': "group must be day or week."}, status=400)
+        if last_day < first_day or (last_day - first_day).days >= rollups.MAX_REPORT_DAYS:
+            return JsonResponse({'error': f"Pick a range of 1 to {rollups.MAX_REPORT_DAYS} days."}, status=400)
+        try:
+            room_ids = [int(pk) for pk in request.GET.get('rooms', '').split(',') if pk]
+        except ValueError:
+            return JsonResponse({'error': "rooms must be numbers."}, status=400)
+
+        report = rollups.utilization(first_day, last_day, room_ids, group)
+        report['start'] = first_day.isoformat()
+        report['end'] = last_day.isoformat()
+        report['top_slots'] = rollups.top_slots(first_day, last_day, room_ids)
+        return JsonResponse(report)
+
+
+class BookingExportView(UserPassesTestMixin, View):
+    """
+    Streams booking history for reports, e.g.
+    ?format=csv&start=2026-06-01&end=2026-10-31&rooms=1,2&status=approved,completed
+    Every row has a `cursor`; pass the last one as ?after= to resume.
+    """
+
+    def test_func(self):
+        return roles.is_booking_staff(self.request.user)
+
+    def get(self, request):
+        fmt = request.GET.get('format', 'csv')
+        if fmt not in export.FORMATS:
+            return JsonResponse({'error': f"format must be one of {export.FORMATS}."}, status=400)
+        try:
+            room_ids = [int(pk) for pk in request.GET.get('rooms', '').split(',') if pk]
+        except ValueError:
+            return JsonResponse({'error': "rooms must be numbers."}, status=400)
+        days = {}
+        for name in ('start', 'end'):
+            value = request.GET.get(name, '')
+            try:
+                days[name] = parse_date(value) if value else None
+            except ValueError:  # well-formed but impossible, e.g. 2026-02-30
+                days[name] = None
+            if value and days[name] is None:
+                return JsonResponse({'error': f"{name} must be a date like 2026-06-01."}, status=400)
+        after = request.GET.get('after')
+        if after and decode_cursor(after) is None:
+            # Restarting from the first row would hand a resuming client duplicates
+            return JsonResponse({'error': "after must be a cursor from a previous export."}, status=400)
+
+        queryset = export.export_queryset(
+            first_day=days['start'],
+            last_day=days['end'],
+            room_ids=room_ids,
+            statuses=[s for s in request.GET.get('status', '').split(',') if s],
+            after=after,
+        )
+        content = export.lines(export.rows(queryset), fmt)
+        if isinstance(request, ASGIRequest):
+            content = export.aiterate(content)
+        response = StreamingHttpResponse(
+            content, content_type='text/csv' if fmt == 'csv' else 'application/x-ndjson',
+        )
+        response['Content-Disposition'] = f'attachment; filename="bookings.{fmt}"'
+        return response
+
 # ---------------------------------------------------------
 # 6. SIGNUP (Create User)
 # ---------------------------------------------------------
@@ -164,23 +576,33 @@ class CancelBookingView(LoginRequiredMixin, View):
         return redirect('dashboard')
 
 # login router for student and admin
+def home_url_name(user):
+    # Staff/admins go to the Admin Panel, students to their Dashboard.
+    # No query: the role came with request.user (core.roles)
+    return 'admin_approval_list' if roles.is_booking_staff(user) else 'dashboard'
+
+
 @login_required
 def login_router(request):
-    if request.user.is_staff:
-        # If they are staff/admin, send them to the Admin Panel
-        return redirect('admin_approval_list')
-    else:
-        # If they are a student, send them to the Dashboard
-        return redirect('dashboard')
+    return redirect(home_url_name(request.user))
+
+
+class RoleLoginView(LoginView):
+    # Fast path: send people straight home instead of via login_router
+    # (one redirect less). ?next= still wins.
+    def get_default_redirect_url(self):
+        return resolve_url(home_url_name(self.request.user))
 
 # ---------------------------------------------------------
 # 8. EDIT BOOKING (Update - Student Only, Pending Only)
 # ---------------------------------------------------------
-class BookingUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+class BookingUpdateView(LoginRequiredMixin, UserPassesTestMixin, AdmittedBookingMixin, UpdateView):
     model = Booking
     form_class = BookingForm
     template_name = 'core/booking_form.html' # We reuse the existing form template!
     success_url = reverse_lazy('dashboard')
+    success_message = "Booking details updated successfully!"
+    defer_conflict_check = True
 
     def test_func(self):
         # SECURITY CHECK:
@@ -194,15 +616,148 @@ class BookingUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
         messages.error(self.request, "You can only edit pending reservations.")
         return redirect('dashboard')
 
-    def form_valid(self, form):
-        # Optional: Add logic here if you need to re-validate dates
-        messages.success(self.request, "Booking details updated successfully!")
-        return super().form_valid(form)
 
 # CLEAR NOTIFICATIONS FUNCTION
 @login_required
 def clear_notifications(request):
-    # Delete all notifications for the current user
-    Notification.objects.filter(user=request.user).delete()
+    # Mark everything as read (rows are kept; old ones are pruned in the background)
+    notifications.mark_read(request.user)
     # Go back to the dashboard
-    return redirect('dashboard')
\ No newline at end of file
+    return redirect('dashboard')
+
+
+@login_required
+def notification_feed(request):
+    """
+    Older notifications, newest first, one cursor page at a time (?before=...).
+    """
+    page = paginate_keyset(
+        Notification.objects.filter(user=request.user), request.GET.get('before'),
+        notifications.FEED_PAGE_SIZE, descending=True, field='created_at',
+    )
+    return JsonResponse(feed_payload(page, notifications.unread_count(request.user)))
+
+
+@login_required
+@require_POST
+def mark_notifications_read(request):
+    """
+    POST ids=1&ids=2 to mark those as read, or no ids to mark everything.
+    """
+    try:
+        ids = [int(pk) for pk in request.POST.getlist('ids')] or None
+    except ValueError:
+        return JsonResponse({'error': "ids must be numbers."}, status=400)
+    changed = notifications.mark_read(request.user, ids)
+    return JsonResponse({'marked': changed, 'unread': notifications.unread_count(request.user)})
+
+
+# ---------------------------------------------------------
+# 9. ASYNC READ VIEWS (ASGI)
+# ---------------------------------------------------------
+# Same pages as the sync views above, written against the async ORM so an
+# ASGI worker (uvicorn, daphne) can keep serving other requests while these
+# wait on the database. Under WSGI, use the sync versions: Django would have
+# to spin up an event loop per request to run these.
+# See benchmarks/bench_asgi.py for the WSGI vs ASGI numbers.
+
+async def _alist(queryset):
+    return [row async for row in queryset]
+
+
+@login_required
+async def dashboard_async(request):
+    user = await request.auser()
+    # Like the sync view, the bookings and notifications stay lazy: they sit
+    # inside cached fragments and are only read (while the template renders,
+    # on a thread) when a fragment misses
+    bookings = dashboard_bookings(user)
+    unread, versions = await asyncio.gather(
+        notifications.aunread_count(user),
+        sync_to_async(fragments.dashboard_versions)(user),
+    )
+    return TemplateResponse(request, 'core/dashboard.html', {
+        'bookings': bookings,
+        'object_list': bookings,
+        'notifications': recent_notifications(user),
+        'unread_count': unread,
+        'fragment_versions': versions,
+        'fragment_timeout': fragments.FRAGMENT_TIMEOUT,
+        'calendar_url': ics.feed_url('user', user.pk),
+    })
+
+
+@login_required
+async def notification_feed_async(request):
+    user = await request.auser()
+    page, unread = await asyncio.gather(
+        apaginate_keyset(
+            Notification.objects.filter(user=user), request.GET.get('before'),
+            notifications.FEED_PAGE_SIZE, descending=True, field='created_at',
+        ),
+        notifications.aunread_count(user),
+    )
+    return JsonResponse(feed_payload(page, unread))
+
+
+@login_required
+async def room_availability_grid_async(request):
+    try:
+        first_day, days, slot_minutes, room_filter = grid_query(request)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+
+    rooms = await _alist(grid_rooms(room_filter))
+    # The grid is mostly cache reads with a sync API; run it off the event loop
+    occupancy = await sync_to_async(grid.availability_grid)(
+        [room['id'] for room in rooms], first_day, days, slot_minutes
+    )
+    return JsonResponse(grid_payload(slot_minutes, rooms, occupancy))
+
+
+
+# ---------------------------------------------------------
+# 10. CALENDAR FEEDS (ICS)
+# ---------------------------------------------------------
+class CalendarFeedView(View):
+    """
+    A room's or a user's approved bookings as an ICS feed (core.ics). The URL
+    is signed instead of logged in, since calendar apps can't log in. A poll
+    with nothing new is answered 304 from the version tokens (room feeds with
+    no query, user feeds after checking the account is still active).
+    """
+    kind = None
+
+    def get(self, request, token):
+        pk = ics.unsign(self.kind, token)
+        if pk is None or not ics.is_open(self.kind, pk):
+            raise Http404
+        etag, last_modified = ics.version(self.kind, pk)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            content = ics.feed(self.kind, pk, last_modified)
+            if content is None:
+                raise Http404
+            if isinstance(request, ASGIRequest):
+                content = export.aiterate(content)
+            response = StreamingHttpResponse(content, content_type='text/calendar; charset=utf-8')
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        # Clients may keep it, but must ask (and usually get a 304) every time
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+@login_required
+def calendar_feeds(request):
+    """
+    Subscription URLs: the user's own feed and one per active room.
+    """
+    rooms = Room.objects.filter(is_active=True).order_by('name').values_list('pk', 'name')
+    return JsonResponse({
+        'mine': request.build_absolute_uri(ics.feed_url('user', request.user.pk)),
+        'rooms': [
+            {'id': pk, 'name': name, 'url': request.build_absolute_uri(ics.feed_url('room', pk))}
+            for pk, name in rooms
+        ],
+    })
@@ -0,0 +1,184 @@
+# core/waitlist.py
+
+"""
+Waitlist for taken slots.
+
+A booking request refused because the room was taken is kept as a
+WaitlistEntry instead of being lost. Whenever a blocking booking (pending,
+approved, completed) is cancelled, rejected, deleted or moved, core.signals
+calls promote() with the windows that were freed, after the transaction
+commits. One pass per event replaces students re-submitting until it works:
+
+    1 SELECT  waiting entries overlapping the freed windows, oldest first
+              (partial index on room/start/end of waiting rows)
+    1 SELECT  the equipment those entries asked for
+    1 SELECT  ... FOR UPDATE on those rooms (core.admission)
+    1 SELECT  bookings in those rooms, and the waiters' own bookings,
+              over the span of the entries (one range fetch)
+    then, per promoted entry, the booking INSERT, and one notification batch
+    (plus, for entries with equipment, the item locks, a stock count and the
+    equipment INSERT)
+
+An entry is compatible when its whole window is now free in the room, the
+user hasn't booked something else at that time meanwhile, and every item
+they asked for still has a unit free. Entries whose start time has passed
+are ignored, and deleted by expire(). promote() runs after the freeing
+change has committed; if it fails, the error is logged and the entries keep
+waiting for the next freed slot.
+
+Users can leave the waitlist (leave()) at any time. A request blocked by
+the user's own booking is never waitlisted, and cancelling or deleting a
+booking withdraws the user's entries inside its window, so a cancel is
+never undone by their own waiting duplicate.
+"""
+
+import logging
+
+from django.db.models import Q
+from django.utils import timezone
+
+from . import admission, availability, notifications
+from .forms import equipment_taken
+from .models import Booking, WaitlistEntry
+
+logger = logging.getLogger('core.waitlist')
+
+
+def join(user, room, start_time, end_time, purpose, equipment=()):
+    """
+    Puts a refused request on the waitlist (once per user, room and window),
+    with the equipment it asked for. Returns None, and waits for nothing, if
+    the slot is blocked by the user's own booking (e.g. a double submit).
+    """
+    own = Booking.objects.filter(
+        availability.overlap_filter(start_time, end_time),
+        user=user, room=room, status__in=availability.BLOCKING_STATUSES,
+    )
+    if own.exists():
+        return None
+    entry, _ = WaitlistEntry.objects.get_or_create(
+        user=user, room=room, start_time=start_time, end_time=end_time, status='waiting',
+        defaults={'purpose': purpose or ''},
+    )
+    entry.equipment.set(equipment)
+    return entry
+
+
+def leave(user, entry_id):
+    """
+    Takes one of the user's waiting entries off the waitlist. Returns whether
+    there was one.
+    """
+    deleted, _ = WaitlistEntry.objects.filter(pk=entry_id, user=user, status='waiting').delete()
+    return bool(deleted)
+
+
+def withdraw(windows):
+    """
+    Drops the waiting entries of each (user_id, (room_id, start, end)) that
+    fall inside that window: the user gave the slot up themselves.
+    """
+    match = Q()
+    for user_id, (room_id, start_time, end_time) in windows:
+        match |= Q(user_id=user_id, room_id=room_id, start_time__gte=start_time, end_time__lte=end_time)
+    if match:
+        WaitlistEntry.objects.filter(match, status='waiting').delete()
+
+
+def expire(now=None):
+    """
+    Deletes waiting entries whose start time has passed (promote() ignores
+    them anyway). Run by `sweep_bookings`. Returns how many were dropped.
+    """
+    _, deleted = WaitlistEntry.objects.filter(status='waiting', start_time__lte=now or timezone.now()).delete()
+    return deleted.get(WaitlistEntry._meta.label, 0)
+
+
+def _conflicts_for_user(rows, entry):
+    return any(start < entry.end_time and end > entry.start_time for start, end in rows.get(entry.user_id, ()))
+
+
+def promote(freed, now=None):
+    """
+    Turns the earliest compatible waiters for the freed (room_id, start, end)
+    windows into pending bookings. Returns the promoted entries.
+    """
+    now = now or timezone.now()
+    match = Q()
+    for room_id, start_time, end_time in freed:
+        match |= Q(room_id=room_id, start_time__lt=end_time, end_time__gt=start_time)
+    if not match:
+        return []
+    waiting = WaitlistEntry.objects.filter(match, status='waiting', start_time__gt=now)
+
+    def operation():
+        entries = list(waiting.select_related('room').prefetch_related('equipment').order_by('created_at', 'pk'))
+        if not entries:
+            return []
+
+        span_start = min(entry.start_time for entry in entries)
+        span_end = max(entry.end_time for entry in entries)
+        room_ids = {entry.room_id for entry in entries}
+        user_ids = {entry.user_id for entry in entries}
+        indexes = {room_id: availability.RoomIntervalIndex() for room_id in room_ids}
+        own = {}
+        for room_id, user_id, start, end, pk in Booking.objects.filter(
+            Q(room_id__in=room_ids) | Q(user_id__in=user_ids),
+            availability.overlap_filter(span_start, span_end),
+            status__in=availability.BLOCKING_STATUSES,
+        ).values_list('room_id', 'user_id', 'start_time', 'end_time', 'pk'):
+            if room_id in indexes:
+                indexes[room_id].add(start, end, pk)
+            own.setdefault(user_id, []).append((start, end))
+
+        promoted = []
+        for entry in entries:
+            index = indexes[entry.room_id]
+            if index.find_conflict(entry.start_time, entry.end_time) is not None:
+                continue
+            if _conflicts_for_user(own, entry):
+                continue  # they found another slot in the meantime
+            equipment = list(entry.equipment.all())
+            if equipment:
+                admission.lock_equipment(item.pk for item in equipment)
+                if equipment_taken(equipment, entry.start_time, entry.end_time):
+                    continue  # the room is free, but not what they need in it
+            booking = Booking(
+                user_id=entry.user_id, room=entry.room, start_time=entry.start_time,
+                end_time=entry.end_time, purpose=entry.purpose, status='pending',
+            )
+            # Just checked above, under the room lock
+            availability.mark_checked(booking, entry.room, entry.start_time, entry.end_time)
+            booking.save()
+            if equipment:
+                booking.equipment.set(equipment)
+            index.add(entry.start_time, entry.end_time, booking.pk)
+            own.setdefault(entry.user_id, []).append((entry.start_time, entry.end_time))
+            entry.status, entry.booking = 'promoted', booking
+            promoted.append(entry)
+
+        if promoted:
+            WaitlistEntry.objects.bulk_update(promoted, ['status', 'booking'])
+            notifications.notify_many(
+                (entry.user_id, (
+                    f"Good news: {entry.room.name} freed up for "
+                    f"{timezone.localtime(entry.start_time):%b %d, %I:%M %p}. "
+                    "Your waitlisted request is now pending approval."
+                ))
+                for entry in promoted
+            )
+        return promoted
+
+    return admission.admitted({room_id for room_id, _, _ in freed}, operation)
+
+
+def promote_logged(freed):
+    """
+    promote() for transaction.on_commit(): the change that freed the slot is
+    already committed, so a failure is logged instead of failing its request.
+    """
+    try:
+        return promote(freed)
+    except Exception:
+        logger.exception("Waitlist promotion failed for %d freed window(s)", len(freed))
+        return []
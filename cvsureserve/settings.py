@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -42,6 +43,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Outermost app middleware so its numbers include session/auth work too
+    'core.middleware.QueryProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -73,14 +76,153 @@ WSGI_APPLICATION = 'cvsureserve.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+#
+# Picked from the environment so the same code runs in both setups:
+#   DATABASE_BACKEND=sqlite   (default) SQLite in WAL mode, tuned on connect
+#                             (db.sqlite3 is not tracked: run `manage.py migrate`
+#                             on a fresh checkout)
+#   DATABASE_BACKEND=postgres PostgreSQL with a psycopg connection pool
+#                             (needs requirements-postgres.txt)
+
+DATABASE_BACKEND = os.environ.get('DATABASE_BACKEND', 'sqlite')
+
+if DATABASE_BACKEND == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'cvsureserve'),
+            'USER': os.environ.get('POSTGRES_USER', 'cvsureserve'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
     }
+    if os.environ.get('DB_POOL', '1') == '1':
+        # psycopg_pool keeps connections open across requests. Django requires
+        # CONN_MAX_AGE = 0 (the default) when the pool is on.
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX', 10)),
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        }
+    else:
+        # Persistent per-worker connections, e.g. behind PgBouncer
+        DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'OPTIONS': {
+                # Seconds a writer waits for the lock before "database is locked"
+                'timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5)),
+                # Take the write lock at BEGIN, so a transaction never fails
+                # halfway through when it tries to upgrade from reader to writer
+                'transaction_mode': 'IMMEDIATE',
+                # Runs on every new connection
+                'init_command': (
+                    f"PRAGMA journal_mode={os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')};"
+                    "PRAGMA synchronous=NORMAL;"
+                    "PRAGMA temp_store=MEMORY;"
+                    "PRAGMA cache_size=-20000;"
+                    "PRAGMA mmap_size=134217728;"
+                ),
+            },
+        }
+    }
+
+
+# Caches
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+#
+#   default    availability grid blocks (core.grid) and cached roles (core.roles)
+#   fragments  rendered dashboard / admin table HTML, and the version tokens
+#              behind it and the calendar feeds (core.fragments, core.ics)
+#
+# Both hold version tokens and invalidations that EVERY worker has to see, so
+# they must be shared between processes:
+#   CACHE_BACKEND=file (default)  files under CACHE_DIR, shared by all the
+#                                 workers on one host
+#   CACHE_BACKEND=redis           Redis at CACHE_URL, shared between hosts
+#                                 (needs requirements-redis.txt)
+#   CACHE_BACKEND=memcached       Memcached at CACHE_URL (needs pymemcache)
+#   CACHE_BACKEND=locmem          per process: only for a single process. The
+#                                 core.E001 check refuses it when
+#                                 WEB_CONCURRENCY is above 1.
+# Clear the caches when you swap or reset the database.
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'file')
+CACHE_DIR = Path(os.environ.get('CACHE_DIR', BASE_DIR / '.cache'))
+CACHE_URL = os.environ.get('CACHE_URL', 'redis://127.0.0.1:6379/0')
+
+
+def _cache(name, max_entries):
+    if CACHE_BACKEND == 'locmem':
+        return {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': f'cvsureserve-{name}',
+            'OPTIONS': {'MAX_ENTRIES': max_entries},
+        }
+    if CACHE_BACKEND == 'redis':
+        return {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+            'KEY_PREFIX': name,
+        }
+    if CACHE_BACKEND == 'memcached':
+        return {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            'LOCATION': CACHE_URL,
+            'KEY_PREFIX': name,
+        }
+    return {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_DIR / name,
+        'OPTIONS': {'MAX_ENTRIES': max_entries},
+    }
+
+
+CACHES = {
+    'default': _cache('default', 20000),
+    'fragments': _cache('fragments', 20000),
 }
 
 
+# Email
+# https://docs.djangoproject.com/en/6.0/topics/email/
+#
+# Notification emails are only ever sent by the `send_notification_emails`
+# worker (core.outbox), never during a request.
+#   EMAIL_DELIVERY=console (default) prints them
+#   EMAIL_DELIVERY=file    writes them to EMAIL_FILE_PATH (.cache/emails)
+#   EMAIL_DELIVERY=smtp    sends through EMAIL_HOST / EMAIL_PORT
+
+EMAIL_DELIVERY = os.environ.get('EMAIL_DELIVERY', 'console')
+EMAIL_BACKEND = {
+    'console': 'django.core.mail.backends.console.EmailBackend',
+    'file': 'django.core.mail.backends.filebased.EmailBackend',
+    'smtp': 'django.core.mail.backends.smtp.EmailBackend',
+}[EMAIL_DELIVERY]
+EMAIL_FILE_PATH = os.environ.get('EMAIL_FILE_PATH', BASE_DIR / '.cache' / 'emails')
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 25))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS', '0') == '1'
+EMAIL_TIMEOUT = 10
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'CvSUReserve <no-reply@cvsu.edu.ph>')
+# Seconds a new notification waits in the outbox so a burst of updates to the
+# same user goes out as one digest
+NOTIFICATION_DIGEST_DELAY = int(os.environ.get('NOTIFICATION_DIGEST_DELAY', 120))
+
+# Authentication
+# Same as ModelBackend, plus the user's Profile/role attached on load (core.roles)
+
+AUTHENTICATION_BACKENDS = ['core.roles.RoleBackend']
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -117,5 +259,27 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Request profiling (core.middleware.QueryProfilingMiddleware)
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '1') == '1'
+PROFILING_WINDOW = 500  # recent requests kept per URL name
+PROFILING_N_PLUS_ONE_THRESHOLD = 5  # same query shape this many times = N+1 suspect
+# WARNING (default) logs only N+1 suspects; PROFILING_LOG_LEVEL=INFO adds one
+# timing line per request
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.profiling': {
+            'handlers': ['console'],
+            'level': os.environ.get('PROFILING_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
 LOGIN_REDIRECT_URL = 'login_redirect'
 LOGOUT_REDIRECT_URL = 'landing_page'
\ No newline at end of file
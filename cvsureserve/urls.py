@@ -1,8 +1,11 @@
 from django.contrib import admin
 from django.urls import path, include  # Import 'include'
 
+from core.views import RoleLoginView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('accounts/login/', RoleLoginView.as_view(), name='login'),  # ahead of auth.urls' own login
 path('accounts/', include('django.contrib.auth.urls')),
     path('', include('core.urls')), # This connects your core app
 ]
\ No newline at end of file